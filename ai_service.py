@@ -1,45 +1,565 @@
 """AI service for generating travel itineraries"""
 
+import contextvars
+import copy
+import functools
 import json
+import math
 import re
-from openai import OpenAI
-from config import API_KEY, API_BASE_URL, MODEL_NAME
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+import itinerary_cache
+from cache import content_hash
+from cassette import cassette_http_client
+from config import (
+    API_KEY, API_BASE_URL, MODEL_NAME, STRUCTURED_OUTPUT, GENERATION_DEADLINE, GENERATION_WORKERS,
+    ITINERARY_SOFT_TTL, RACE_MODELS, REFINE_HISTORY_TURNS, REFINE_MAX_TOKENS
+)
+from generation_log import log_generation
+from itinerary_patch import apply_refinement, compact_summary
+from itinerary_schema import patch_response_format, response_format, validate_itinerary, validate_patch
+from poi_index import index_itinerary
+from rate_limiter import provider_slot
+from telemetry import increment, log_event, observe, register_gauge, span
+from usage import CHARS_PER_TOKEN, BudgetExceededError, cached_tokens_of, ledger
+
+# Base URLs that rejected response_format, so later calls skip straight to plain JSON
+_no_structured_output = set()
+
+# Generations run here so callers can stop waiting at the deadline; the work carries on
+# and lands in the itinerary cache when it finishes
+_executor = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix="tripgenie-generate")
+_inflight = {}
+_inflight_lock = threading.Lock()
+register_gauge("tripgenie_generation_queue_depth", lambda: _executor._work_queue.qsize(),
+               "Generations waiting for a worker thread")
+register_gauge("tripgenie_generations_inflight", lambda: len(_inflight), "Distinct generations running or queued")
+
+_LOGGED_USAGE_FIELDS = ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens", "cost_usd", "estimated")
+
+_TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# Recent race outcomes, for tuning the model lineup
+_race_results = deque(maxlen=500)
+
+def _prompt_text(messages):
+    return "\n".join(message["content"] for message in messages)
+
+def race_summary():
+    """Wins, win share, median latency and median margin per model over recent races"""
+    results = list(_race_results)
+    summary = {}
+    for model in {model for result in results for model in result["models"]}:
+        won = [result for result in results if result["winner"] == model]
+        entered = sum(model in result["models"] for result in results)
+        margins = sorted(result["margin_s"] for result in won if result["margin_s"] is not None)
+        latencies = sorted(result["latency_s"] for result in won)
+        summary[model] = {
+            "races": entered,
+            "wins": len(won),
+            "win_rate": len(won) / entered if entered else 0.0,
+            "median_win_latency_s": latencies[len(latencies) // 2] if latencies else None,
+            "median_margin_s": margins[len(margins) // 2] if margins else None,
+        }
+    return summary
+
+def _record_refresh(future):
+    outcome = "error" if future.exception() is not None else "ok"
+    increment("tripgenie_background_refresh_total", 1, "Background refreshes by outcome", outcome=outcome)
 
 class AITravelService:
-    def __init__(self):
-        if not API_KEY:
+    def __init__(self, base_url=None, api_key=None, model=None, session_id=None, race_models=None):
+        api_key = api_key or API_KEY
+        if not api_key:
             raise ValueError("API Key is missing. Please configure your OpenRouter API key.")
         
+        self.model = model or MODEL_NAME
+        # Two or more models turn on racing; the first valid itinerary wins
+        self.race_models = list(race_models if race_models is not None else RACE_MODELS)
+        self.session_id = session_id
+        self.last_usage = None
+        self.budget_warnings = []
+        self.reuse = None
+        self.stale = False
+        self.pending_refresh = None
+        # openai is slow to import, so only sessions that generate pay for it
+        from openai import OpenAI
         self.client = OpenAI(
-            base_url=API_BASE_URL,
-            api_key=API_KEY,
+            base_url=base_url or API_BASE_URL,
+            api_key=api_key,
+            # None unless TRIPGENIE_CASSETTE records or replays provider traffic
+            http_client=cassette_http_client(),
         )
     
-    def generate_itinerary(self, trip_params):
-        """Generate travel itinerary using AI"""
-        prompt = self._build_prompt(trip_params)
+    def generate_itinerary(self, trip_params, reuse=True, deadline=None):
+        """Generate travel itinerary using AI
+        
+        With reuse on, a cached itinerary past its soft TTL, or a stale/near match
+        served because `deadline` seconds passed, sets `self.stale` and leaves the
+        fresh generation running in `self.pending_refresh` (a Future).
+        """
+        self.last_usage = None
+        self.stale = False
+        self.pending_refresh = None
+        if not reuse:
+            return self._generate_fresh(trip_params)
         
+        # Same city under another name, a shorter trip or a different group size
+        with span("itinerary.reuse"):
+            cached, self.reuse, age = itinerary_cache.lookup(trip_params)
+        if cached is not None:
+            if age >= ITINERARY_SOFT_TTL:
+                self._serve_stale("soft_ttl", self._refresh(trip_params))
+            return cached
+        if self.reuse == "disabled":
+            # Without the cache there is nothing to fall back on or to share
+            return self._generate_fresh(trip_params)
+        
+        deadline = GENERATION_DEADLINE if deadline is None else deadline
+        future = self._refresh(trip_params)
         try:
-            completion = self.client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=4000
+            return future.result(timeout=deadline or None)
+        except FutureTimeout:
+            fallback, kind, _ = itinerary_cache.lookup_stale(trip_params)
+            if fallback is None:
+                # Nothing to fall back on, so keep waiting for the provider
+                return future.result()
+            self.reuse = kind
+            self._serve_stale("deadline", future)
+            return fallback
+    
+    def _refresh(self, trip_params):
+        """Start a fresh generation, or join one already running for the same trip"""
+        key = (itinerary_cache.profile_key(trip_params), trip_params['days'])
+        with _inflight_lock:
+            future = _inflight.get(key)
+            if future is None:
+                context = contextvars.copy_context()
+                future = _executor.submit(context.run, self._generate_fresh, trip_params)
+                _inflight[key] = future
+                future.add_done_callback(lambda _: _inflight.pop(key, None))
+        return future
+    
+    def _serve_stale(self, reason, future):
+        self.stale = True
+        self.pending_refresh = future
+        increment("tripgenie_stale_served_total", 1, "Cached itineraries served while refreshing", reason=reason)
+        future.add_done_callback(_record_refresh)
+    
+    def _generate_fresh(self, trip_params, city_info_source=None):
+        """Call the model, validate the response, update the caches and log the outcome
+        
+        `city_info_source` is a Future for another itinerary of the same city whose
+        destination info and tips are reused instead of generating them again.
+        """
+        start = time.perf_counter()
+        attempt = {}
+        itinerary_json, outcome, error = None, "error", None
+        try:
+            itinerary_json = self._generate_checked(trip_params, city_info_source, attempt)
+            outcome = "ok"
+            return itinerary_json
+        except BudgetExceededError as e:
+            outcome, error = "budget_exceeded", str(e)
+            raise
+        except Exception as e:
+            # A rejected response is marked in `attempt`, whether it came from one call or a race
+            outcome, error = attempt.get("failure", "error"), str(e)
+            raise
+        finally:
+            usage = self.last_usage or {}
+            # Queued for the background writer, so this adds no I/O to the request
+            log_generation(
+                trip_params,
+                session_id=self.session_id,
+                prompt_hash=attempt.get("prompt_hash"),
+                include_city_info=attempt.get("include_city_info"),
+                model=usage.get("model", self.model),
+                race_models=self.race_models if len(self.race_models) > 1 else None,
+                outcome=outcome,
+                error=error,
+                timings={"llm_s": usage.get("latency_s"), "total_s": round(time.perf_counter() - start, 4)},
+                usage={field: usage.get(field) for field in _LOGGED_USAGE_FIELDS} if usage else None,
+                itinerary=itinerary_json,
             )
+    
+    def _generate_checked(self, trip_params, city_info_source, attempt):
+        """The model call and cache updates behind _generate_fresh
+        
+        Fills `attempt` with prompt details and, when the response is rejected,
+        its "failure": "parse_error" or "schema_error".
+        """
+        city_info = itinerary_cache.lookup_city_info(trip_params['city'], trip_params.get('country_code'))
+        include_city_info = city_info is None and city_info_source is None
+        messages = self._build_messages(trip_params, include_city_info=include_city_info)
+        attempt.update(prompt_hash=content_hash(messages)[:16], include_city_info=include_city_info)
+        
+        # Raises BudgetExceededError before any tokens are spent
+        self.budget_warnings = ledger.check_budget(self.session_id, trip_params['city'])
+        
+        if len(self.race_models) > 1:
+            itinerary_json = self._race(messages, include_city_info, trip_params['city'], attempt)
+        else:
+            try:
+                # Every worker process on the host draws from one provider budget
+                with provider_slot(), span("llm.request", model=self.model):
+                    start = time.perf_counter()
+                    completion = self._create_completion(messages, include_city_info)
+                    latency = time.perf_counter() - start
+                
+                self.last_usage = ledger.record_completion(
+                    completion, self.model, latency, _prompt_text(messages),
+                    session_id=self.session_id, destination=trip_params['city']
+                )
+                
+                response_text = completion.choices[0].message.content
+                with span("llm.parse", chars=len(response_text or "")):
+                    itinerary_json = self._parse_response(response_text)
+                
+            except json.JSONDecodeError as e:
+                attempt["failure"] = "parse_error"
+                increment("tripgenie_llm_requests_total", 1, "Completed LLM calls by outcome", outcome="parse_error")
+                raise ValueError(f"Error parsing AI response: {e}")
+            except Exception as e:
+                increment("tripgenie_llm_requests_total", 1, "Completed LLM calls by outcome", outcome="error")
+                raise RuntimeError(f"Error generating itinerary: {e}")
             
-            response_text = completion.choices[0].message.content.strip()
-            response_text = re.sub(r'```json\s*|\s*```', '', response_text)
-            
-            itinerary_json = json.loads(response_text)
-            return itinerary_json
+            try:
+                self._check_itinerary(itinerary_json, include_city_info, self.model)
+            except ValueError:
+                attempt["failure"] = "schema_error"
+                raise
+        
+        if city_info is None and city_info_source is not None:
+            city_info = self._shared_city_info(trip_params['city'], trip_params.get('country_code'), city_info_source)
+        if city_info is not None:
+            itinerary_json = itinerary_cache.merge_city_info(itinerary_json, city_info)
+        else:
+            itinerary_cache.store_city_info(trip_params['city'], itinerary_json, trip_params.get('country_code'))
+        increment("tripgenie_llm_requests_total", 1, "Completed LLM calls by outcome", outcome="ok")
+        itinerary_cache.store(trip_params, itinerary_json, self.last_usage)
+        index_itinerary(itinerary_json, trip_params['city'], trip_params.get('country_code'))
+        return itinerary_json
+    
+    def _shared_city_info(self, city, country_code, source):
+        """City sections from the itinerary generating them, or the city cache if that one failed"""
+        try:
+            city_info = itinerary_cache.city_sections(source.result())
+        except Exception:
+            city_info = None
+        city_info = city_info or itinerary_cache.lookup_city_info(city, country_code)
+        if city_info is None:
+            raise RuntimeError("Error generating itinerary: destination details could not be generated")
+        return city_info
+    
+    def compare_itineraries(self, trip_params, field, values, reuse=True):
+        """Generate variants of one trip that differ only in `field`, all at once
+        
+        Cached variants are served from the itinerary cache. The rest run concurrently
+        and only one of them asks for destination info and tips; the others reuse
+        it. Returns one dict per value with the itinerary or the error that stopped it.
+        """
+        if not 2 <= len(values) <= 3:
+            raise ValueError("Choose two or three options to compare")
+        variants = []
+        source = None
+        for value in values:
+            params = {**trip_params, field: value}
+            cached, kind = None, "disabled"
+            if reuse:
+                cached, kind, _ = itinerary_cache.lookup(params)
+            future = Future()
+            if cached is not None:
+                future.set_result(cached)
+                # An itinerary already in hand can share its city sections
+                source = source or future
+            variants.append({"value": value, "trip_params": params, "reuse": kind, "service": self._variant(),
+                             "future": future})
+        
+        with span("compare", field=field, variants=len(values)):
+            start = time.perf_counter()
+            for variant in variants:
+                if variant["future"].done():
+                    continue
+                context = contextvars.copy_context()
+                variant["future"] = _executor.submit(context.run, variant["service"]._generate_fresh,
+                                                     variant["trip_params"], source)
+                source = source or variant["future"]
             
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Error parsing AI response: {e}")
+            results = []
+            for variant in variants:
+                try:
+                    itinerary_json, error = variant["future"].result(), None
+                except Exception as e:
+                    itinerary_json, error = None, str(e)
+                results.append({
+                    "value": variant["value"],
+                    "trip_params": variant["trip_params"],
+                    "itinerary": itinerary_json,
+                    "reuse": variant["reuse"],
+                    "usage": variant["service"].last_usage,
+                    "budget_warnings": variant["service"].budget_warnings,
+                    "error": error,
+                })
+        
+        elapsed = time.perf_counter() - start
+        observe("tripgenie_compare_seconds", elapsed, "Wall time of side-by-side comparisons", field=field)
+        log_event("itinerary.compare", field=field, values=list(values), latency_s=round(elapsed, 3),
+                  errors=sum(result["error"] is not None for result in results))
+        self.budget_warnings = list(dict.fromkeys(warning for result in results for warning in result["budget_warnings"]))
+        return results
+    
+    def _variant(self):
+        """A copy sharing this service's client, so concurrent generations keep separate usage"""
+        variant = copy.copy(self)
+        variant.last_usage = None
+        variant.budget_warnings = []
+        return variant
+    
+    def _check_itinerary(self, itinerary_json, include_city_info, model):
+        """Raise ValueError naming every schema violation in a parsed response"""
+        # Catch missing keys here rather than as a KeyError halfway through rendering
+        with span("llm.validate"):
+            violations = validate_itinerary(itinerary_json, include_city_info)
+        if violations:
+            increment("tripgenie_llm_requests_total", 1, "Completed LLM calls by outcome", outcome="schema_error")
+            log_event("llm.schema_error", model=model, violations=violations[:20])
+            shown = "; ".join(violations[:5])
+            more = f" (and {len(violations) - 5} more)" if len(violations) > 5 else ""
+            raise ValueError(f"AI response does not match the itinerary format: {shown}{more}")
+    
+    def _race(self, messages, include_city_info, destination, attempt):
+        """Stream the messages to every race model at once and keep the first valid itinerary
+        
+        When no model wins because responses were rejected, attempt["failure"] says how.
+        """
+        start = time.perf_counter()
+        won = threading.Event()
+        lock = threading.Lock()
+        streams = {}
+        progress = {model: 0 for model in self.race_models}
+        outcomes = {}
+        winner = {}
+        
+        def contender(model):
+            chunks = []
+            usage = None
+            outcome = "cancelled"
+            failure = None
+            try:
+                with provider_slot():
+                    if won.is_set():
+                        # Another model finished while this one waited for a provider slot
+                        outcome = "skipped"
+                        return
+                    stream = self._create_completion(messages, include_city_info, model=model, stream=True,
+                                                     stream_options={"include_usage": True})
+                    streams[model] = stream
+                    for chunk in stream:
+                        if won.is_set():
+                            break
+                        if getattr(chunk, "usage", None):
+                            usage = chunk.usage
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            chunks.append(chunk.choices[0].delta.content)
+                            progress[model] += len(chunks[-1])
+                    else:
+                        outcome = "invalid"
+                        itinerary_json = self._parse_response("".join(chunks))
+                        self._check_itinerary(itinerary_json, include_city_info, model)
+                        with lock:
+                            outcome = "lost"
+                            if not won.is_set():
+                                won.set()
+                                outcome = "won"
+                                winner.update(model=model, itinerary=itinerary_json, chars=progress[model],
+                                              latency_s=time.perf_counter() - start, progress=dict(progress))
+            except json.JSONDecodeError:
+                failure = "parse_error"
+                increment("tripgenie_llm_requests_total", 1, "Completed LLM calls by outcome", outcome="parse_error")
+            except Exception as e:
+                if outcome == "invalid":
+                    failure = "schema_error"
+                # Errors raised by closing a losing stream are expected
+                elif outcome == "cancelled" and not won.is_set():
+                    outcome = "error"
+                    log_event("llm.race_error", model=model, error=str(e))
+            finally:
+                elapsed = time.perf_counter() - start
+                # Without a stream the request never reached the provider, so nothing was billed
+                record = None
+                if model in streams:
+                    if usage is not None and usage.prompt_tokens is not None:
+                        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens or 0
+                        estimated = False
+                    else:
+                        # Cancelled streams end before the usage chunk, so estimate what was billed
+                        prompt_tokens = math.ceil(len(_prompt_text(messages)) / CHARS_PER_TOKEN)
+                        completion_tokens = math.ceil(progress[model] / CHARS_PER_TOKEN)
+                        estimated = True
+                    record = ledger.record(model, prompt_tokens, completion_tokens, elapsed, self.session_id,
+                                           destination, cached_tokens_of(usage), estimated=estimated,
+                                           race_outcome=outcome)
+                with lock:
+                    outcomes[model] = {"outcome": outcome, "failure": failure, "latency_s": elapsed, "usage": record}
+                increment("tripgenie_race_contenders_total", 1, "Raced model calls by outcome",
+                          model=model, outcome=outcome)
+        
+        threads = {model: threading.Thread(target=contender, args=(model,), name="tripgenie-race", daemon=True)
+                   for model in self.race_models}
+        with span("llm.race", models=",".join(self.race_models)):
+            for thread in threads.values():
+                thread.start()
+            while not won.is_set() and any(thread.is_alive() for thread in threads.values()):
+                won.wait(0.05)
+            # Closing the losing streams drops their connections instead of reading to the end
+            for model, stream in list(streams.items()):
+                if model != winner.get("model"):
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+        
+        if not winner:
+            increment("tripgenie_llm_requests_total", 1, "Completed LLM calls by outcome", outcome="error")
+            for thread in threads.values():
+                thread.join()
+            failures = {result["failure"] for result in outcomes.values()}
+            for failure in ("schema_error", "parse_error"):
+                if failure in failures:
+                    attempt["failure"] = failure
+                    break
+            summary = ", ".join(f"{model}: {result['failure'] or result['outcome']}"
+                                for model, result in outcomes.items())
+            raise RuntimeError(f"Error generating itinerary: no raced model returned a valid itinerary ({summary})")
+        
+        # Runner-up finish time, extrapolated from its share of the winner's output at the moment of the win
+        margins = [winner["latency_s"] * (winner["chars"] / chars - 1)
+                   for model, chars in winner["progress"].items() if model != winner["model"] and chars]
+        margin = min(margins) if margins else None
+        increment("tripgenie_race_wins_total", 1, "Races won by model", model=winner["model"])
+        if margin is not None:
+            observe("tripgenie_race_margin_seconds", margin, "Estimated lead of the race winner over the runner-up",
+                    model=winner["model"])
+        log_event("llm.race", winner=winner["model"], latency_s=round(winner["latency_s"], 3),
+                  margin_s=round(margin, 3) if margin is not None else None, progress=winner["progress"])
+        _race_results.append({"winner": winner["model"], "latency_s": winner["latency_s"], "margin_s": margin,
+                              "models": list(self.race_models)})
+        
+        # The winner records its usage just after setting the event
+        threads[winner["model"]].join()
+        self.last_usage = outcomes[winner["model"]]["usage"]
+        increment("tripgenie_llm_requests_total", 1, "Completed LLM calls by outcome", outcome="ok")
+        return winner["itinerary"]
+    
+    def _create_completion(self, messages, include_city_info=True, model=None, schema_format=None, **options):
+        """Call the chat endpoint, constraining output to the itinerary schema (or `schema_format`) where supported"""
+        request = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 4000,
+            **options,
+        }
+        base_url = str(self.client.base_url)
+        use_schema = STRUCTURED_OUTPUT == "on" or (
+            STRUCTURED_OUTPUT == "auto" and base_url not in _no_structured_output
+        )
+        if use_schema:
+            request["response_format"] = schema_format or response_format(include_city_info)
+        try:
+            return self.client.chat.completions.create(**request)
         except Exception as e:
-            raise RuntimeError(f"Error generating itinerary: {e}")
+            # Endpoints without structured output reject response_format with a 400
+            if not use_schema or STRUCTURED_OUTPUT != "auto" or getattr(e, "status_code", None) != 400:
+                raise
+            _no_structured_output.add(base_url)
+            increment("tripgenie_structured_output_fallbacks_total", 1,
+                      "Endpoints that rejected structured output", model=request["model"])
+            del request["response_format"]
+            return self.client.chat.completions.create(**request)
+    
+    def refine_itinerary(self, itinerary_json, total_cost, request, trip_params, history=()):
+        """Apply a chat request ("cheaper dinners") to an itinerary as a JSON Patch
+        
+        The model sees a compact outline and the last few requests rather than the
+        full itinerary, and answers with patch operations applied here. Returns the
+        patched itinerary, its total, the model's message and per-turn usage.
+        """
+        self.last_usage = None
+        self.budget_warnings = ledger.check_budget(self.session_id, trip_params['city'])
+        summary = compact_summary(itinerary_json)
+        earlier = "\n".join(f"- {turn['request']} -> {turn['message']}" for turn in list(history)[-REFINE_HISTORY_TURNS:])
+        messages = [
+            {"role": "system", "content": _refine_system_prompt()},
+            {"role": "user", "content": (
+                f"Trip: {trip_params['city']}, {trip_params['days']} days, {trip_params['num_people']} traveler(s), "
+                f"{trip_params['budget']} budget, {trip_params['travel_pace']} pace\n\n"
+                f"Itinerary outline:\n{summary}\n\n"
+                + (f"Earlier requests:\n{earlier}\n\n" if earlier else "")
+                + f"Request: {request}"
+            )},
+        ]
+        
+        try:
+            with provider_slot(), span("llm.refine", model=self.model):
+                start = time.perf_counter()
+                completion = self._create_completion(messages, model=self.model, schema_format=patch_response_format(),
+                                                     max_tokens=REFINE_MAX_TOKENS)
+                latency = time.perf_counter() - start
+        except Exception as e:
+            increment("tripgenie_refine_turns_total", 1, "Refinement turns by outcome", outcome="error")
+            raise RuntimeError(f"Error refining itinerary: {e}")
+        self.last_usage = ledger.record_completion(
+            completion, self.model, latency, _prompt_text(messages),
+            session_id=self.session_id, destination=trip_params['city'], refinement=True
+        )
+        
+        try:
+            patch = self._parse_response(completion.choices[0].message.content)
+            violations = validate_patch(patch)
+            if violations:
+                raise ValueError("; ".join(violations[:5]))
+            refined, refined_total, touched = apply_refinement(itinerary_json, total_cost, patch['operations'])
+        except (json.JSONDecodeError, ValueError) as e:
+            increment("tripgenie_refine_turns_total", 1, "Refinement turns by outcome", outcome="invalid")
+            log_event("llm.refine_invalid", error=str(e))
+            raise ValueError(f"The suggested change could not be applied: {e}")
+        
+        tokens = self.last_usage.get("total_tokens", 0)
+        increment("tripgenie_refine_turns_total", 1, "Refinement turns by outcome", outcome="ok")
+        observe("tripgenie_refine_seconds", latency, "Latency of refinement turns")
+        observe("tripgenie_refine_tokens", tokens, "Tokens per refinement turn", buckets=_TOKEN_BUCKETS)
+        log_event("llm.refine", operations=len(patch['operations']), days=touched, tokens=tokens,
+                  latency_s=round(latency, 3), outline_chars=len(summary))
+        return {
+            "itinerary": refined,
+            "total_cost": refined_total,
+            "message": patch['message'],
+            "operations": patch['operations'],
+            "touched_days": touched,
+            "tokens": tokens,
+            "latency_s": latency,
+            "outline_chars": len(summary),
+            "itinerary_chars": len(json.dumps(itinerary_json, ensure_ascii=False)),
+        }
+    
+    def _parse_response(self, response_text):
+        """Strip markdown fences from the model output and decode the JSON"""
+        response_text = re.sub(r'```json\s*|\s*```', '', response_text.strip())
+        return json.loads(response_text)
+    
+    def _build_messages(self, params, include_city_info=True):
+        """Static instructions as the system message, then the trip parameters"""
+        return [
+            {"role": "system", "content": _system_prompt(include_city_info)},
+            {"role": "user", "content": self._build_prompt(params)},
+        ]
     
     def _build_prompt(self, params):
-        """Build the AI prompt for itinerary generation"""
+        """Build the trip-specific part of the prompt"""
         city = params['city']
         days = params['days']
         num_people = params['num_people']
@@ -50,12 +570,7 @@ class AITravelService:
         food_pref = params['food_preferences']
         interests = params['interests']
         
-        return f"""
-        You are an expert travel planning assistant specializing in personalized, culturally rich, and practical itineraries.
-
-        Generate a **day-by-day travel itinerary** for a trip to **{city}**, lasting **{days} days**, for **{num_people}** traveler(s).
-
-        ---
+        return f"""Generate a **day-by-day travel itinerary** for a trip to **{city}**, lasting **{days} days**, for **{num_people}** traveler(s).
 
         ### 🧭 TRIP OVERVIEW
         - **Destination**: {city}
@@ -66,11 +581,55 @@ class AITravelService:
         - **Travel Pace**: {travel_pace} (Relaxed / Medium / Packed)
         - **Accessibility Needs**: {"Yes" if accessibility != "None" else "None"}
 
-        ---
-
         ### 🎯 TRAVEL PREFERENCES
         - **Food Preferences**: {', '.join(food_pref) if food_pref else 'No specific preferences'}
-        - **Interest Areas**: {', '.join(interests) if interests else 'General exploration and sightseeing'}
+        - **Interest Areas**: {', '.join(interests) if interests else 'General exploration and sightseeing'}"""
+
+@functools.lru_cache(maxsize=None)
+def _refine_system_prompt():
+    """Static instructions for refinement turns, kept identical across users for prefix caching"""
+    return """You edit travel itineraries. The user message gives the trip, an outline of the current itinerary and a change request.
+
+        Each outline line starts with a JSON Pointer (e.g. `/days/1/activities/2`) followed by the item's times, title, category and cost.
+        Answer with JSON Patch operations (RFC 6902) that make the requested change and nothing else:
+        - `replace` an activity at `/days/N/activities/M` with a complete new activity
+        - `add` an activity at `/days/N/activities/M` (or `/days/N/activities/-` to append), `remove` one with value null
+        - `replace` a single field, e.g. `/days/N/activities/M/cost`, `/days/N/theme`, `/days/N/meal_cost`, `/days/N/transport_cost`
+        - `add`, `remove` or `replace` entries of `/local_tips`
+        Days cannot be added or removed, and `daily_total` is updated for you.
+        A complete activity has: title, description, location, start_time, end_time, cost (e.g. "₹1200"), category, insider_tip.
+        Operations apply in order, so indexes after an add or remove refer to the updated list.
+
+        Return only JSON: {"operations": [{"op": "...", "path": "...", "value": ...}], "message": "One sentence telling the traveler what changed"}"""
+
+@functools.lru_cache(maxsize=None)
+def _system_prompt(include_city_info=True):
+    """Instructions and output format shared by every request
+    
+    Nothing trip-specific goes here, so providers that cache prompt prefixes
+    can reuse this whole message across users.
+    """
+    # City-level sections are left out when they are already cached for the city
+    destination_info_format = """
+        "destination_info": {
+            "city": "Destination city name",
+            "best_time_to_visit": "e.g. October to March for pleasant weather",
+            "local_currency": "e.g. Indian Rupee (INR)",
+            "language": "e.g. Hindi, English widely spoken"
+        },""" if include_city_info else ""
+    local_tips_format = """,
+        "local_tips": [
+            "Cultural etiquette to follow",
+            "Transport or safety advice",
+            "Budget-saving tip or booking hack"
+        ]""" if include_city_info else ""
+    city_info_note = "" if include_city_info else (
+        "\n        Do not include `destination_info` or `local_tips`; they are already known for this city."
+    )
+    
+    return f"""You are an expert travel planning assistant specializing in personalized, culturally rich, and practical itineraries.
+
+        The user message gives the destination, trip length, travelers and preferences.
 
         ---
 
@@ -106,13 +665,7 @@ class AITravelService:
         Return only valid, clean JSON in this structure:
 
         ```json
-        {{
-        "destination_info": {{
-            "city": "{city}",
-            "best_time_to_visit": "e.g. October to March for pleasant weather",
-            "local_currency": "e.g. Indian Rupee (INR)",
-            "language": "e.g. Hindi, English widely spoken"
-        }},
+        {{{destination_info_format}
         "days": [
             {{
             "day": 1,
@@ -133,11 +686,6 @@ class AITravelService:
             "transport_cost": "₹800",
             "daily_total": "₹5200"
             }}
-        ],
-        "local_tips": [
-            "Cultural etiquette to follow",
-            "Transport or safety advice",
-            "Budget-saving tip or booking hack"
-        ]
-        }}
+        ]{local_tips_format}
+        }}{city_info_note}
         Respond only with the formatted JSON. Do not include commentary or text outside the JSON object. Keep it engaging, informative, and highly relevant."""
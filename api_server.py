@@ -0,0 +1,359 @@
+"""Headless HTTP JSON API for itinerary generation
+
+    python api_server.py --port 8080
+    uvicorn api_server:app --workers 4
+
+Endpoints:
+    POST /v1/itineraries                       generate an itinerary from trip parameters
+    GET  /v1/itineraries/{id}                  fetch a generated itinerary
+    GET  /v1/itineraries/{id}/export?format=   pdf, ics, html or any data export format
+    GET  /v1/cities?q=&limit=                  destination match and suggestions for autocomplete
+    GET  /healthz, GET /metrics
+
+Generation goes through the same AITravelService, usage budgets, caches
+and telemetry as the Streamlit app. Generated itineraries are kept in a
+SQLite table shared by every worker on the host, so a GET or export can be
+served by a different worker than the POST that created it. Destinations missing from the offline
+city index are refused with suggestions unless TRIPGENIE_UNKNOWN_CITY is
+"allow", or it is "confirm" and the body sets "allow_unknown_city": true.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from config import (
+    API_SERVER_HOST, API_SERVER_PORT, API_SERVER_TOKEN, API_MAX_CONCURRENT_GENERATIONS,
+    API_ITINERARY_STORE_PATH, API_ITINERARY_STORE_SIZE, CITY_SUGGESTIONS, UNKNOWN_CITY_POLICY
+)
+from gazetteer import get_city_index
+from prewarm import start_prewarm_scheduler
+from generation_log import log_request
+from telemetry import increment, new_trace, register_cache, render_prometheus, span
+from utils import calculate_total_cost, create_calendar_file, validate_trip_params
+
+_TRIP_DEFAULTS = {
+    'num_people': 1,
+    'group_type': "Solo",
+    'budget': "Mid-range",
+    'travel_pace': "Medium",
+    'accessibility': "None",
+    'food_preferences': [],
+    'interests': []
+}
+
+class ItineraryStore:
+    """Generated itineraries by ID in SQLite, shared by every worker process on the host
+
+    Only the newest maxsize itineraries are kept. hits and misses count this
+    process's lookups, so the store reports like the in-process caches.
+    """
+
+    def __init__(self, path=API_ITINERARY_STORE_PATH, maxsize=API_ITINERARY_STORE_SIZE):
+        self.path = path
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # A connection inherited through fork must not be shared with the parent
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS itineraries (id TEXT PRIMARY KEY, created REAL NOT NULL, "
+                         "record TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS itineraries_created ON itineraries (created)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, itinerary_id):
+        """The stored record, or None"""
+        with self._lock:
+            row = self._connect().execute("SELECT record FROM itineraries WHERE id = ?", (itinerary_id,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        record = json.loads(row[0])
+        return {**record, "start_date": date.fromisoformat(record["start_date"]),
+                "end_date": date.fromisoformat(record["end_date"])}
+
+    def set(self, itinerary_id, record):
+        """Insert or replace a record, then drop the oldest beyond maxsize"""
+        payload = json.dumps({**record, "start_date": record["start_date"].isoformat(),
+                              "end_date": record["end_date"].isoformat()})
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT INTO itineraries (id, created, record) VALUES (?, ?, ?) "
+                             "ON CONFLICT (id) DO UPDATE SET record = excluded.record",
+                             (itinerary_id, time.time(), payload))
+                conn.execute("DELETE FROM itineraries WHERE id IN "
+                             "(SELECT id FROM itineraries ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.maxsize,))
+
+    def stats(self):
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM itineraries").fetchone()[0]
+            return {"size": size, "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+_itineraries = ItineraryStore()
+register_cache("api_itineraries", _itineraries)
+_generation_slots = None
+
+def _error(status, message, **extra):
+    return JSONResponse({"error": message, **extra}, status_code=status)
+
+def _authorized(request):
+    if not API_SERVER_TOKEN:
+        return True
+    return request.headers.get("authorization") == f"Bearer {API_SERVER_TOKEN}"
+
+def parse_trip_request(body):
+    """Turn a request body into (trip_params, start_date, end_date, errors)"""
+    if not isinstance(body, dict):
+        return None, None, None, ["body: must be a JSON object"]
+
+    errors = []
+    try:
+        start_date = date.fromisoformat(body['start_date']) if body.get('start_date') else date.today()
+        end_date = date.fromisoformat(body['end_date']) if body.get('end_date') else None
+    except (TypeError, ValueError):
+        return None, None, None, ["start_date/end_date: must be ISO dates (YYYY-MM-DD)"]
+
+    days = body.get('days')
+    if end_date is not None:
+        if days is not None and days != (end_date - start_date).days:
+            errors.append("days: does not match start_date and end_date")
+        days = (end_date - start_date).days
+    elif isinstance(days, int) and not isinstance(days, bool):
+        end_date = start_date + timedelta(days=days)
+
+    trip_params = {**_TRIP_DEFAULTS, **{key: body[key] for key in _TRIP_DEFAULTS if key in body}}
+    trip_params['city'] = body.get('city').strip() if isinstance(body.get('city'), str) else body.get('city')
+    trip_params['days'] = days
+    errors.extend(validate_trip_params(trip_params))
+    if not errors:
+        errors.extend(_check_destination(trip_params, body.get('allow_unknown_city') is True))
+    return trip_params, start_date, end_date, errors
+
+def _check_destination(trip_params, allow_unknown):
+    """Canonicalize a known city in place; returns errors for an unknown one"""
+    index = get_city_index()
+    match = index.lookup(trip_params['city'])
+    if match is not None:
+        trip_params['city'] = index.display_name(match)
+        trip_params['country_code'] = match.country_code
+        outcome = "known"
+    elif not len(index) or UNKNOWN_CITY_POLICY == "allow":
+        outcome = "allowed"
+    elif UNKNOWN_CITY_POLICY == "confirm" and allow_unknown:
+        outcome = "confirmed"
+    else:
+        outcome = "blocked"
+    increment("tripgenie_destination_checks_total", 1, "Destinations checked against the city index by outcome",
+              outcome=outcome)
+    if outcome != "blocked":
+        return []
+    suggestions = ", ".join(index.display_name(city) for city in index.suggest(trip_params['city']))
+    hint = f"; did you mean {suggestions}?" if suggestions else ""
+    if UNKNOWN_CITY_POLICY == "confirm":
+        hint += f'{" " if suggestions else ". "}Set "allow_unknown_city": true to plan it anyway.'
+    return [f"city: '{trip_params['city']}' is not in the city index{hint}"]
+
+def _generate(trip_params):
+    """Blocking generation, run on the threadpool"""
+    from ai_service import AITravelService
+    service = AITravelService()
+    itinerary_json = service.generate_itinerary(trip_params)
+    warnings = list(service.budget_warnings)
+    if service.reuse == "near":
+        warnings.append("Generation was slow, so this itinerary was planned for the same city with a different pace, "
+                        "group or interests; it is replaced when the fresh one is ready")
+    return itinerary_json, service.last_usage, warnings, service.pending_refresh
+
+def _public_record(record):
+    return {
+        "id": record["id"],
+        "trip": {**record["trip"], "start_date": record["start_date"].isoformat(),
+                 "end_date": record["end_date"].isoformat()},
+        "total_cost": record["total_cost"],
+        "itinerary": record["itinerary"],
+        "usage": record["usage"],
+        "warnings": record["warnings"],
+        "stale": record["stale"]
+    }
+
+def _swap_in_refresh(record, future):
+    if future.exception() is None:
+        itinerary_json = future.result()
+        _itineraries.set(record["id"], {**record, "itinerary": itinerary_json, "stale": False,
+                                        "total_cost": calculate_total_cost(itinerary_json)})
+
+async def create_itinerary(request: Request):
+    new_trace()
+    if not _authorized(request):
+        return _error(401, "Missing or invalid bearer token")
+    try:
+        body = await request.json()
+    except ValueError:
+        return _error(400, "Request body must be valid JSON")
+
+    trip_params, start_date, end_date, errors = parse_trip_request(body)
+    if errors:
+        increment("tripgenie_api_requests_total", 1, "API requests by endpoint and status",
+                  endpoint="generate", status="422")
+        return _error(422, "Invalid trip parameters", details=errors)
+    log_request(trip_params, source="api")
+
+    from usage import BudgetExceededError
+    try:
+        async with _generation_slots:
+            with span("api.generate", city=trip_params['city'], days=trip_params['days']):
+                itinerary_json, usage, warnings, pending = await run_in_threadpool(_generate, trip_params)
+    except BudgetExceededError as e:
+        increment("tripgenie_api_requests_total", 1, endpoint="generate", status="429")
+        return _error(429, str(e))
+    except (ValueError, RuntimeError) as e:
+        increment("tripgenie_api_requests_total", 1, endpoint="generate", status="502")
+        return _error(502, str(e))
+
+    record = {
+        "id": uuid.uuid4().hex,
+        "trip": trip_params,
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_cost": calculate_total_cost(itinerary_json),
+        "itinerary": itinerary_json,
+        "usage": {k: v for k, v in (usage or {}).items() if k not in ("session_id", "ts")},
+        "warnings": warnings,
+        "stale": pending is not None
+    }
+    _itineraries.set(record["id"], record)
+    if pending is not None:
+        # A cached itinerary was served; replace it when the fresh one is ready
+        pending.add_done_callback(lambda future: _swap_in_refresh(record, future))
+    increment("tripgenie_api_requests_total", 1, endpoint="generate", status="201")
+    return JSONResponse(_public_record(record), status_code=201)
+
+async def get_itinerary(request: Request):
+    if not _authorized(request):
+        return _error(401, "Missing or invalid bearer token")
+    record = _itineraries.get(request.path_params["itinerary_id"])
+    if record is None:
+        return _error(404, "Itinerary not found")
+    return JSONResponse(_public_record(record))
+
+def _export(record, fmt):
+    """Blocking export, run on the threadpool; returns (payload, media type, file name)"""
+    trip = record["trip"]
+    city = trip["city"]
+    args = (record["itinerary"], trip["num_people"], city, record["start_date"], record["end_date"],
+            record["total_cost"])
+    if fmt == "pdf":
+        from pdf_generator import create_professional_pdf
+        return create_professional_pdf(*args).getvalue(), "application/pdf", f"{city}_elite_itinerary.pdf"
+    if fmt == "ics":
+        return create_calendar_file(record["itinerary"], record["start_date"]), "text/calendar", f"{city}_itinerary.ics"
+    if fmt == "html":
+        from html_export import create_static_html
+        return create_static_html(*args), "text/html; charset=utf-8", f"{city}_itinerary.html"
+
+    from itinerary_io import EXPORT_FORMATS, export_itinerary
+    if fmt not in EXPORT_FORMATS:
+        return None, None, None
+    extension, media_type = EXPORT_FORMATS[fmt]
+    trip_details = {'city': city, 'start_date': record["start_date"], 'end_date': record["end_date"],
+                    'days': trip['days'], 'num_people': trip['num_people']}
+    return export_itinerary(record["itinerary"], trip_details, fmt), media_type, f"{city}_itinerary{extension}"
+
+async def export_itinerary_file(request: Request):
+    if not _authorized(request):
+        return _error(401, "Missing or invalid bearer token")
+    record = _itineraries.get(request.path_params["itinerary_id"])
+    if record is None:
+        return _error(404, "Itinerary not found")
+    fmt = request.query_params.get("format", "json")
+    with span("api.export", format=fmt):
+        try:
+            payload, media_type, file_name = await run_in_threadpool(_export, record, fmt)
+        except RuntimeError as e:
+            return _error(500, str(e))
+    if payload is None:
+        return _error(400, f"Unsupported export format: {fmt}")
+    return Response(payload, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+def _public_city(index, city):
+    return {**city._asdict(), "display_name": index.display_name(city)}
+
+async def search_cities(request: Request):
+    if not _authorized(request):
+        return _error(401, "Missing or invalid bearer token")
+    query = request.query_params.get("q", "").strip()
+    try:
+        limit = min(max(int(request.query_params.get("limit", CITY_SUGGESTIONS)), 1), 20)
+    except ValueError:
+        return _error(400, "limit must be an integer")
+    index = get_city_index()
+    match = index.lookup(query)
+    suggestions = index.complete(query, limit) if match is not None else index.suggest(query, limit)
+    return JSONResponse({
+        "query": query,
+        "match": _public_city(index, match) if match is not None else None,
+        "suggestions": [_public_city(index, city) for city in suggestions]
+    })
+
+async def healthz(request: Request):
+    return JSONResponse({"status": "ok"})
+
+async def metrics(request: Request):
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@asynccontextmanager
+async def _lifespan(app):
+    # Created inside the running loop so it binds to the server's event loop
+    global _generation_slots
+    _generation_slots = asyncio.Semaphore(API_MAX_CONCURRENT_GENERATIONS)
+    start_prewarm_scheduler()
+    yield
+
+app = Starlette(
+    routes=[
+        Route("/v1/itineraries", create_itinerary, methods=["POST"]),
+        Route("/v1/itineraries/{itinerary_id}", get_itinerary, methods=["GET"]),
+        Route("/v1/itineraries/{itinerary_id}/export", export_itinerary_file, methods=["GET"]),
+        Route("/v1/cities", search_cities, methods=["GET"]),
+        Route("/healthz", healthz, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ],
+    lifespan=_lifespan
+)
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description="TripGenie.AI headless JSON API")
+    parser.add_argument("--host", default=API_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=API_SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
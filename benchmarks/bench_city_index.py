@@ -0,0 +1,97 @@
+"""Benchmark build time, memory and lookup latency of the offline city index
+
+    python -m benchmarks.bench_city_index                         # exit 1 over the default limits
+    python -m benchmarks.bench_city_index --max-p99-us 500 --max-memory-kb 4096
+
+Every indexed city is looked up by name, completed from its first three
+letters and corrected from a copy with one letter dropped, so the timings
+cover the whole gazetteer rather than a few easy names.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+from destinations import fold_name
+from gazetteer import load_city_index
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def _time_calls(func, arguments, repeat):
+    """Per-call latency in microseconds, the best of `repeat` passes for each argument"""
+    samples = []
+    for argument in arguments:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(argument)
+            best = min(best, time.perf_counter() - start)
+        samples.append(best * 1e6)
+    return samples
+
+def run(repeat=5):
+    """Build the index once under tracemalloc, then time each kind of query"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = load_city_index()
+    build_ms = (time.perf_counter() - start) * 1000
+    memory_kb = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+
+    names = [city.name for city in index]
+    misspelled = []
+    for name in names:
+        key = fold_name(name)
+        misspelled.append(key[:len(key) // 2] + key[len(key) // 2 + 1:] if len(key) > 3 else key)
+    hits = sum(1 for name, typo in zip(names, misspelled) if any(city.name == name for city in index.correct(typo)))
+
+    operations = {
+        "lookup": _time_calls(index.lookup, names, repeat),
+        "complete": _time_calls(index.complete, [name[:3] for name in names], repeat),
+        "correct": _time_calls(index.correct, misspelled, repeat),
+    }
+    return {
+        "cities": len(index),
+        "build_ms": build_ms,
+        "memory_kb": memory_kb,
+        "correction_recall": hits / len(names) if names else 0.0,
+        "operations": {
+            operation: {"p50_us": statistics.median(samples), "p99_us": _percentile(samples, 0.99)}
+            for operation, samples in operations.items()
+        }
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="City index build time, memory and lookup latency")
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes per query (best is kept)")
+    parser.add_argument("--max-p99-us", type=float, default=1000, help="p99 limit for every operation")
+    parser.add_argument("--max-memory-kb", type=float, default=8192, help="limit for the built index")
+    parser.add_argument("--max-build-ms", type=float, default=1000)
+    args = parser.parse_args(argv)
+
+    result = run(args.repeat)
+    print(f"{result['cities']} cities, built in {result['build_ms']:.1f} ms, {result['memory_kb']:,.0f} KB, "
+          f"{result['correction_recall']:.1%} of one-letter typos corrected")
+    print(f"{'operation':<10} {'p50 us':>8} {'p99 us':>8}")
+    for operation, timing in result["operations"].items():
+        print(f"{operation:<10} {timing['p50_us']:>8.1f} {timing['p99_us']:>8.1f}")
+
+    failures = [f"{operation}: p99 {timing['p99_us']:.0f} us > {args.max_p99_us:.0f} us"
+                for operation, timing in result["operations"].items() if timing["p99_us"] > args.max_p99_us]
+    if result["memory_kb"] > args.max_memory_kb:
+        failures.append(f"memory: {result['memory_kb']:,.0f} KB > {args.max_memory_kb:,.0f} KB")
+    if result["build_ms"] > args.max_build_ms:
+        failures.append(f"build: {result['build_ms']:.0f} ms > {args.max_build_ms:.0f} ms")
+    if failures:
+        print("\nFAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Benchmark payload size and encode/decode time of the data export formats"""
+
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from benchmarks.synthetic import synthetic_itinerary
+from itinerary_io import EXPORT_FORMATS, build_export_document, decode_document, encode_document
+
+TRIP_LENGTHS = [1, 7, 30]
+
+def _best_of(func, repeat):
+    """Return the fastest of `repeat` timed calls in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run(repeat=50):
+    """Measure every export format at each trip length"""
+    results = []
+    for days in TRIP_LENGTHS:
+        start = date(2025, 1, 1)
+        trip = {"city": "Benchmark City", "start_date": start, "end_date": start + timedelta(days=days),
+                "days": days, "num_people": 2}
+        itinerary = synthetic_itinerary(days)
+        document = build_export_document(itinerary, trip)
+        
+        # Previous "Download Data" encoding, for reference
+        legacy = json.dumps(itinerary, indent=2)
+        results.append({
+            "days": days,
+            "format": "legacy",
+            "bytes": len(legacy.encode("utf-8")),
+            "encode_ms": _best_of(lambda: json.dumps(itinerary, indent=2), repeat),
+            "decode_ms": _best_of(lambda: json.loads(legacy), repeat)
+        })
+        for fmt in EXPORT_FORMATS:
+            payload = encode_document(document, fmt)
+            results.append({
+                "days": days,
+                "format": fmt,
+                "bytes": len(payload),
+                "encode_ms": _best_of(lambda: encode_document(document, fmt), repeat),
+                "decode_ms": _best_of(lambda: decode_document(payload), repeat)
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per measurement (best is kept)")
+    args = parser.parse_args()
+    
+    print(f"{'days':>4}  {'format':<8} {'bytes':>9} {'encode ms':>10} {'decode ms':>10}")
+    for row in run(args.repeat):
+        print(f"{row['days']:>4}  {row['format']:<8} {row['bytes']:>9,} {row['encode_ms']:>10.3f} {row['decode_ms']:>10.3f}")
+
+if __name__ == "__main__":
+    main()
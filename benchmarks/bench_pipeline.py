@@ -0,0 +1,151 @@
+"""Benchmark the itinerary pipeline stages and compare against saved baselines
+
+    python -m benchmarks.bench_pipeline --save                 # record a baseline
+    python -m benchmarks.bench_pipeline --compare              # fail on regressions
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from ai_service import AITravelService
+from benchmarks.synthetic import synthetic_itinerary, synthetic_response_text, synthetic_trip_params
+from pdf_generator import create_professional_pdf, create_simple_fallback_pdf
+from utils import analyze_budget_breakdown, calculate_total_cost, create_calendar_file, extract_cost, generate_packing_list
+
+DEFAULT_SIZES = [1, 7, 30]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "pipeline.json")
+
+def _measure(func, repeat):
+    """Time `repeat` calls, returning median and minimum in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples), "runs": repeat}
+
+def _stages(days, activities_per_day, text_length):
+    """Return (name, func) for every pipeline stage at one trip size"""
+    itinerary = synthetic_itinerary(days, activities_per_day, text_length)
+    params = synthetic_trip_params(days)
+    response_text = synthetic_response_text(itinerary)
+    start_date = date(2025, 1, 1)
+    end_date = start_date + timedelta(days=days)
+    num_people = params['num_people']
+    total_cost = calculate_total_cost(itinerary)
+    titles = [act['title'] for day in itinerary['days'] for act in day['activities']]
+    cost_fields = [act['cost'] for day in itinerary['days'] for act in day['activities']]
+    cost_fields += [day[key] for day in itinerary['days'] for key in ('meal_cost', 'transport_cost', 'daily_total')]
+
+    # _build_messages and _parse_response do not touch the API client
+    service = AITravelService.__new__(AITravelService)
+
+    return [
+        ("build_messages", lambda: service._build_messages(params)),
+        ("parse_response", lambda: service._parse_response(response_text)),
+        ("extract_cost", lambda: [extract_cost(text) for text in cost_fields]),
+        ("analyze_budget_breakdown", lambda: analyze_budget_breakdown(itinerary, num_people)),
+        ("generate_packing_list", lambda: generate_packing_list(params['city'], days, titles)),
+        ("create_calendar_file", lambda: create_calendar_file(itinerary, start_date)),
+        ("create_professional_pdf",
+         lambda: create_professional_pdf(itinerary, num_people, params['city'], start_date, end_date, total_cost)),
+        ("create_simple_fallback_pdf",
+         lambda: create_simple_fallback_pdf(itinerary, num_people, params['city'], start_date, end_date, total_cost)),
+    ]
+
+def run(sizes=DEFAULT_SIZES, repeat=20, activities_per_day=4, text_length=80, pdf_repeat=5):
+    """Benchmark every stage at each trip size"""
+    results = {}
+    for days in sizes:
+        for name, func in _stages(days, activities_per_day, text_length):
+            runs = pdf_repeat if "pdf" in name else repeat
+            func()  # warm up imports and caches
+            results[f"{name}[{days}d]"] = _measure(func, runs)
+    return results
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return (rows, regressions) comparing median times against a baseline"""
+    rows = []
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            rows.append((key, None, current["median_ms"], None, "new"))
+            continue
+        ratio = current["median_ms"] / previous["median_ms"] if previous["median_ms"] else 1.0
+        delta = current["median_ms"] - previous["median_ms"]
+        regressed = ratio > 1 + tolerance and delta > min_delta_ms
+        status = "REGRESSION" if regressed else "ok"
+        rows.append((key, previous["median_ms"], current["median_ms"], ratio, status))
+        if regressed:
+            regressions.append(key)
+    return rows, regressions
+
+def _print_results(results):
+    print(f"{'stage':<42} {'median ms':>10} {'min ms':>10}")
+    for key, row in results.items():
+        print(f"{key:<42} {row['median_ms']:>10.3f} {row['min_ms']:>10.3f}")
+
+def _print_comparison(rows):
+    print(f"{'stage':<42} {'baseline':>10} {'current':>10} {'ratio':>7}  status")
+    for key, previous, current, ratio, status in rows:
+        previous_text = f"{previous:>10.3f}" if previous is not None else f"{'-':>10}"
+        ratio_text = f"{ratio:>7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{key:<42} {previous_text} {current:>10.3f} {ratio_text}  {status}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the itinerary pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="trip lengths in days")
+    parser.add_argument("--activities", type=int, default=4, help="activities per day")
+    parser.add_argument("--text-length", type=int, default=80, help="characters per description")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per fast stage")
+    parser.add_argument("--pdf-repeat", type=int, default=5, help="timed runs per PDF stage")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, metavar="PATH", help="write results as a baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, metavar="PATH", help="compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio before failing")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    if args.compare and not os.path.exists(args.compare):
+        print(f"No baseline at {args.compare}; run with --save first")
+        return 2
+
+    results = run(args.sizes, args.repeat, args.activities, args.text_length, args.pdf_repeat)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        _print_comparison(rows)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            exit_code = 1
+    else:
+        _print_results(results)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "activities_per_day": args.activities,
+                    "text_length": args.text_length
+                },
+                "results": results
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Measure provider prefix-cache reuse and time to first token for the prompt layout
+
+    python -m benchmarks.bench_prompt_cache --requests 20 --ttft-ms 600
+
+Sends a mix of trips to the mock server twice: once with the legacy layout,
+where the trip parameters open a single user message, and once with the
+current system-prefix layout. Each layout gets its own mock server so cache
+state is not shared. Cached tokens come from the usage metadata the server
+reports; TTFT is measured on the stream.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.mock_llm_server import start_mock_server
+from benchmarks.synthetic import synthetic_trip_params
+
+CITIES = ["Paris", "Tokyo", "New York", "Jaipur", "Lisbon", "Cape Town", "Kyoto", "Rome"]
+
+def _legacy_messages(messages):
+    """The pre-split layout: trip parameters first, then every static instruction, in one user message"""
+    system, user = messages
+    return [{"role": "user", "content": f"{user['content']}\n\n{system['content']}"}]
+
+def _trip(index):
+    params = synthetic_trip_params(2 + index % 5, CITIES[index % len(CITIES)])
+    params['budget'] = ["Budget", "Mid-range", "Luxury"][index % 3]
+    return params
+
+def run_layout(layout, requests, **server_options):
+    """Return per-request (ttft_s, prompt_tokens, cached_tokens) for one layout"""
+    from openai import OpenAI
+    from ai_service import AITravelService
+
+    server = start_mock_server(**server_options)
+    client = OpenAI(base_url=server.url, api_key="mock-key")
+    # _build_messages does not touch the API client
+    builder = AITravelService.__new__(AITravelService)
+    samples = []
+    try:
+        for index in range(requests):
+            messages = builder._build_messages(_trip(index))
+            if layout == "legacy":
+                messages = _legacy_messages(messages)
+            start = time.perf_counter()
+            ttft = None
+            usage = None
+            stream = client.chat.completions.create(model="mock-model", messages=messages, stream=True,
+                                                    stream_options={"include_usage": True})
+            for chunk in stream:
+                if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+                    ttft = time.perf_counter() - start
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+            details = getattr(usage, "prompt_tokens_details", None)
+            samples.append((ttft or 0.0, usage.prompt_tokens, getattr(details, "cached_tokens", 0) or 0))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return samples
+
+def summarize(samples):
+    prompt_tokens = sum(sample[1] for sample in samples)
+    cached_tokens = sum(sample[2] for sample in samples)
+    ttfts = sorted(sample[0] for sample in samples)
+    return {
+        "cached_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+        "avg_prompt_tokens": prompt_tokens / len(samples),
+        "ttft_p50_ms": statistics.median(ttfts) * 1000,
+        "ttft_p95_ms": ttfts[min(len(ttfts) - 1, int(0.95 * len(ttfts)))] * 1000,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prompt prefix-cache benchmark against the mock server")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--ttft-ms", type=float, default=600)
+    parser.add_argument("--tokens-per-sec", type=float, default=5000)
+    parser.add_argument("--prefix-cache-block", type=int, default=64)
+    parser.add_argument("--min-cached-ratio", type=float, help="fail if the current layout caches less than this")
+    args = parser.parse_args(argv)
+
+    options = {"ttft_ms": args.ttft_ms, "tokens_per_sec": args.tokens_per_sec,
+               "prefix_cache_block": args.prefix_cache_block}
+    results = {layout: summarize(run_layout(layout, args.requests, **options)) for layout in ("legacy", "system_prefix")}
+
+    print(f"{'layout':<15} {'cached':>8} {'prompt tok':>11} {'ttft p50 ms':>12} {'ttft p95 ms':>12}")
+    for layout, result in results.items():
+        print(f"{layout:<15} {result['cached_ratio']:>8.1%} {result['avg_prompt_tokens']:>11.0f} "
+              f"{result['ttft_p50_ms']:>12.1f} {result['ttft_p95_ms']:>12.1f}")
+
+    if args.min_cached_ratio is not None and results["system_prefix"]["cached_ratio"] < args.min_cached_ratio:
+        print(f"FAIL: cached ratio {results['system_prefix']['cached_ratio']:.1%} "
+              f"is below {args.min_cached_ratio:.1%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
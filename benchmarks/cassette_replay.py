@@ -0,0 +1,115 @@
+"""Check that recorded LLM traffic replays offline and gives identical results
+
+    python -m benchmarks.cassette_replay              # record against the mock server, then replay
+    python -m benchmarks.cassette_replay --speed 1    # replay at the recorded pace
+
+A child process generates a plain itinerary, a raced (streamed) itinerary
+and a refinement, then walks the UI through generate, every day and every
+export format. The first run records through the mock LLM server with
+TRIPGENIE_CASSETTE=record. The mock server is then stopped, and a second
+run replays the same work with TRIPGENIE_CASSETTE=replay against an
+address where nothing listens. Exits 1 if any result differs, a request
+was not recorded, or the API key ended up in the cassette.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "sk-cassette-check-secret"
+FAST_MODEL, SLOW_MODEL = "mock-fast", "mock-slow"
+TRIP = {
+    "city": "Lisbon", "days": 3, "num_people": 2, "group_type": "Couple", "budget": "Mid-range",
+    "travel_pace": "Medium", "accessibility": "None", "food_preferences": ["Local Cuisine"],
+    "interests": ["Art & Culture", "Museums"],
+}
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def run_workload():
+    """Child side: exercise every kind of provider call and print result digests as JSON"""
+    from ai_service import AITravelService
+    from benchmarks.rerun_budget import run_flow
+    from utils import calculate_total_cost
+
+    timings, digests = {}, {}
+    start = time.perf_counter()
+    service = AITravelService(model=FAST_MODEL)
+    itinerary = service.generate_itinerary(TRIP, reuse=False)
+    digests["plain"] = _digest(itinerary)
+
+    # The slow contender is closed once the fast one wins, so it is never recorded and misses on replay
+    racer = AITravelService(race_models=[FAST_MODEL, SLOW_MODEL])
+    digests["race"] = _digest(racer.generate_itinerary(dict(TRIP, city="Porto"), reuse=False))
+
+    refined = service.refine_itinerary(itinerary, calculate_total_cost(itinerary), "Swap the first activity",
+                                       TRIP, [])
+    digests["refine"] = _digest([refined["itinerary"], refined["total_cost"]])
+    timings["service_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run_flow(3, city="Seville")
+    timings["ui_flow_s"] = time.perf_counter() - start
+    print(json.dumps({"digests": digests, "timings": timings}))
+
+def _child(env):
+    result = subprocess.run([sys.executable, "-m", "benchmarks.cassette_replay", "--child"], cwd=ROOT,
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"workload failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record LLM traffic and check that replay matches")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay speed; 0 = instant, 1 = recorded pace")
+    parser.add_argument("--dir", help="cassette directory to keep (default: a temporary one)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        run_workload()
+        return 0
+
+    from benchmarks.mock_llm_server import start_mock_server
+
+    directory = args.dir or tempfile.mkdtemp(prefix="tripgenie-cassettes-")
+    env = dict(os.environ, TRIPGENIE_API_KEY=API_KEY, TRIPGENIE_MODEL_NAME=FAST_MODEL,
+               TRIPGENIE_CASSETTE_DIR=directory, TRIPGENIE_CASSETTE_SPEED=str(args.speed),
+               TRIPGENIE_GENERATION_LOG="", TRIPGENIE_RATE_LIMIT_BACKEND="off", TRIPGENIE_POI_INDEX="0",
+               TRIPGENIE_RACE_MODELS="", PYTHONPATH=ROOT)
+
+    server = start_mock_server(ttft_ms=300, model_ttft_ms={SLOW_MODEL: 5000})
+    try:
+        recorded = _child(dict(env, TRIPGENIE_CASSETTE="record", TRIPGENIE_API_BASE_URL=server.url))
+    finally:
+        server.shutdown()
+        server.server_close()
+    # Nothing listens on the discard port, so any request that escapes the cassette fails
+    replayed = _child(dict(env, TRIPGENIE_CASSETTE="replay", TRIPGENIE_API_BASE_URL="http://127.0.0.1:9/v1"))
+
+    files = [name for name in os.listdir(directory) if name.endswith(".json")]
+    leaked = [name for name in files if API_KEY in open(os.path.join(directory, name), encoding="utf-8").read()]
+    print(f"{len(files)} recordings in {directory}")
+    print(f"{'phase':<10} {'service s':>10} {'ui flow s':>10}")
+    for phase, result in (("record", recorded), ("replay", replayed)):
+        print(f"{phase:<10} {result['timings']['service_s']:>10.2f} {result['timings']['ui_flow_s']:>10.2f}")
+
+    failures = [f"{name}: recorded {digest}, replayed {replayed['digests'].get(name)}"
+                for name, digest in recorded["digests"].items() if replayed["digests"].get(name) != digest]
+    failures += [f"{name}: API key not redacted" for name in leaked]
+    if failures:
+        print("\nFAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nReplay matches the recording")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
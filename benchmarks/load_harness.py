@@ -0,0 +1,167 @@
+"""Drive concurrent simulated sessions through the app against the mock LLM server
+
+    python -m benchmarks.load_harness --sessions 8 --days 7 --ttft-ms 800
+
+Each session loads main.py through Streamlit's AppTest, generates an
+itinerary, expands every day, switches the data export format and resets.
+AppTest sessions share one process-wide Streamlit runtime, so every
+session runs in a fresh process of its own. The fake progress animation
+shown before generating is turned off (TRIPGENIE_PROGRESS_DELAY=0), so
+"generate" measures the app and the LLM rather than sleeps. Per-stage
+throughput and p50/p95/p99 latency are reported at the end.
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from benchmarks.mock_llm_server import start_mock_server
+
+STAGES = ["first_load", "generate", "expand", "export", "reset"]
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class _Recorder:
+    """Collects stage latencies and failures from all sessions"""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.failures = {stage: 0 for stage in STAGES}
+        self.errors = []
+
+    def add(self, session):
+        for stage, elapsed in session["samples"].items():
+            self.samples[stage].append(elapsed)
+        if session["failed"]:
+            self.failures[session["failed"]] += 1
+            self.errors.append(f"{session['failed']}: {session['error']}")
+
+def _run_session(days, city, timeout):
+    """Walk one simulated user through the full flow; runs in its own process
+
+    Returns {"samples": {stage: seconds}, "failed": stage or None, "error": text}.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+
+    def first_load():
+        at.run()
+        return not at.exception
+
+    def generate():
+        at.text_input[0].set_value(city)
+        end_date = at.date_input[0].value + timedelta(days=days)
+        at.date_input[1].set_value(end_date)
+        next(b for b in at.button if b.label == "Generate Elite Itinerary").click().run()
+        return bool(at.session_state.itinerary_generated) and not at.exception
+
+    def expand():
+        for label in [b.label for b in at.button if b.label.startswith("Day ")]:
+            next(b for b in at.button if b.label == label).click().run()
+        return not at.exception
+
+    def export():
+        for option in at.selectbox(key="export_format").options:
+            at.selectbox(key="export_format").set_value(option).run()
+        return not at.exception
+
+    def reset():
+        next(b for b in at.button if b.label == "Create New Journey").click().run()
+        return not at.session_state.itinerary_generated
+
+    session = {"samples": {}, "failed": None, "error": ""}
+    for stage, func in zip(STAGES, [first_load, generate, expand, export, reset]):
+        start = time.perf_counter()
+        try:
+            ok = func()
+        except Exception as e:
+            ok, session["error"] = False, f"{type(e).__name__}: {e}"
+        if not ok:
+            session["failed"] = stage
+            session["error"] = session["error"] or (at.exception[0].message if at.exception else "check failed")
+            break
+        session["samples"][stage] = time.perf_counter() - start
+    return session
+
+def run(sessions, concurrency, days, city="Paris", timeout=120, **server_options):
+    """Run the load test and return (stats per stage, wall time, mock server counters)"""
+    server = start_mock_server(**server_options)
+    os.environ["TRIPGENIE_API_BASE_URL"] = server.url
+    os.environ.setdefault("TRIPGENIE_API_KEY", "mock-key")
+    os.environ.setdefault("TRIPGENIE_MODEL_NAME", "mock-model")
+    # Every session asks for the same trip; keep reuse off so each one reaches the LLM
+    os.environ.setdefault("TRIPGENIE_ITINERARY_REUSE", "0")
+    os.environ.setdefault("TRIPGENIE_PROGRESS_DELAY", "0")
+
+    recorder = _Recorder()
+    start = time.perf_counter()
+    try:
+        # A fresh spawned process per session: one Streamlit runtime each, no threads inherited from this one
+        with ProcessPoolExecutor(max_workers=concurrency, mp_context=multiprocessing.get_context("spawn"),
+                                 max_tasks_per_child=1) as pool:
+            futures = [pool.submit(_run_session, days, city, timeout) for _ in range(sessions)]
+            for future in futures:
+                recorder.add(future.result())
+    finally:
+        server.shutdown()
+        server.server_close()
+    wall_time = time.perf_counter() - start
+
+    stats = {}
+    for stage in STAGES:
+        samples = recorder.samples[stage]
+        stats[stage] = {
+            "count": len(samples),
+            "failures": recorder.failures[stage],
+            "throughput_per_s": len(samples) / wall_time if wall_time else 0.0,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000
+        }
+    return stats, wall_time, dict(server.stats), recorder.errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load harness for TripGenie.AI")
+    parser.add_argument("--sessions", type=int, default=8, help="simulated sessions in total")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions running at once")
+    parser.add_argument("--days", type=int, default=3, help="trip length requested by each session")
+    parser.add_argument("--city", default="Paris")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun AppTest timeout in seconds")
+    parser.add_argument("--ttft-ms", type=float, default=500)
+    parser.add_argument("--tokens-per-sec", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--itinerary-file")
+    args = parser.parse_args()
+
+    stats, wall_time, server_stats, errors = run(
+        args.sessions, args.concurrency, args.days, args.city, args.timeout,
+        ttft_ms=args.ttft_ms, tokens_per_sec=args.tokens_per_sec, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, itinerary_file=args.itinerary_file
+    )
+
+    print(f"{args.sessions} sessions, concurrency {args.concurrency}, {args.days}-day trips, wall time {wall_time:.1f}s")
+    print(f"{'stage':<12} {'ok':>5} {'fail':>5} {'per s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, row in stats.items():
+        print(f"{stage:<12} {row['count']:>5} {row['failures']:>5} {row['throughput_per_s']:>7.2f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    print(f"mock server: {server_stats}")
+    for error in errors[:5]:
+        print(f"  failed {error}")
+    return 1 if any(row["failures"] for row in stats.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""Local OpenAI-compatible chat-completions server for load testing
+
+    python -m benchmarks.mock_llm_server --port 8765 --ttft-ms 800 --tokens-per-sec 60
+
+Point the app at it with ``TRIPGENIE_API_BASE_URL=http://127.0.0.1:8765/v1``.
+Responses are synthetic itineraries sized from the prompt's destination and
+duration, or a canned file passed with ``--itinerary-file``. Usage reports
+``prompt_tokens_details.cached_tokens`` from a simulated provider prefix cache.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import synthetic_itinerary
+
+CHARS_PER_TOKEN = 4
+
+_CITY_PATTERN = re.compile(r"\*\*Destination\*\*:\s*(.+)")
+_DAYS_PATTERN = re.compile(r"\*\*Duration\*\*:\s*(\d+)")
+_ACTIVITY_POINTER = re.compile(r"^\s*(/days/\d+/activities/\d+) ", re.MULTILINE)
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the simulation settings and counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address, ttft_ms=500, tokens_per_sec=80, chunk_tokens=8,
+                 error_rate=0.0, rate_limit_rate=0.0, itinerary_file=None, seed=0, structured_output=True,
+                 model_ttft_ms=None, prefix_cache_block=64, prefix_cache_speedup=0.5):
+        super().__init__(address, _Handler)
+        self.ttft_ms = ttft_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.chunk_tokens = chunk_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.structured_output = structured_output
+        self.model_ttft_ms = dict(model_ttft_ms or {})
+        self.prefix_cache_block = prefix_cache_block
+        self.prefix_cache_speedup = prefix_cache_speedup
+        self._recent_prompts = deque(maxlen=256)
+        self.canned_response = None
+        if itinerary_file:
+            with open(itinerary_file, encoding="utf-8") as f:
+                self.canned_response = f.read()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "streamed": 0, "rate_limited": 0, "errors": 0, "cancelled": 0,
+                      "completion_tokens": 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def roll_failure(self):
+        """Return 429, 500 or None according to the configured rates"""
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._rng.random()
+            if roll < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 500
+        return None
+
+    def cached_prefix_tokens(self, prompt):
+        """Prompt tokens a prefix cache would serve: the longest shared prefix with a recent
+        prompt, rounded down to whole cache blocks (0 disables the simulation)"""
+        if not self.prefix_cache_block:
+            return 0
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, seen])) for seen in self._recent_prompts), default=0)
+            self._recent_prompts.append(prompt)
+        return shared // CHARS_PER_TOKEN // self.prefix_cache_block * self.prefix_cache_block
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def response_for(self, messages):
+        """Build the completion text for a chat request"""
+        if self.canned_response is not None:
+            return self.canned_response
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        if "You edit travel itineraries" in prompt:
+            return self.patch_for(prompt)
+        city_match = _CITY_PATTERN.search(prompt)
+        days_match = _DAYS_PATTERN.search(prompt)
+        city = city_match.group(1).strip() if city_match else "Mock City"
+        days = int(days_match.group(1)) if days_match else 3
+        itinerary = synthetic_itinerary(max(days, 1), city=city, seed=len(prompt))
+        if "Do not include `destination_info` or `local_tips`" in prompt:
+            itinerary.pop("destination_info", None)
+            itinerary.pop("local_tips", None)
+        return json.dumps(itinerary, ensure_ascii=False)
+
+    def patch_for(self, prompt):
+        """A refinement answer: swap the first outlined activity for an outdoor one"""
+        pointer = _ACTIVITY_POINTER.search(prompt)
+        operations = []
+        if pointer:
+            operations.append({"op": "replace", "path": pointer.group(1), "value": {
+                "title": "Riverside Walk", "description": "An easy walk along the river", "location": "Riverfront",
+                "start_time": "9:00 AM", "end_time": "10:30 AM", "cost": "₹0", "category": "outdoor",
+                "insider_tip": "Go early for the light",
+            }})
+        return json.dumps({"operations": operations, "message": "Swapped in a riverside walk."})
+
+def start_mock_server(host="127.0.0.1", port=0, **options):
+    """Start a MockLLMServer on a background thread and return it"""
+    server = MockLLMServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True)
+    thread.start()
+    return server
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.server.stats)
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+
+        if request.get("response_format") and not server.structured_output:
+            self._send_json(400, {"error": {"message": "response_format is not supported by this model",
+                                            "type": "invalid_request_error"}})
+            return
+
+        failure = server.roll_failure()
+        if failure == 429:
+            self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                            {"Retry-After": "1"})
+            return
+        if failure == 500:
+            self._send_json(500, {"error": {"message": "Injected upstream error", "type": "server_error"}})
+            return
+
+        messages = request.get("messages", [])
+        content = server.response_for(messages)
+        prompt_tokens = math.ceil(sum(len(str(m.get("content", ""))) for m in messages) / CHARS_PER_TOKEN)
+        # Messages are serialized in order, so a stable leading system message forms a shared prefix
+        cached_tokens = min(server.cached_prefix_tokens(
+            "".join(f"<{m.get('role')}>{m.get('content', '')}" for m in messages)), prompt_tokens)
+        completion_tokens = math.ceil(len(content) / CHARS_PER_TOKEN)
+        server.count("completion_tokens", completion_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = request.get("model", "mock-model")
+
+        # Cached prefix tokens skip prefill, which shortens time to first token
+        ttft_ms = server.model_ttft_ms.get(model, server.ttft_ms)
+        time.sleep(ttft_ms * (1 - server.prefix_cache_speedup * cached_tokens / max(prompt_tokens, 1)) / 1000)
+        if request.get("stream"):
+            server.count("streamed")
+            try:
+                self._stream(completion_id, model, content, usage, request)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client cancelled the stream, e.g. a race loser
+                server.count("cancelled")
+        else:
+            time.sleep(completion_tokens / server.tokens_per_sec)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage
+            })
+
+    def _stream(self, completion_id, model, content, usage, request):
+        """Send the completion as server-sent events at the configured token rate"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None, extra=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            chunk.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        chunk_chars = self.server.chunk_tokens * CHARS_PER_TOKEN
+        delay = self.server.chunk_tokens / self.server.tokens_per_sec
+        event({"role": "assistant", "content": ""})
+        for start in range(0, len(content), chunk_chars):
+            event({"content": content[start:start + chunk_chars]})
+            time.sleep(delay)
+        include_usage = (request.get("stream_options") or {}).get("include_usage")
+        event({}, "stop")
+        if include_usage:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=500, help="delay before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=80, help="completion token rate")
+    parser.add_argument("--chunk-tokens", type=int, default=8, help="tokens per streamed chunk")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests failing with 429")
+    parser.add_argument("--itinerary-file", help="serve this file's contents instead of a templated itinerary")
+    parser.add_argument("--seed", type=int, default=0, help="seed for failure injection")
+    parser.add_argument("--no-structured-output", action="store_true", help="reject requests with response_format")
+    parser.add_argument("--prefix-cache-block", type=int, default=64,
+                        help="simulated prefix cache granularity in tokens (0 disables)")
+    parser.add_argument("--prefix-cache-speedup", type=float, default=0.5,
+                        help="share of first-token delay saved for a fully cached prompt")
+    parser.add_argument("--model-ttft-ms", action="append", default=[], metavar="MODEL=MS",
+                        help="per-model first-token delay, for racing tests (repeatable)")
+    args = parser.parse_args()
+
+    server = MockLLMServer((args.host, args.port), ttft_ms=args.ttft_ms, tokens_per_sec=args.tokens_per_sec,
+                           chunk_tokens=args.chunk_tokens, error_rate=args.error_rate,
+                           rate_limit_rate=args.rate_limit_rate, itinerary_file=args.itinerary_file,
+                           seed=args.seed, structured_output=not args.no_structured_output,
+                           model_ttft_ms={model: float(ms) for model, ms in
+                                          (item.split("=", 1) for item in args.model_ttft_ms)},
+                           prefix_cache_block=args.prefix_cache_block,
+                           prefix_cache_speedup=args.prefix_cache_speedup)
+    print(f"Mock LLM server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Check rerun latency and element count of every UI interaction against budgets
+
+    python -m benchmarks.rerun_budget                      # check 3, 14 and 30-day trips
+    python -m benchmarks.rerun_budget --days 14 --slack 2  # one size, double every time budget
+    python -m benchmarks.rerun_budget --update-budgets     # rewrite budgets from this machine
+
+main.py is loaded through Streamlit's AppTest with AITravelService replaced
+by a stub that returns a synthetic itinerary, so only the app's own rerun
+cost is measured. Each interaction is timed: first load, generate, expanding
+every day, switching each data export format, the plain rerun a download
+click triggers, and reset. The progress animation before generating is
+switched off, so generate measures the app rather than its sleeps. Time
+budgets apply to the median of --repeats runs; the worst single rerun is
+reported but not checked, since one cold import or GC pause can double it.
+Element budgets cap the rendered tree after the interaction. Exits 1 when
+any budget is exceeded.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+# Keep the run self-contained: no generation log writes, no shared rate-limit state
+os.environ.setdefault("TRIPGENIE_GENERATION_LOG", "")
+os.environ.setdefault("TRIPGENIE_RATE_LIMIT_BACKEND", "off")
+
+from benchmarks.synthetic import synthetic_itinerary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SCRIPT = os.path.join(ROOT, "main.py")
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rerun_budgets.json")
+SIZES = [3, 14, 30]
+INTERACTIONS = ["first_load", "generate", "expand_day", "export_format", "download_rerun", "reset"]
+DOWNLOAD_BUTTONS = 4  # PDF, calendar, data and web page
+
+class StubTravelService:
+    """Stands in for AITravelService: returns a synthetic itinerary with no network, cache or ledger"""
+
+    def __init__(self, base_url=None, api_key=None, model=None, session_id=None, race_models=None):
+        self.session_id = session_id
+        self.last_usage = None
+        self.budget_warnings = []
+        self.reuse = None
+        self.stale = False
+        self.pending_refresh = None
+
+    def generate_itinerary(self, trip_params, reuse=True, deadline=None):
+        return synthetic_itinerary(trip_params['days'], city=trip_params['city'])
+
+def _install_stub():
+    # main.py imports AITravelService when Generate is clicked, so patching the module is enough
+    import ai_service
+    ai_service.AITravelService = StubTravelService
+    # Every rerun re-executes main.py's imports, so this also holds when config was imported earlier
+    import config
+    config.PROGRESS_STEP_DELAY = 0
+
+def count_elements(node):
+    """Elements and blocks below a node of the AppTest tree"""
+    return sum(1 + count_elements(child) for child in getattr(node, "children", {}).values())
+
+def run_flow(days, city="Lisbon", timeout=120):
+    """Walk one session through every interaction; returns {interaction: (rerun seconds list, elements)}"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+    results = {}
+
+    def timed(interaction, action):
+        start = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"{interaction} raised: {at.exception[0].message}")
+        samples, _ = results.get(interaction, ([], 0))
+        results[interaction] = (samples + [elapsed], count_elements(at._tree))
+
+    def generate():
+        at.text_input[0].set_value(city)
+        at.date_input[1].set_value(at.date_input[0].value + timedelta(days=days))
+        next(b for b in at.button if b.label == "Generate Elite Itinerary").click().run()
+
+    timed("first_load", at.run)
+    timed("generate", generate)
+    if not at.session_state.itinerary_generated:
+        raise RuntimeError("generate did not produce an itinerary")
+    for label in [b.label for b in at.button if b.label.startswith("Day ")]:
+        timed("expand_day", lambda label=label: next(b for b in at.button if b.label == label).click().run())
+    for option in at.selectbox(key="export_format").options:
+        timed("export_format", lambda option=option: at.selectbox(key="export_format").set_value(option).run())
+    # AppTest cannot click download buttons; each click costs one plain rerun of the page
+    for _ in range(DOWNLOAD_BUTTONS):
+        timed("download_rerun", at.run)
+    timed("reset", lambda: next(b for b in at.button if b.label == "Create New Journey").click().run())
+    if at.session_state.itinerary_generated:
+        raise RuntimeError("reset did not clear the itinerary")
+    return results
+
+def measure(days, repeats):
+    """Median and worst rerun time in ms and element count per interaction"""
+    runs = [run_flow(days) for _ in range(repeats)]
+    measured = {}
+    for interaction in INTERACTIONS:
+        medians = [statistics.median(run[interaction][0]) for run in runs]
+        measured[interaction] = {
+            "ms": statistics.median(medians) * 1000,
+            "worst_ms": statistics.median(max(run[interaction][0]) for run in runs) * 1000,
+            "elements": max(run[interaction][1] for run in runs),
+        }
+    return measured
+
+def check(measured, budgets, slack):
+    """Budget violations as readable strings"""
+    failures = []
+    for interaction, result in measured.items():
+        budget = budgets.get(interaction)
+        if budget is None:
+            failures.append(f"{interaction}: no budget")
+            continue
+        limit_ms = budget["ms"] * slack
+        if result["ms"] > limit_ms:
+            failures.append(f"{interaction}: median {result['ms']:.0f} ms > {limit_ms:.0f} ms")
+        if result["elements"] > budget["elements"]:
+            failures.append(f"{interaction}: {result['elements']} elements > {budget['elements']}")
+    return failures
+
+def _load_budgets(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rerun latency and element budgets for every UI interaction")
+    parser.add_argument("--days", type=int, action="append", help=f"trip sizes to check (default {SIZES})")
+    parser.add_argument("--repeats", type=int, default=3, help="full flows per size; the median is checked")
+    parser.add_argument("--slack", type=float, default=1.0, help="multiply every time budget, e.g. on slow CI")
+    parser.add_argument("--budgets", default=BUDGETS_PATH)
+    parser.add_argument("--update-budgets", action="store_true",
+                        help="write budgets of 1.5x this run's times and 1.1x its element counts")
+    args = parser.parse_args(argv)
+
+    _install_stub()
+    budgets = _load_budgets(args.budgets)
+    failures = []
+    for days in args.days or SIZES:
+        measured = measure(days, args.repeats)
+        size_budgets = budgets.get(str(days), {})
+        print(f"\n{days}-day trip")
+        print(f"{'interaction':<16} {'median ms':>10} {'worst ms':>9} {'budget ms':>10} {'elements':>9} {'budget':>7}")
+        for interaction, result in measured.items():
+            budget = size_budgets.get(interaction, {})
+            print(f"{interaction:<16} {result['ms']:>10.1f} {result['worst_ms']:>9.1f} "
+                  f"{budget.get('ms', 0) * args.slack:>10.0f} {result['elements']:>9} {budget.get('elements', 0):>7}")
+        if args.update_budgets:
+            budgets[str(days)] = {
+                interaction: {"ms": round(result["ms"] * 1.5 + 50),
+                              "elements": int(result["elements"] * 1.1) + 5}
+                for interaction, result in measured.items()
+            }
+        else:
+            failures.extend(f"{days} days, {failure}" for failure in check(measured, size_budgets, args.slack))
+
+    if args.update_budgets:
+        with open(args.budgets, "w", encoding="utf-8") as f:
+            json.dump(budgets, f, indent=2)
+            f.write("\n")
+        print(f"\nBudgets written to {args.budgets}")
+        return 0
+    if failures:
+        print("\nFAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nAll interactions within budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Profile cold start: import time per module and time to first render
+
+    python -m benchmarks.startup_profile --max-import-ms 1500 --max-first-render-ms 3000
+
+Every measurement runs in a fresh interpreter so nothing is already cached
+in sys.modules. Exits 1 when a threshold is exceeded or when a module that
+should load lazily (openai, reportlab by default) is imported at startup.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LAZY_MODULES = ["openai", "reportlab", "pdf_generator", "html_export"]
+
+_FIRST_RENDER_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file("main.py", default_timeout=60)
+at.run()
+done = time.perf_counter()
+print(json.dumps({
+    "streamlit_import_ms": (imported - start) * 1000,
+    "first_render_ms": (done - imported) * 1000,
+    "exception": bool(at.exception),
+    "loaded": sorted(name for name in sys.modules if "." not in name)
+}))
+"""
+
+def _python(args, **kwargs):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, **kwargs)
+
+def import_profile():
+    """Run `import main` under -X importtime and return (total_us, {module: (self_us, cumulative_us)})"""
+    result = _python(["-X", "importtime", "-c", "import main"])
+    if result.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{result.stderr}")
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules[name] = (int(self_us), int(cumulative_us))
+        if name == "main":
+            total = int(cumulative_us)
+    return total, modules
+
+def first_render():
+    """Time one AppTest run of main.py in a fresh interpreter"""
+    result = _python(["-c", _FIRST_RENDER_SCRIPT], timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"first render failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup profile for TripGenie.AI")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement (median is kept)")
+    parser.add_argument("--top", type=int, default=15, help="modules to list by cumulative import time")
+    parser.add_argument("--max-import-ms", type=float, help="fail if `import main` takes longer")
+    parser.add_argument("--max-first-render-ms", type=float, help="fail if the first script run takes longer")
+    parser.add_argument("--lazy", nargs="*", default=DEFAULT_LAZY_MODULES,
+                        help="top-level modules that must not load before first use")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    totals = []
+    modules = {}
+    for _ in range(args.runs):
+        total, modules = import_profile()
+        totals.append(total / 1000)
+    renders = [first_render() for _ in range(args.runs)]
+
+    report = {
+        "import_main_ms": statistics.median(totals),
+        "streamlit_import_ms": statistics.median(r["streamlit_import_ms"] for r in renders),
+        "first_render_ms": statistics.median(r["first_render_ms"] for r in renders),
+        "first_render_exception": any(r["exception"] for r in renders),
+        "eagerly_loaded": sorted(set(args.lazy) & set(renders[-1]["loaded"])),
+        "top_modules": [
+            {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][1])
+            if "." not in name
+        ][:args.top]
+    }
+
+    failures = []
+    if args.max_import_ms is not None and report["import_main_ms"] > args.max_import_ms:
+        failures.append(f"import main took {report['import_main_ms']:.0f} ms (limit {args.max_import_ms:.0f} ms)")
+    if args.max_first_render_ms is not None and report["first_render_ms"] > args.max_first_render_ms:
+        failures.append(f"first render took {report['first_render_ms']:.0f} ms (limit {args.max_first_render_ms:.0f} ms)")
+    if report["eagerly_loaded"]:
+        failures.append(f"loaded before first use: {', '.join(report['eagerly_loaded'])}")
+    if report["first_render_exception"]:
+        failures.append("first render raised an exception")
+    report["failures"] = failures
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import main:        {report['import_main_ms']:8.1f} ms")
+        print(f"import streamlit:   {report['streamlit_import_ms']:8.1f} ms (AppTest harness)")
+        print(f"first render:       {report['first_render_ms']:8.1f} ms")
+        print(f"\n{'top-level module':<28} {'self ms':>9} {'cumulative ms':>14}")
+        for row in report["top_modules"]:
+            print(f"{row['module']:<28} {row['self_ms']:>9.1f} {row['cumulative_ms']:>14.1f}")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
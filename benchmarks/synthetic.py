@@ -0,0 +1,85 @@
+"""Deterministic synthetic itineraries for benchmarks"""
+
+import json
+import random
+
+_THEMES = ["Cultural Immersion", "Nature Escape", "Urban Adventure", "Heritage Trail",
+           "Food Safari", "Markets & Crafts", "Riverside Leisure", "Art & Architecture"]
+_CATEGORIES = ["culture", "food", "adventure", "shopping", "sightseeing", "nightlife"]
+_TITLES = ["Old Town Walk", "Spice Market Tour", "Sunset Boat Ride", "Museum of History",
+           "Rooftop Dinner", "Botanical Garden", "Street Food Crawl", "Temple Visit",
+           "Craft Workshop", "Night Bazaar", "Hilltop Fort", "Beach Promenade"]
+_WORDS = ("explore vibrant local lanes historic courtyard views fresh seasonal dishes "
+          "guided stroll hidden gem artisans lively evening quiet morning panoramic "
+          "outdoor hiking swim beach traditional music colourful stalls").split()
+_TIMES = ["8:00 AM", "9:30 AM", "11:30 AM", "1:00 PM", "3:00 PM", "5:30 PM", "7:30 PM", "9:30 PM"]
+
+def _text(rng, length):
+    """Random sentence of roughly `length` characters"""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words).capitalize()[:max(length, 1)] + "."
+
+def synthetic_itinerary(days, activities_per_day=4, text_length=80, seed=0, city="Benchmark City"):
+    """Build an itinerary with the same shape the AI service returns"""
+    rng = random.Random(seed)
+    itinerary_days = []
+    for day in range(1, days + 1):
+        activities = []
+        activity_total = 0
+        for i in range(activities_per_day):
+            cost = rng.randrange(0, 3000, 50)
+            activity_total += cost
+            slot = i % (len(_TIMES) - 1)
+            activities.append({
+                "title": f"{rng.choice(_TITLES)} {day}.{i + 1}",
+                "description": _text(rng, text_length),
+                "location": f"{rng.choice(_TITLES)} District",
+                "start_time": _TIMES[slot],
+                "end_time": _TIMES[slot + 1],
+                "cost": f"₹{cost:,}",
+                "category": rng.choice(_CATEGORIES),
+                "insider_tip": _text(rng, text_length // 2)
+            })
+        meal_cost = rng.randrange(800, 4000, 100)
+        transport_cost = rng.randrange(200, 1500, 50)
+        itinerary_days.append({
+            "day": day,
+            "theme": rng.choice(_THEMES),
+            "activities": activities,
+            "meal_cost": f"₹{meal_cost:,}",
+            "transport_cost": f"₹{transport_cost:,}",
+            "daily_total": f"₹{activity_total + meal_cost + transport_cost:,}"
+        })
+    return {
+        "destination_info": {
+            "city": city,
+            "best_time_to_visit": "October to March for pleasant weather",
+            "local_currency": "Indian Rupee (INR)",
+            "language": "Hindi, English widely spoken"
+        },
+        "days": itinerary_days,
+        "local_tips": [_text(rng, text_length) for _ in range(3)]
+    }
+
+def synthetic_response_text(itinerary_json):
+    """Render an itinerary the way the model returns it, inside a JSON code fence"""
+    return "```json\n" + json.dumps(itinerary_json, indent=2, ensure_ascii=False) + "\n```"
+
+def synthetic_trip_params(days, city="Benchmark City"):
+    """Trip parameters as assembled by main.generate_itinerary"""
+    return {
+        'city': city,
+        'days': days,
+        'num_people': 2,
+        'group_type': "Couple",
+        'budget': "Mid-range",
+        'travel_pace': "Medium",
+        'accessibility': "None",
+        'food_preferences': ["Local Cuisine", "Street Food"],
+        'interests': ["Art & Culture", "Outdoor Activities"]
+    }
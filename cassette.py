@@ -0,0 +1,273 @@
+"""Record and replay LLM HTTP traffic so generation can run offline and deterministically
+
+    TRIPGENIE_CASSETTE=record streamlit run main.py   # call the provider and save every exchange
+    TRIPGENIE_CASSETTE=replay streamlit run main.py   # serve saved exchanges, no network
+    python cassette.py list                           # show what is recorded
+
+The OpenAI client gets an HTTP transport that sits below the SDK, so plain
+and streamed completions are captured byte for byte, chunk by chunk, along
+with each chunk's offset from the start of the request. Exchanges are keyed
+by method, path and request body (model, messages, options), stored one
+JSON file per key in CASSETTE_DIR, and headers in CASSETTE_REDACT_HEADERS
+are replaced before anything is written. Replay serves the chunks at once,
+or at the recorded pace scaled by CASSETTE_REPLAY_SPEED. A request with no
+recording gets a 404 that names the missing key rather than a network call.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from config import CASSETTE_DIR, CASSETTE_MODE, CASSETTE_REDACT_HEADERS, CASSETTE_REPLAY_SPEED
+from telemetry import increment, log_event
+
+MODES = ("off", "record", "replay", "auto")
+REDACTED = "<redacted>"
+FORMAT_VERSION = 1
+
+def _httpx():
+    # openai is built on httpx; some releases ship the API-compatible httpx2 fork instead
+    try:
+        import httpx
+    except ImportError:
+        import httpx2 as httpx
+    return httpx
+
+def request_key(method, path, body):
+    """Stable key for an exchange; JSON bodies are canonicalized so key order does not matter"""
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        body = body.decode("utf-8", "surrogateescape") if isinstance(body, bytes) else str(body or "")
+    return hashlib.sha256(f"{method.upper()} {path}\n{body}".encode("utf-8", "surrogateescape")).hexdigest()[:32]
+
+def redact_headers(headers, redact=CASSETTE_REDACT_HEADERS):
+    """Headers as a dict with credentials and cookies replaced"""
+    redact = {name.lower() for name in redact}
+    return {name: REDACTED if name.lower() in redact else value for name, value in headers.items()}
+
+def _text(chunk):
+    # Chunks can split a multi-byte character; surrogateescape keeps them lossless in JSON
+    return chunk.decode("utf-8", "surrogateescape")
+
+def _bytes(text):
+    return text.encode("utf-8", "surrogateescape")
+
+class CassetteStore:
+    """One JSON file per recorded exchange in a directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, exchange):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # Write then rename, so a concurrent replay never reads half a recording
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(exchange, f, indent=1, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def entries(self):
+        """Every recording, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        exchanges = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".json"):
+                exchange = self.load(name[:-len(".json")])
+                if exchange:
+                    exchanges.append(exchange)
+        return sorted(exchanges, key=lambda exchange: exchange.get("recorded_at", 0))
+
+def _make_transport_class():
+    httpx = _httpx()
+
+    class _RecordingStream(httpx.SyncByteStream):
+        """Passes the upstream body through and saves the exchange once it has been read to the end"""
+
+        def __init__(self, upstream, on_complete, started):
+            self._upstream = upstream
+            self._on_complete = on_complete
+            self._started = started
+            self._chunks = []
+            self._saved = False
+
+        def __iter__(self):
+            for chunk in self._upstream:
+                self._chunks.append([round(time.perf_counter() - self._started, 4), _text(chunk)])
+                yield chunk
+            self._save()
+
+        def _save(self):
+            if not self._saved:
+                self._saved = True
+                self._on_complete(self._chunks)
+
+        def close(self):
+            # The SDK stops reading at the SSE [DONE] event, so that also counts as complete; other
+            # streams closed early (e.g. a losing race contender) are not saved, as they would replay truncated
+            tail = "".join(text for _, text in self._chunks[-2:]).rstrip()
+            if tail.endswith("data: [DONE]"):
+                self._save()
+            self._upstream.close()
+
+    class _ReplayStream(httpx.SyncByteStream):
+        def __init__(self, chunks, speed, started):
+            self._chunks = chunks
+            self._speed = speed
+            self._started = started
+
+        def __iter__(self):
+            for offset, text in self._chunks:
+                if self._speed > 0:
+                    delay = offset / self._speed - (time.perf_counter() - self._started)
+                    if delay > 0:
+                        time.sleep(delay)
+                yield _bytes(text)
+
+    class CassetteTransport(httpx.BaseTransport):
+        """HTTP transport that records exchanges to, or replays them from, a CassetteStore"""
+
+        def __init__(self, mode, store, speed=0.0, redact=CASSETTE_REDACT_HEADERS):
+            if mode not in MODES or mode == "off":
+                raise ValueError(f"Cassette mode must be one of record, replay or auto, not {mode!r}")
+            self.mode = mode
+            self.store = store
+            self.speed = speed
+            self.redact = redact
+            self._upstream = httpx.HTTPTransport() if mode != "replay" else None
+
+        def handle_request(self, request):
+            body = request.read()
+            key = request_key(request.method, request.url.path, body)
+            if self.mode != "record":
+                exchange = self.store.load(key)
+                if exchange is not None:
+                    return self._replay(exchange)
+                if self.mode == "replay":
+                    return self._miss(request, key)
+            return self._record(request, key, body)
+
+        def _replay(self, exchange):
+            increment("tripgenie_cassette_requests_total", 1, "Cassette requests by outcome", outcome="replay")
+            response = exchange["response"]
+            headers = [(name, value) for name, value in response["headers"].items()
+                       if name.lower() not in ("content-length", "content-encoding", "transfer-encoding")]
+            return httpx.Response(response["status"], headers=headers,
+                                  stream=_ReplayStream(response["chunks"], self.speed, time.perf_counter()))
+
+        def _miss(self, request, key):
+            increment("tripgenie_cassette_requests_total", 1, "Cassette requests by outcome", outcome="miss")
+            log_event("cassette.miss", key=key, path=request.url.path)
+            # A 404 is not retried by the SDK, so a missing recording fails fast with this message
+            message = (f"No cassette recording for {request.method} {request.url.path} (key {key}). "
+                       f"Record it with TRIPGENIE_CASSETTE=record or auto.")
+            return httpx.Response(404, json={"error": {"message": message, "type": "cassette_miss"}})
+
+        def _record(self, request, key, body):
+            increment("tripgenie_cassette_requests_total", 1, "Cassette requests by outcome", outcome="record")
+            # Ask for an uncompressed body so recordings stay readable and replay needs no decoder
+            request.headers["accept-encoding"] = "identity"
+            started = time.perf_counter()
+            upstream = self._upstream.handle_request(request)
+            try:
+                request_body = json.loads(body)
+            except ValueError:
+                request_body = _text(body)
+
+            def save(chunks):
+                self.store.save(key, {
+                    "version": FORMAT_VERSION,
+                    "key": key,
+                    "recorded_at": time.time(),
+                    "duration_s": round(time.perf_counter() - started, 4),
+                    "request": {
+                        "method": request.method,
+                        "url": str(request.url.copy_with(query=None)),
+                        "headers": redact_headers(request.headers, self.redact),
+                        "body": request_body,
+                    },
+                    "response": {
+                        "status": upstream.status_code,
+                        "headers": redact_headers(upstream.headers, self.redact),
+                        "chunks": chunks,
+                    },
+                })
+                log_event("cassette.recorded", key=key, status=upstream.status_code, chunks=len(chunks))
+
+            return httpx.Response(upstream.status_code, headers=upstream.headers,
+                                  stream=_RecordingStream(upstream.stream, save, started),
+                                  extensions=upstream.extensions)
+
+        def close(self):
+            if self._upstream is not None:
+                self._upstream.close()
+
+    return CassetteTransport
+
+_transport_class = None
+
+def cassette_transport(mode=None, directory=None, speed=None):
+    """A CassetteTransport for the given (or configured) mode, or None when cassettes are off"""
+    global _transport_class
+    mode = mode or CASSETTE_MODE
+    if mode == "off":
+        return None
+    if _transport_class is None:
+        _transport_class = _make_transport_class()
+    return _transport_class(mode, CassetteStore(directory or CASSETTE_DIR),
+                            CASSETTE_REPLAY_SPEED if speed is None else speed)
+
+def cassette_http_client(mode=None, directory=None, speed=None):
+    """An HTTP client for OpenAI(http_client=...) that uses the cassette, or None when cassettes are off"""
+    transport = cassette_transport(mode, directory, speed)
+    if transport is None:
+        return None
+    from openai import DefaultHttpxClient
+    return DefaultHttpxClient(transport=transport)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect recorded LLM traffic")
+    parser.add_argument("--dir", default=CASSETTE_DIR, help="cassette directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="one line per recorded exchange")
+    show = commands.add_parser("show", help="print one recording")
+    show.add_argument("key")
+    args = parser.parse_args(argv)
+
+    store = CassetteStore(args.dir)
+    if args.command == "show":
+        exchange = store.load(args.key)
+        if exchange is None:
+            print(f"No recording {args.key} in {args.dir}")
+            return 1
+        print(json.dumps(exchange, indent=2, ensure_ascii=False))
+        return 0
+    entries = store.entries()
+    for exchange in entries:
+        body = exchange["request"]["body"]
+        model = body.get("model", "-") if isinstance(body, dict) else "-"
+        streamed = isinstance(body, dict) and body.get("stream", False)
+        print(f"{exchange['key']}  {exchange['response']['status']}  {model:<32} "
+              f"{'stream' if streamed else 'plain':<6} {len(exchange['response']['chunks']):>5} chunks "
+              f"{exchange['duration_s']:>7.2f}s")
+    print(f"{len(entries)} recordings in {args.dir}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,8 +2,14 @@
 
 import streamlit as st
 from datetime import datetime, timedelta
-from config import *
+from config import (
+    APP_TITLE, APP_ICON, TAGLINE, DEFAULT_DAYS, DEFAULT_PEOPLE, MAX_TRIP_DAYS, MAX_PEOPLE,
+    BUDGET_OPTIONS, PACE_OPTIONS, GROUP_OPTIONS, ACCESSIBILITY_OPTIONS, FOOD_PREFERENCES, COMPARE_MODES,
+    UNKNOWN_CITY_POLICY
+)
+from gazetteer import get_city_index
 from utils import extract_cost
+from telemetry import span
 
 def render_header():
     """Render the application header"""
@@ -26,7 +32,8 @@ def render_sidebar():
 
         # Trip Basics
         st.markdown('<div class="section-title">🌍 Trip Basics</div>', unsafe_allow_html=True)
-        city = st.text_input("Destination City", placeholder="e.g., Paris, Tokyo, New York")
+        city = st.text_input("Destination City", placeholder="e.g., Paris, Tokyo, New York", key="destination_city")
+        city, country_code, city_known, confirm_unknown_city = render_destination_check(city.strip())
         
         col1, col2 = st.columns(2)
         with col1:
@@ -69,19 +76,38 @@ def render_sidebar():
         accessibility = st.selectbox("Accessibility", ACCESSIBILITY_OPTIONS)
         food_pref = st.multiselect("Food Preferences", FOOD_PREFERENCES)
         
+        # Side-by-side comparison
+        compare_mode = st.selectbox("Compare", ["Off", *COMPARE_MODES],
+                                    help="Generate two or three versions of the trip side by side")
+        compare_field, compare_values = None, []
+        if compare_mode != "Off":
+            compare_field, options = COMPARE_MODES[compare_mode]
+            compare_values = st.multiselect(f"{compare_mode} to compare", options, default=options,
+                                            max_selections=3)
+        
         # Generate button
         generate_btn = st.button("Generate Elite Itinerary")
         
         # New journey button
-        if st.session_state.get('itinerary_generated', False):
+        if st.session_state.get('itinerary_generated', False) or st.session_state.get('comparison'):
             if st.button("Create New Journey"):
                 st.session_state.itinerary_generated = False
                 st.session_state.itinerary_data = None
                 st.session_state.expanded_days = set()
+                st.session_state.trip_details = None
+                st.session_state.pending_refresh = None
+                st.session_state.reuse_kind = None
+                st.session_state.comparison = None
+                st.session_state.refine_history = []
                 st.rerun()
+        else:
+            render_itinerary_import()
     
     return {
         'city': city,
+        'country_code': country_code,
+        'city_known': city_known,
+        'confirm_unknown_city': confirm_unknown_city,
         'start_date': start_date,
         'end_date': end_date,
         'days': days,
@@ -92,9 +118,94 @@ def render_sidebar():
         'group_type': group_type,
         'accessibility': accessibility,
         'food_preferences': food_pref,
+        'compare_field': compare_field,
+        'compare_values': compare_values,
         'generate_btn': generate_btn
     }
 
+def _use_suggested_city(name):
+    st.session_state.destination_city = name
+
+def render_destination_check(city):
+    """Show the gazetteer match for a destination, or suggestions when nothing matched
+
+    Returns (city, country_code, known, confirmed): the canonical name and country
+    when matched, and whether the user chose to plan an unknown destination anyway.
+    """
+    if not city:
+        return city, None, False, False
+    index = get_city_index()
+    match = index.lookup(city)
+    if match is not None:
+        st.caption(f"📍 {match.label} · {match.timezone} · {match.currency}")
+        return index.display_name(match), match.country_code, True, False
+    if not len(index):
+        # No gazetteer bundled, so there is nothing to check against
+        return city, None, True, False
+    
+    suggestions = index.suggest(city)
+    st.caption(f"🔎 \"{city}\" isn't in the city index." + (" Did you mean:" if suggestions else ""))
+    columns = st.columns(2)
+    for position, suggestion in enumerate(suggestions):
+        name = index.display_name(suggestion)
+        columns[position % 2].button(name, key=f"city_suggestion_{position}", on_click=_use_suggested_city,
+                                     args=(name,), use_container_width=True)
+    confirmed = False
+    if UNKNOWN_CITY_POLICY == "confirm":
+        confirmed = st.checkbox(f"Plan a trip to \"{city}\" anyway")
+    return city, None, False, confirmed
+
+def render_itinerary_import():
+    """Render the uploader that restores a previously exported itinerary"""
+    from itinerary_io import import_itinerary
+    from session_manager import store_itinerary
+    
+    uploaded = st.file_uploader("Import Itinerary", type=["json", "gz", "msgpack"])
+    if uploaded is None:
+        return
+    
+    # The uploader keeps its file across reruns, so only import each upload once
+    file_id = getattr(uploaded, 'file_id', f"{uploaded.name}:{uploaded.size}")
+    if st.session_state.get('imported_file_id') == file_id:
+        return
+    st.session_state.imported_file_id = file_id
+    
+    try:
+        itinerary_json, trip_details, total_cost = import_itinerary(uploaded.getvalue())
+    except ValueError as e:
+        st.error(f"Import failed: {e}")
+        return
+    
+    store_itinerary(itinerary_json, total_cost, trip_details)
+    st.rerun()
+
+def render_refresh_status():
+    """Note that a cached itinerary is shown and swap in the fresh one when it arrives"""
+    if st.session_state.get('pending_refresh') is None:
+        return
+    if st.session_state.get('reuse_kind') == "near":
+        st.warning("⏳ Showing an itinerary planned for this city with a different pace, group or interests "
+                   "while one matching your preferences is prepared...")
+    else:
+        st.info("⏳ Showing a recently planned itinerary for this trip while a fresh one is prepared...")
+    _watch_refresh()
+
+@st.fragment(run_every=2)
+def _watch_refresh():
+    from session_manager import store_itinerary
+    from utils import calculate_total_cost
+    
+    future = st.session_state.get('pending_refresh')
+    if future is None or not future.done():
+        return
+    st.session_state.pending_refresh = None
+    st.session_state.reuse_kind = None
+    # A failed refresh keeps the cached itinerary on screen
+    if future.exception() is None:
+        itinerary_json = future.result()
+        store_itinerary(itinerary_json, calculate_total_cost(itinerary_json))
+    st.rerun(scope="app")
+
 def render_welcome_screen():
     """Render the welcome screen"""
     st.markdown("""
@@ -228,6 +339,18 @@ def render_daily_itinerary(itinerary_json, num_people):
             
             st.markdown('</div>', unsafe_allow_html=True)
 
+def render_refinement_chat():
+    """Render earlier refinement turns and return a new request, if one was sent"""
+    st.markdown('<h2 class="section-header">Refine Your Journey</h2>', unsafe_allow_html=True)
+    for turn in st.session_state.get('refine_history', []):
+        with st.chat_message("user"):
+            st.write(turn['request'])
+        with st.chat_message("assistant"):
+            st.write(turn['message'])
+            days = ", ".join(str(day + 1) for day in turn['touched_days']) or "none"
+            st.caption(f"Days changed: {days} · {turn['tokens']:,} tokens · {turn['latency_s']:.1f}s")
+    return st.chat_input("Ask for a change, e.g. \"swap day 2 museum for something outdoors\"")
+
 def render_local_tips(itinerary_json, city):
     """Render local tips section"""
     if "local_tips" in itinerary_json:
@@ -267,20 +390,86 @@ def render_packing_list(city, days, itinerary_json):
         st.markdown("</div>", unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
+def _signed_inr(amount):
+    return f"{'+' if amount >= 0 else '-'}₹{abs(amount):,}"
+
+def render_comparison(comparison, city):
+    """Render comparison variants side by side with per-day cost differences"""
+    from session_manager import store_itinerary
+    from utils import day_totals
+
+    variants = comparison['variants']
+    ready = [variant for variant in variants if variant['itinerary'] is not None]
+    st.markdown('<h2 class="section-header">Compare Your Options</h2>', unsafe_allow_html=True)
+
+    # Destination facts are shared by every variant, so show them once
+    if ready and "destination_info" in ready[0]['itinerary']:
+        dest_info = ready[0]['itinerary']['destination_info']
+        st.markdown(f"""
+        <div class="overview-card">
+            <div class="card-title">Destination Information</div>
+            <div class="card-content">
+                <p><strong>Best Time to Visit:</strong> {dest_info.get('best_time_to_visit', 'N/A')} ·
+                <strong>Language:</strong> {dest_info.get('language', 'N/A')} ·
+                <strong>Currency:</strong> {dest_info.get('local_currency', 'N/A')}</p>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    baseline = ready[0] if ready else None
+    columns = st.columns(len(variants))
+    for column, variant in zip(columns, variants):
+        with column:
+            st.markdown(f'<div class="card-title">{variant["value"]}</div>', unsafe_allow_html=True)
+            if variant['error']:
+                st.error(variant['error'])
+                continue
+            delta = None
+            if variant is not baseline:
+                delta = f"{_signed_inr(variant['total_cost'] - baseline['total_cost'])} vs {baseline['value']}"
+            st.metric("Total", f"₹{variant['total_cost']:,}", delta=delta, delta_color="inverse")
+            for day in variant['itinerary'].get('days', []):
+                titles = ", ".join(activity.get('title', '') for activity in day.get('activities', []))
+                st.markdown(f"**Day {day['day']}: {day.get('theme', 'Exploration')}**  \n{titles}")
+            if st.button(f"Choose {variant['value']}", key=f"choose-{variant['value']}"):
+                store_itinerary(variant['itinerary'], variant['total_cost'],
+                                {comparison['field']: variant['value']})
+                st.session_state.comparison = None
+                st.rerun()
+
+    # Per-day cost table with each variant's difference from the first one
+    if len(ready) > 1:
+        totals = {variant['value']: day_totals(variant['itinerary']) for variant in ready}
+        rows = []
+        for day_num, base_cost in totals[baseline['value']].items():
+            row = {"Day": day_num, baseline['value']: f"₹{base_cost:,}"}
+            for variant in ready[1:]:
+                cost = totals[variant['value']].get(day_num, 0)
+                row[variant['value']] = f"₹{cost:,}"
+                row[f"Δ {variant['value']}"] = _signed_inr(cost - base_cost)
+            rows.append(row)
+        st.markdown('<h3 class="section-header">Cost per Day</h3>', unsafe_allow_html=True)
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    if ready:
+        render_local_tips(ready[0]['itinerary'], city)
+
 def render_export_options(itinerary_json, num_people, city, start_date, end_date, total_cost):
     """Render export options"""
-    import json
     from pdf_generator import create_professional_pdf
+    from html_export import create_static_html
+    from itinerary_io import EXPORT_FORMATS, export_itinerary
     from utils import create_calendar_file
     
     st.markdown('<h2 class="section-header">Export Your Journey</h2>', unsafe_allow_html=True)
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         # PDF Export
         try:
-            pdf_buffer = create_professional_pdf(itinerary_json, num_people, city, start_date, end_date, total_cost)
+            with span("export.pdf"):
+                pdf_buffer = create_professional_pdf(itinerary_json, num_people, city, start_date, end_date, total_cost)
             if pdf_buffer:
                 st.download_button(
                     "📄 Download PDF",
@@ -294,7 +483,8 @@ def render_export_options(itinerary_json, num_people, city, start_date, end_date
     
     with col2:
         # Calendar Export
-        cal_content = create_calendar_file(itinerary_json, start_date)
+        with span("export.ics"):
+            cal_content = create_calendar_file(itinerary_json, start_date)
         st.download_button(
             "📅 Download Calendar",
             data=cal_content,
@@ -304,12 +494,35 @@ def render_export_options(itinerary_json, num_people, city, start_date, end_date
         )
     
     with col3:
-        # JSON Export
-        json_content = json.dumps(itinerary_json, indent=2)
+        # Data Export
+        data_format = st.selectbox("Data format", list(EXPORT_FORMATS), key="export_format",
+                                   label_visibility="collapsed")
+        extension, mime = EXPORT_FORMATS[data_format]
+        trip_details = {
+            'city': city,
+            'start_date': start_date,
+            'end_date': end_date,
+            'days': (end_date - start_date).days,
+            'num_people': num_people
+        }
+        with span("export.data", format=data_format):
+            data_content = export_itinerary(itinerary_json, trip_details, data_format)
         st.download_button(
             "📋 Download Data",
-            data=json_content,
-            file_name=f"{city}_itinerary.json",
-            mime="application/json",
+            data=data_content,
+            file_name=f"{city}_itinerary{extension}",
+            mime=mime,
+            use_container_width=True
+        )
+    
+    with col4:
+        # Static HTML Export
+        with span("export.html"):
+            html_content = create_static_html(itinerary_json, num_people, city, start_date, end_date, total_cost)
+        st.download_button(
+            "🌐 Download Web Page",
+            data=html_content,
+            file_name=f"{city}_itinerary.html",
+            mime="text/html",
             use_container_width=True
         )
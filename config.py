@@ -3,16 +3,75 @@
 import os
 from datetime import datetime, timedelta
 
-# API Configuration
-API_KEY = 'add your open ai api key here'
-API_BASE_URL = "https://openrouter.ai/api/v1"
-MODEL_NAME = "add the model you want to use " #deepseek/deepseek-chat-v3-0324:free is the model used by me
+# API Configuration (environment variables override these, e.g. to point at a local mock server)
+API_KEY = os.environ.get("TRIPGENIE_API_KEY", 'add your open ai api key here')
+API_BASE_URL = os.environ.get("TRIPGENIE_API_BASE_URL", "https://openrouter.ai/api/v1")
+MODEL_NAME = os.environ.get("TRIPGENIE_MODEL_NAME", "add the model you want to use ") #deepseek/deepseek-chat-v3-0324:free is the model used by me
+# "auto" sends a JSON schema response_format and falls back when the endpoint rejects it; "on" / "off" force it
+STRUCTURED_OUTPUT = os.environ.get("TRIPGENIE_STRUCTURED_OUTPUT", "auto")
+# Comma-separated models to race on every generation, e.g. "deepseek/deepseek-chat-v3-0324:free,qwen/qwen3-32b:free"
+RACE_MODELS = [model.strip() for model in os.environ.get("TRIPGENIE_RACE_MODELS", "").split(",") if model.strip()]
+
+# LLM Traffic Cassettes (record provider exchanges once, replay them offline, e.g. in CI)
+CASSETTE_MODE = os.environ.get("TRIPGENIE_CASSETTE", "off")  # off, record, replay, or auto (replay, record misses)
+CASSETTE_DIR = os.environ.get(
+    "TRIPGENIE_CASSETTE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "cassettes")
+)
+CASSETTE_REPLAY_SPEED = float(os.environ.get("TRIPGENIE_CASSETTE_SPEED", "0"))  # 0 = instant, 1 = recorded pace
+CASSETTE_REDACT_HEADERS = (
+    "authorization", "api-key", "x-api-key", "cookie", "set-cookie", "openai-organization", "openai-project"
+)
+
+# Telemetry Configuration
+METRICS_ENABLED = os.environ.get("TRIPGENIE_METRICS", "0") == "1"
+METRICS_HOST = os.environ.get("TRIPGENIE_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("TRIPGENIE_METRICS_PORT", "9464"))
+
+# Usage Accounting
+# USD per million tokens; "default" applies to models not listed. "cached_prompt" prices
+# prompt tokens served from the provider's prefix cache (defaults to the "prompt" price)
+MODEL_PRICING = {
+    "default": {"prompt": 0.0, "completion": 0.0},
+    "deepseek/deepseek-chat-v3-0324": {"prompt": 0.27, "cached_prompt": 0.07, "completion": 1.10},
+}
+# Token budgets per scope; "warn" shows a notice, "limit" refuses new generations (None disables)
+USAGE_BUDGETS = {
+    "session": {"warn": 40000, "limit": 120000},
+    "day": {"warn": 2000000, "limit": None},
+    "destination": {"warn": None, "limit": None},
+}
+USAGE_HISTORY_SIZE = 500  # Recent per-call usage records kept in memory
+USAGE_SESSION_LIMIT = 10000  # Sessions with running totals; the longest idle are dropped first
+USAGE_DESTINATION_LIMIT = 2000  # Destinations with running totals
+
+# Headless API Server
+API_SERVER_HOST = os.environ.get("TRIPGENIE_API_SERVER_HOST", "127.0.0.1")
+API_SERVER_PORT = int(os.environ.get("TRIPGENIE_API_SERVER_PORT", "8080"))
+API_SERVER_TOKEN = os.environ.get("TRIPGENIE_API_SERVER_TOKEN", "")  # Bearer token required when set
+API_MAX_CONCURRENT_GENERATIONS = int(os.environ.get("TRIPGENIE_API_MAX_CONCURRENT", "8"))
+API_ITINERARY_STORE_PATH = os.environ.get(
+    "TRIPGENIE_API_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "api_itineraries.sqlite3")
+)  # Every worker must use the same path so any of them can serve get/export
+API_ITINERARY_STORE_SIZE = 1000  # Newest generated itineraries kept for get/export
+
+# Shared Rate Limits (one upstream budget for every worker process on the host)
+RATE_LIMIT_BACKEND = os.environ.get("TRIPGENIE_RATE_LIMIT_BACKEND", "sqlite")  # sqlite, file, memory or off
+RATE_LIMIT_PATH = os.environ.get(
+    "TRIPGENIE_RATE_LIMIT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "rate_limit")
+)  # Every process must use the same path; the sqlite backend adds .sqlite3, the file backend .json
+RATE_LIMIT_RPM = float(os.environ.get("TRIPGENIE_RATE_LIMIT_RPM", "120"))  # Provider requests per minute; 0 = no limit
+RATE_LIMIT_BURST = int(os.environ.get("TRIPGENIE_RATE_LIMIT_BURST", "20"))  # Requests allowed back to back
+RATE_LIMIT_MAX_CONCURRENT = int(os.environ.get("TRIPGENIE_RATE_LIMIT_CONCURRENT", "16"))  # Open calls; 0 = no cap
+RATE_LIMIT_TIMEOUT = 120  # Seconds a call waits for a slot before failing
+RATE_LIMIT_LEASE_TTL = 300  # Slots held longer than this (e.g. by a killed process) are reclaimed
 
 # App Configuration
 APP_TITLE = "TripGenie.AI"
 APP_ICON = "✈️"
 PAGE_TITLE = "TripGenie.AI"
 TAGLINE = "AI-Powered Travel Experience Generator"
+# Seconds per step of the 100-step progress animation shown before generating; 0 skips it
+PROGRESS_STEP_DELAY = float(os.environ.get("TRIPGENIE_PROGRESS_DELAY", "0.02"))
 
 # Budget Guidelines (Per Person Per Day in INR)
 BUDGET_RANGES = {
@@ -27,12 +86,93 @@ DEFAULT_PEOPLE = 2
 MAX_TRIP_DAYS = 30
 MAX_PEOPLE = 20
 
+# Admin Diagnostics
+ADMIN_TOKEN = os.environ.get("TRIPGENIE_ADMIN_TOKEN")  # The admin page stays locked until this is set
+TRACEMALLOC_ENABLED = os.environ.get("TRIPGENIE_TRACEMALLOC") == "1"  # Trace allocations from startup
+TRACEMALLOC_FRAMES = 10
+DIAGNOSTICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "diagnostics")
+
+# Cache Configuration
+HTML_EXPORT_CACHE_SIZE = 64  # Rendered static HTML exports
+DATA_EXPORT_CACHE_SIZE = 64  # Encoded data exports per format
+
+# Itinerary Reuse
+ITINERARY_REUSE_ENABLED = os.environ.get("TRIPGENIE_ITINERARY_REUSE", "1") != "0"
+ITINERARY_CACHE_SIZE = 256  # Trip profiles (city + preferences), each holding itineraries by length
+ITINERARY_CACHE_TTL = 24 * 60 * 60  # Seconds before a cached itinerary is no longer reused
+ITINERARY_SOFT_TTL = 6 * 60 * 60  # Older hits are served and then refreshed in the background
+ITINERARY_STALE_TTL = 7 * 24 * 60 * 60  # Expired entries kept this long as a fallback for slow generations
+# Seconds to wait for the provider before serving a stale or near-match itinerary (0 waits indefinitely)
+GENERATION_DEADLINE = float(os.environ.get("TRIPGENIE_GENERATION_DEADLINE", "45"))
+GENERATION_WORKERS = 8  # Threads running generations and background refreshes
+CITY_INFO_CACHE_SIZE = 512  # Cities whose destination_info/local_tips are kept
+CITY_INFO_TTL = 30 * 24 * 60 * 60  # City-level facts change slowly
+CITY_ALIASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "city_aliases.json")
+
+# Destination Validation (offline city gazetteer checked before any generation)
+CITY_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.tsv")
+COUNTRIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "countries.tsv")
+# What to do with a destination the gazetteer does not know: "confirm" asks first, "block" refuses, "allow" proceeds
+UNKNOWN_CITY_POLICY = os.environ.get("TRIPGENIE_UNKNOWN_CITY", "confirm")
+CITY_SUGGESTIONS = 4  # Corrections and completions offered for an unknown destination
+
+# Conversational Refinement
+REFINE_HISTORY_TURNS = 4  # Earlier requests repeated to the model as context
+REFINE_MAX_TOKENS = 1500  # Patches are short; a full itinerary is never regenerated
+
+# Generation Log (requests and generation results, written by a background thread)
+GENERATION_LOG_DIR = os.environ.get(
+    "TRIPGENIE_GENERATION_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "generations")
+)  # Empty string disables the log
+GENERATION_LOG_QUEUE_SIZE = 1000  # Records waiting to be written; more are dropped and counted
+GENERATION_LOG_BATCH_SIZE = 100  # Records per compressed write
+GENERATION_LOG_FLUSH_INTERVAL = 1.0  # Seconds the writer waits for a batch to fill
+GENERATION_LOG_MAX_BYTES = 32 * 1024 * 1024  # Compressed segment size before starting a new one
+GENERATION_LOG_MAX_AGE = 60 * 60  # Seconds before starting a new segment
+GENERATION_LOG_RETENTION_DAYS = 30  # Older segments are deleted on rotation
+
+# Cache Pre-warming
+PREWARM_ENABLED = os.environ.get("TRIPGENIE_PREWARM") == "1"
+PREWARM_OFF_PEAK_HOURS = (2, 6)  # Local [start, end) hours; may wrap midnight, e.g. (22, 5)
+PREWARM_INTERVAL = 6 * 60 * 60  # Seconds between runs inside the window
+PREWARM_LOOKBACK_DAYS = 7
+PREWARM_TOP_N = 20  # Most requested (city, days, budget, pace) combinations to keep warm
+PREWARM_PEAK_HOUR_COUNT = 4  # Busiest hours of the day used for the coverage report
+PREWARM_EXPIRY_WINDOW = 4 * 60 * 60  # Regenerate entries expiring within this many seconds
+PREWARM_REQUESTS_PER_MINUTE = 6
+PREWARM_TOKEN_BUDGET = 200000  # Per run
+# One worker per host runs the job under a SQLite lease; "0" lets every worker warm its own cache
+PREWARM_SINGLE_RUNNER = os.environ.get("TRIPGENIE_PREWARM_SINGLE_RUNNER", "1") != "0"
+PREWARM_LEASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "prewarm")  # .sqlite3 is added
+# Warmed itineraries, published by the lease holder and copied into every worker's cache
+PREWARM_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "prewarm_itineraries.sqlite3")
+PREWARM_SYNC_INTERVAL = 60  # Seconds between each worker's checks for newly warmed itineraries
+PREWARM_LEASE_TTL = 30 * 60  # Seconds after the last renewal before another worker may take over; outlasts a run
+
+# POI Index
+POI_INDEX_ENABLED = os.environ.get("TRIPGENIE_POI_INDEX", "1") != "0"
+POI_INDEX_PATH = os.environ.get(
+    "TRIPGENIE_POI_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "poi_index.sqlite3")
+)
+# Activity cost bands in INR as (min, max); None means no upper bound
+PRICE_BANDS = {
+    "free": (0, 0),
+    "budget": (1, 1000),
+    "mid-range": (1001, 3000),
+    "premium": (3001, None),
+}
+
 # Travel Options
 BUDGET_OPTIONS = ["Budget", "Mid-range", "Luxury"]
 PACE_OPTIONS = ["Relaxed", "Medium", "Packed"]
 GROUP_OPTIONS = ["Solo", "Couple", "Family", "Friends"]
 ACCESSIBILITY_OPTIONS = ["None", "Wheelchair Access", "Visual Assistance", "Hearing Assistance"]
 FOOD_PREFERENCES = ["Vegetarian", "Vegan", "Local Cuisine", "Street Food", "Fine Dining"]
+# Side-by-side comparison modes: label -> (trip parameter, options to generate)
+COMPARE_MODES = {
+    "Budget tiers": ("budget", BUDGET_OPTIONS),
+    "Travel pace": ("travel_pace", PACE_OPTIONS),
+}
 
 # Activity Categories
 ACTIVITY_CATEGORIES = [
@@ -0,0 +1,64 @@
+"""Offline destination name normalization for TripGenie.AI"""
+
+import json
+import os
+import re
+import unicodedata
+from config import CITY_ALIASES_PATH
+
+_alias_index = None
+
+def fold_name(text):
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def _load_alias_index():
+    """Map folded names and aliases to canonical city names, loaded once"""
+    global _alias_index
+    if _alias_index is None:
+        index = {}
+        if os.path.exists(CITY_ALIASES_PATH):
+            with open(CITY_ALIASES_PATH, encoding="utf-8") as f:
+                for canonical, aliases in json.load(f).items():
+                    index[fold_name(canonical)] = canonical
+                    for alias in aliases:
+                        index.setdefault(fold_name(alias), canonical)
+        _alias_index = index
+    return _alias_index
+
+def resolve_city(name, country_code=None):
+    """The gazetteer City a destination name refers to, or None; country_code settles shared names"""
+    if not name:
+        return None
+    # Imported here: the gazetteer folds names with fold_name from this module
+    from gazetteer import get_city_index
+    return get_city_index().lookup(name, country_code)
+
+def canonical_city(name, country_code=None):
+    """Return the canonical display name for a destination, e.g. 'NYC' -> 'New York'
+
+    Known cities get the gazetteer's name, qualified by country when another
+    city shares it ('Lagos, Portugal'). Other names only fold alias-table
+    spellings and otherwise keep every part, so 'Paris, Texas' stays itself.
+    """
+    if not name:
+        return name
+    city = resolve_city(name, country_code)
+    if city is not None:
+        from gazetteer import get_city_index
+        return get_city_index().display_name(city)
+    index = _load_alias_index()
+    folded = fold_name(name)
+    if folded in index:
+        return index[folded]
+    return " ".join(word[:1].upper() + word[1:] for word in name.split())
+
+def city_key(name, country_code=None):
+    """Cache key for a destination: gazetteer name and country ('lagos|pt'), else the folded canonical name"""
+    city = resolve_city(name, country_code)
+    if city is not None:
+        return f"{fold_name(city.name)}|{city.country_code.lower()}"
+    return fold_name(canonical_city(name) or "")
@@ -0,0 +1,177 @@
+"""Memory and runtime diagnostics for the admin page
+
+Tracks live Streamlit sessions so their state can be sized from another
+session, wraps tracemalloc, and summarizes stage latency histograms.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from config import DIAGNOSTICS_DIR, TRACEMALLOC_ENABLED, TRACEMALLOC_FRAMES
+from telemetry import STAGE_HISTOGRAM, read_gauges, registered_caches, snapshot
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def track_session():
+    """Remember the current session's state so the admin page can size it; call once per rerun"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    now = time.time()
+    with _sessions_lock:
+        entry = _sessions.get(ctx.session_id)
+        if entry is None:
+            # A weak reference so a closed session's state is not kept alive by the registry
+            entry = _sessions[ctx.session_id] = {"state": weakref.ref(ctx.session_state), "first_seen": now,
+                                                 "reruns": 0}
+        entry["last_seen"] = now
+        entry["reruns"] += 1
+
+def _is_active(session_id):
+    try:
+        from streamlit.runtime import Runtime
+        return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
+    except Exception:
+        return True
+
+def deep_sizeof(obj, _seen=None):
+    """Approximate bytes reachable from obj, counting shared objects once"""
+    seen = set() if _seen is None else _seen
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        try:
+            total += sys.getsizeof(item)
+        except TypeError:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif isinstance(item, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        elif hasattr(item, "__dict__") and not isinstance(item, type):
+            stack.append(vars(item))
+    return total
+
+def live_sessions():
+    """Per-session state size by key, largest sessions first; drops sessions that have ended"""
+    with _sessions_lock:
+        entries = list(_sessions.items())
+    rows = []
+    for session_id, entry in entries:
+        state = entry["state"]()
+        if state is None or not _is_active(session_id):
+            with _sessions_lock:
+                _sessions.pop(session_id, None)
+            continue
+        values = state.filtered_state
+        keys = {key: deep_sizeof(value) for key, value in values.items()}
+        rows.append({
+            "session_id": session_id,
+            "first_seen": entry["first_seen"],
+            "last_seen": entry["last_seen"],
+            "reruns": entry["reruns"],
+            "total_bytes": sum(keys.values()),
+            "keys": dict(sorted(keys.items(), key=lambda item: -item[1])),
+        })
+    return sorted(rows, key=lambda row: -row["total_bytes"])
+
+def start_tracing(force=False):
+    """Start tracemalloc when TRIPGENIE_TRACEMALLOC=1 or when forced; safe to call on every rerun"""
+    if (force or TRACEMALLOC_ENABLED) and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    return tracemalloc.is_tracing()
+
+def stop_tracing():
+    tracemalloc.stop()
+
+def traced_memory():
+    """(current, peak) bytes allocated since tracing started, or None when not tracing"""
+    return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+
+def _filtered_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+def top_allocations(limit=20, group_by="lineno", snapshot_=None):
+    """Largest allocation sites as dicts with site, size and count"""
+    if snapshot_ is None:
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot_ = _filtered_snapshot()
+    rows = []
+    for stat in snapshot_.statistics(group_by)[:limit]:
+        frame = stat.traceback[0]
+        rows.append({"site": f"{frame.filename}:{frame.lineno}", "size_kib": stat.size / 1024, "count": stat.count})
+    return rows
+
+def dump_snapshot(limit=50, directory=DIAGNOSTICS_DIR):
+    """Write a raw tracemalloc snapshot plus a top-allocations report; returns (snapshot path, report text)"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+    snap = _filtered_snapshot()
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    snapshot_path = os.path.join(directory, f"tripgenie-{os.getpid()}-{stamp}.tracemalloc")
+    snap.dump(snapshot_path)
+
+    lines = [f"# Top {limit} allocation sites, pid {os.getpid()}, {stamp}",
+             "# load the full snapshot with tracemalloc.Snapshot.load()"]
+    for stat in snap.statistics("traceback")[:limit]:
+        lines.append(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks")
+        lines.extend(f"  {line}" for line in stat.traceback.format())
+    report = "\n".join(lines) + "\n"
+    with open(snapshot_path + ".txt", "w", encoding="utf-8") as f:
+        f.write(report)
+    return snapshot_path, report
+
+def cache_sizes():
+    """Size, capacity and hit rate of every registered cache"""
+    rows = []
+    for name, cache in sorted(registered_caches().items()):
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        rows.append({"cache": name, **stats, "hit_rate": stats["hits"] / lookups if lookups else None})
+    return rows
+
+def _quantile(bounds, counts, total, q):
+    # Bucket counts are cumulative; report the upper bound of the bucket holding the quantile
+    for bound, count in zip(bounds, counts):
+        if count >= q * total:
+            return bound
+    return float("inf")
+
+def stage_latencies():
+    """Count, mean and bucketed p50/p95 per traced stage (empty unless metrics are on)"""
+    rows = []
+    for key, hist in snapshot()["histograms"].get(STAGE_HISTOGRAM, {}).items():
+        if not hist["count"]:
+            continue
+        rows.append({
+            "stage": dict(key).get("stage", "?"),
+            "count": hist["count"],
+            "mean_ms": hist["sum"] / hist["count"] * 1000,
+            "p50_ms": _quantile(hist["buckets"], hist["counts"], hist["count"], 0.5) * 1000,
+            "p95_ms": _quantile(hist["buckets"], hist["counts"], hist["count"], 0.95) * 1000,
+        })
+    return sorted(rows, key=lambda row: -row["mean_ms"] * row["count"])
+
+def worker_pools():
+    """Queue depth and in-flight work of the background pools"""
+    gauges = read_gauges()
+    return {name: value for name, value in gauges.items()
+            if name in ("tripgenie_generation_queue_depth", "tripgenie_generations_inflight")}
@@ -0,0 +1,221 @@
+"""Offline city gazetteer for checking destinations before any generation
+
+    python gazetteer.py lisbn          # match, corrections and completions for a name
+
+Cities come from data/cities.tsv (name, country code, IANA timezone,
+population in thousands, alternate names) with countries and currencies
+from data/countries.tsv; the aliases in data/city_aliases.json are added
+as extra names. Names are folded the same way as cache keys, kept in one
+sorted list for prefix search with bisect, and every key and each of its
+one-character deletions is indexed so typo candidates are found with a few
+dictionary probes and confirmed with a bounded edit distance.
+"""
+
+import heapq
+import json
+import os
+import sys
+import time
+from bisect import bisect_left
+from typing import NamedTuple
+from config import CITY_ALIASES_PATH, CITY_GAZETTEER_PATH, CITY_SUGGESTIONS, COUNTRIES_PATH
+from destinations import fold_name
+from telemetry import log_event
+
+class City(NamedTuple):
+    """One gazetteer entry with the facts shown next to a matched destination"""
+    name: str
+    country: str
+    country_code: str
+    timezone: str
+    currency: str
+    population: int
+
+    @property
+    def label(self):
+        return f"{self.name}, {self.country}"
+
+def _deletes(key):
+    """Every string made by dropping one character from key"""
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+def _edit_distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it is certain to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+class CityIndex:
+    """Folded city names with exact lookup, prefix completion and typo correction
+
+    Cities are ordered by population, so a smaller ID is the more likely
+    destination and ties between names are settled by comparing IDs.
+    """
+
+    def __init__(self, entries, aliases=None, country_names=None):
+        """entries are (City, alternate names) pairs; aliases map canonical names to more alternates"""
+        entries = sorted(entries, key=lambda entry: -entry[0].population)
+        self._cities = [city for city, _ in entries]
+        names = {}
+        for city_id, city in enumerate(self._cities):
+            names.setdefault(fold_name(city.name), []).append(city_id)
+        alternates = [(city_id, extra) for city_id, (_, extra) in enumerate(entries)]
+        # city_aliases.json names canonical cities; each alias belongs to the largest city of that name
+        for canonical, extra in (aliases or {}).items():
+            ids = names.get(fold_name(canonical))
+            if ids:
+                alternates.append((min(ids), extra))
+        for city_id, city_alternates in alternates:
+            for alternate in city_alternates:
+                key = fold_name(alternate)
+                if key and city_id not in names.setdefault(key, []):
+                    names[key].append(city_id)
+        self._names = {key: tuple(sorted(ids)) for key, ids in names.items()}
+        self._keys = sorted(self._names)
+        deletes = {}
+        for key_index, key in enumerate(self._keys):
+            for variant in _deletes(key) | {key}:
+                deletes.setdefault(variant, []).append(key_index)
+        self._deletes = {variant: tuple(indices) for variant, indices in deletes.items()}
+        self._country_names = country_names or {}
+
+    def __len__(self):
+        return len(self._cities)
+
+    def __iter__(self):
+        return iter(self._cities)
+
+    def lookup(self, name, country_code=None):
+        """The city a name refers to, or None; "Granada, Nicaragua", "Paris, FR" or country_code pick by country"""
+        if not name or not name.strip():
+            return None
+        qualifier = None
+        ids = self._names.get(fold_name(name))
+        if not ids:
+            place, _, qualifier = name.rpartition(",")
+            ids = self._names.get(fold_name(place)) if place else None
+            if not ids:
+                return None
+            qualifier = fold_name(qualifier)
+        for city_id in ids:
+            city = self._cities[city_id]
+            if country_code and city.country_code != country_code:
+                continue
+            if qualifier is None or qualifier == city.country_code.lower() \
+                    or qualifier in self._country_names.get(city.country_code, ()):
+                return city
+        return None
+
+    def display_name(self, city):
+        """The city's name, with its country when another indexed city shares the name"""
+        return city.label if len(self._names.get(fold_name(city.name), ())) > 1 else city.name
+
+    def complete(self, prefix, limit=CITY_SUGGESTIONS):
+        """Largest cities with a name or alternate name starting with prefix"""
+        key = fold_name(prefix or "")
+        if not key:
+            return []
+        start = bisect_left(self._keys, key)
+        ids = set()
+        for index in range(start, len(self._keys)):
+            if not self._keys[index].startswith(key):
+                break
+            ids.update(self._names[self._keys[index]])
+        return [self._cities[city_id] for city_id in heapq.nsmallest(limit, ids)]
+
+    def correct(self, name, limit=CITY_SUGGESTIONS):
+        """Cities whose name is within one edit (two for longer names) of a misspelling, closest first"""
+        key = fold_name(name or "")
+        if len(key) < 3:
+            return []
+        max_distance = 1 if len(key) <= 5 else 2
+        variants = _deletes(key) | {key}
+        if max_distance > 1:
+            variants |= {shorter for variant in _deletes(key) for shorter in _deletes(variant)}
+        candidates = {index for variant in variants for index in self._deletes.get(variant, ())}
+        best = {}
+        for index in candidates:
+            distance = _edit_distance(key, self._keys[index], max_distance)
+            if distance <= max_distance:
+                for city_id in self._names[self._keys[index]]:
+                    best[city_id] = min(distance, best.get(city_id, distance))
+        ranked = heapq.nsmallest(limit, best, key=lambda city_id: (best[city_id], city_id))
+        return [self._cities[city_id] for city_id in ranked]
+
+    def suggest(self, name, limit=CITY_SUGGESTIONS):
+        """Corrections followed by completions, without repeats"""
+        suggestions = []
+        place = (name or "").rpartition(",")[0]
+        candidates = self.correct(name, limit) + self.complete(name, limit)
+        if place:
+            # "Austin, TX": the qualifier is not a country, so offer cities named like the place
+            candidates += self.complete(place, limit) + self.correct(place, limit)
+        for city in candidates:
+            if city not in suggestions:
+                suggestions.append(city)
+        return suggestions[:limit]
+
+def _rows(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                yield line.rstrip("\n").split("\t")
+
+def load_city_index(cities_path=CITY_GAZETTEER_PATH, countries_path=COUNTRIES_PATH, aliases_path=CITY_ALIASES_PATH):
+    """Build the index from the bundled data files; missing files give an empty index"""
+    started = time.perf_counter()
+    countries, country_names = {}, {}
+    if os.path.exists(countries_path):
+        for code, name, currency, *alternates in _rows(countries_path):
+            countries[code] = (name, currency)
+            country_names[code] = {fold_name(name)} | {fold_name(a) for a in "|".join(alternates).split("|") if a}
+    entries = []
+    if os.path.exists(cities_path):
+        for name, code, timezone, population, *alternates in _rows(cities_path):
+            country, currency = countries.get(code, (code, ""))
+            entries.append((City(name, country, code, timezone, currency, int(population) * 1000),
+                            [a for a in "|".join(alternates).split("|") if a]))
+    aliases = {}
+    if os.path.exists(aliases_path):
+        with open(aliases_path, encoding="utf-8") as f:
+            aliases = json.load(f)
+    index = CityIndex(entries, aliases, country_names)
+    log_event("gazetteer.loaded", cities=len(index), names=len(index._keys),
+              seconds=round(time.perf_counter() - started, 4))
+    return index
+
+_city_index = None
+
+def get_city_index():
+    """The bundled gazetteer, loaded once per process"""
+    global _city_index
+    if _city_index is None:
+        _city_index = load_city_index()
+    return _city_index
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python gazetteer.py <city name>")
+        return 2
+    index = get_city_index()
+    name = " ".join(argv)
+    match = index.lookup(name)
+    if match:
+        print(f"match: {match.label} · {match.timezone} · {match.currency} · pop {match.population:,}")
+    for title, cities in (("corrections", index.correct(name)), ("completions", index.complete(name))):
+        print(f"{title}: {', '.join(index.display_name(city) for city in cities) or '-'}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,296 @@
+"""Structured log of generation requests and results, written off the request thread
+
+    python generation_log.py summary             # records, outcomes and models per day
+    python generation_log.py export --since 7    # last week as plain JSONL on stdout
+
+Callers only put a record on a bounded queue; a daemon thread writes them
+in batches. Each batch is appended to the process's current segment as one
+gzip member, so a segment stays readable up to its last complete batch.
+Segments (generations-<start>-<pid>-<seq>.jsonl.gz in GENERATION_LOG_DIR)
+rotate by size and age and are deleted after GENERATION_LOG_RETENTION_DAYS.
+When the queue is full, records are dropped and counted rather than blocking.
+
+Two kinds of record share the log: "request" (every trip asked for, used to
+find popular trips for pre-warming) and "generation" (each model call with
+prompt hash, model, timings, usage, outcome and the final itinerary).
+"""
+
+import argparse
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from config import (
+    GENERATION_LOG_BATCH_SIZE, GENERATION_LOG_DIR, GENERATION_LOG_FLUSH_INTERVAL, GENERATION_LOG_MAX_AGE,
+    GENERATION_LOG_MAX_BYTES, GENERATION_LOG_QUEUE_SIZE, GENERATION_LOG_RETENTION_DAYS
+)
+from destinations import canonical_city
+from telemetry import increment, log_event, register_gauge
+
+_TRIP_FIELDS = ("country_code", "days", "num_people", "group_type", "budget", "travel_pace", "accessibility",
+                "food_preferences", "interests")
+_SEGMENT_PATTERN = "generations-*.jsonl.gz"
+
+class _Flush:
+    """Queue marker that is set once every record queued before it has been written"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+_STOP = object()
+
+class GenerationLogWriter:
+    """Bounded queue drained by a daemon thread into rotating gzip JSONL segments"""
+
+    def __init__(self, directory, queue_size=GENERATION_LOG_QUEUE_SIZE, batch_size=GENERATION_LOG_BATCH_SIZE,
+                 flush_interval=GENERATION_LOG_FLUSH_INTERVAL, max_bytes=GENERATION_LOG_MAX_BYTES,
+                 max_age=GENERATION_LOG_MAX_AGE, retention_days=GENERATION_LOG_RETENTION_DAYS):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention_days = retention_days
+        self.written = 0
+        self.dropped = 0
+        self.segments = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._segment = None
+        self._segment_started = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, record):
+        """Queue a record without blocking; returns False when it was dropped"""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            increment("tripgenie_generation_log_records_total", 1, "Generation log records by outcome",
+                      outcome="dropped")
+            return False
+        return True
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is on disk; returns False on timeout"""
+        if self._thread is None:
+            return True
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Write what is queued and stop the writer thread"""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tripgenie-generation-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._rotate_if_due()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if isinstance(item, dict)]
+            if records:
+                self._write(records)
+            for item in batch:
+                if isinstance(item, _Flush):
+                    item.done.set()
+            if any(item is _STOP for item in batch):
+                return
+
+    def _write(self, records):
+        payload = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        try:
+            self._rotate_if_due()
+            if self._segment is None:
+                self._open_segment()
+            with open(self._segment, "ab") as f:
+                f.write(gzip.compress(payload.encode("utf-8")))
+        except OSError as e:
+            with self._lock:
+                self.dropped += len(records)
+            increment("tripgenie_generation_log_records_total", len(records), "Generation log records by outcome",
+                      outcome="write_error")
+            log_event("generation_log.write_failed", error=str(e), records=len(records))
+            return
+        with self._lock:
+            self.written += len(records)
+        increment("tripgenie_generation_log_records_total", len(records), "Generation log records by outcome",
+                  outcome="written")
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._segment_started = time.time()
+        stamp = datetime.fromtimestamp(self._segment_started).strftime("%Y%m%dT%H%M%S")
+        self.segments += 1
+        # The sequence number keeps segments rotated within one second apart
+        self._segment = os.path.join(self.directory,
+                                     f"generations-{stamp}-{os.getpid()}-{self.segments:04d}.jsonl.gz")
+
+    def _rotate_if_due(self):
+        if self._segment is None:
+            return
+        try:
+            too_big = os.path.getsize(self._segment) >= self.max_bytes
+        except OSError:
+            too_big = False
+        if too_big or time.time() - self._segment_started >= self.max_age:
+            self._segment = None
+            self._prune()
+
+    def _prune(self):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for path in glob.glob(os.path.join(self.directory, _SEGMENT_PATTERN)):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"written": self.written, "dropped": self.dropped, "queued": self.queue_depth(),
+                    "segments": self.segments, "segment": self._segment}
+
+_writer = GenerationLogWriter(GENERATION_LOG_DIR) if GENERATION_LOG_DIR else None
+if _writer is not None:
+    register_gauge("tripgenie_generation_log_queue_depth", _writer.queue_depth,
+                   "Generation log records waiting for the writer thread")
+    atexit.register(_writer.close, 2.0)
+
+def get_writer():
+    """The process-wide writer, or None when TRIPGENIE_GENERATION_LOG is empty"""
+    return _writer
+
+def _submit(event, record):
+    if _writer is None:
+        return False
+    return _writer.submit({"event": event, "ts": time.time(), **record})
+
+def log_request(trip_params, source="app"):
+    """Queue one generation request; never blocks or raises"""
+    record = {"source": source, "city": canonical_city(trip_params.get('city'))}
+    record.update((field, trip_params.get(field)) for field in _TRIP_FIELDS)
+    return _submit("request", record)
+
+def log_generation(trip_params, **fields):
+    """Queue the result of one model generation; never blocks or raises"""
+    trip = {"city": canonical_city(trip_params.get('city'))}
+    trip.update((field, trip_params.get(field)) for field in _TRIP_FIELDS)
+    return _submit("generation", {"trip_params": trip, **fields})
+
+def segment_paths(directory=None):
+    """Log segments, oldest first"""
+    directory = directory or GENERATION_LOG_DIR
+    if not directory:
+        return []
+    return sorted(glob.glob(os.path.join(directory, _SEGMENT_PATTERN)), key=os.path.basename)
+
+def read_log(since=None, event=None, directory=None):
+    """Yield records from every segment, oldest segment first, skipping lines that do not parse
+
+    A segment still being written may end in a partial batch; records before it are kept.
+    """
+    for path in segment_paths(directory):
+        if since is not None and os.path.getmtime(path) < since:
+            continue
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if (event is None or record.get("event") == event) and \
+                            (since is None or record.get("ts", 0) >= since):
+                        yield record
+        except (EOFError, OSError):
+            continue
+
+def read_generations(since=None, directory=None):
+    """Yield logged generations, oldest segment first"""
+    return read_log(since, "generation", directory)
+
+def read_requests(since=None, directory=None):
+    """Yield logged requests as flat trip records (ts, source, city and trip fields)"""
+    for record in read_log(since, "request", directory):
+        record.pop("event", None)
+        yield record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read the generation log")
+    parser.add_argument("--dir", default=GENERATION_LOG_DIR, help="log directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("summary", "records, outcomes and models per day"),
+                            ("export", "records as plain JSONL on stdout")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--since", type=float, help="only the last N days")
+        command.add_argument("--event", choices=("request", "generation"), help="only one kind of record")
+    args = parser.parse_args(argv)
+
+    since = time.time() - args.since * 86400 if args.since else None
+    records = read_log(since, args.event, args.dir)
+    if args.command == "export":
+        for record in records:
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return 0
+
+    days = {}
+    for record in records:
+        day = datetime.fromtimestamp(record.get("ts", 0)).strftime("%Y-%m-%d")
+        summary = days.setdefault(day, {"requests": 0, "generations": Counter(), "models": Counter(), "tokens": 0})
+        if record.get("event") == "request":
+            summary["requests"] += 1
+            continue
+        summary["generations"][record.get("outcome")] += 1
+        summary["models"][record.get("model")] += 1
+        summary["tokens"] += (record.get("usage") or {}).get("total_tokens", 0)
+    for day, summary in sorted(days.items()):
+        outcomes = ", ".join(f"{outcome} {count}" for outcome, count in summary["generations"].most_common())
+        models = ", ".join(f"{model} {count}" for model, count in summary["models"].most_common(3))
+        print(f"{day}  requests {summary['requests']:>6}  generations: {outcomes or '-'}  "
+              f"tokens {summary['tokens']:,}  models: {models or '-'}")
+    print(f"{len(segment_paths(args.dir))} segments in {args.dir}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,120 @@
+"""Static HTML export for travel itineraries"""
+
+import re
+from html import escape
+from cache import LRUCache, content_hash
+from telemetry import register_cache, span
+from config import APP_TITLE, TAGLINE, HTML_EXPORT_CACHE_SIZE
+from styles import ELITE_CSS
+from utils import extract_cost, generate_packing_list
+
+# Rendered documents keyed by a hash of the itinerary and trip details
+_html_cache = LRUCache(maxsize=HTML_EXPORT_CACHE_SIZE)
+register_cache("html_export", _html_cache)
+_inline_css = None
+
+# Page-level rules for the standalone file, where there is no Streamlit shell
+_STANDALONE_CSS = """
+body { background: #f8fafc; font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; color: #1e293b; }
+.export-main { max-width: 960px; margin: 0 auto; padding: 1.5rem 1rem 3rem; }
+.overview-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(240px, 1fr)); gap: 1rem; margin: 1.5rem 0; }
+.day-accordion summary { cursor: pointer; font-weight: 600; list-style: none; }
+.export-footer { text-align: center; color: #64748b; font-size: 0.8rem; margin-top: 2rem; }
+"""
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"@import\s+url\([^)]*\)[^;]*;", "", css)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    # Only inside declaration blocks: in a selector, "div :first-child" differs from "div:first-child"
+    css = re.sub(r"\{[^{}]*\}", lambda block: re.sub(r"\s*:\s*", ":", block.group(0)), css)
+    return css.replace(";}", "}").strip()
+
+def _get_inline_css():
+    """Return the minified app stylesheet, built once per process"""
+    global _inline_css
+    if _inline_css is None:
+        _inline_css = minify_css(ELITE_CSS + _STANDALONE_CSS)
+    return _inline_css
+
+def create_static_html(itinerary_json, num_people, city, start_date, end_date, total_cost):
+    """Return a self-contained HTML itinerary as UTF-8 bytes, cached by content"""
+    key = content_hash([itinerary_json, num_people, city, start_date, end_date, total_cost])
+    document = _html_cache.get(key)
+    if document is None:
+        with span("html.render"):
+            document = _render_html(itinerary_json, num_people, city, start_date, end_date, total_cost).encode("utf-8")
+        _html_cache.set(key, document)
+    return document
+
+def _render_html(itinerary_json, num_people, city, start_date, end_date, total_cost):
+    """Render the full document in a single pass over the itinerary"""
+    city_text = escape(city)
+    days_data = itinerary_json.get("days", [])
+    parts = [
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f"<title>{city_text} Itinerary | {escape(APP_TITLE)}</title>",
+        f"<style>{_get_inline_css()}</style></head><body>",
+        f'<header class="elite-header"><h1 class="elite-title">{escape(APP_TITLE)}</h1>',
+        f'<p class="elite-subtitle">{escape(TAGLINE)}</p></header>',
+        '<main class="export-main">',
+    ]
+
+    # Trip Overview
+    dest_info = itinerary_json.get("destination_info", {})
+    parts.append('<section class="overview-grid">')
+    parts.append(f"""<div class="overview-card"><div class="card-title">Destination Information</div><div class="card-content">
+<p><strong>Best Time to Visit:</strong><br>{escape(str(dest_info.get('best_time_to_visit', 'N/A')))}</p>
+<p><strong>Language:</strong><br>{escape(str(dest_info.get('language', 'N/A')))}</p>
+<p><strong>Currency:</strong><br>{escape(str(dest_info.get('local_currency', 'N/A')))}</p></div></div>""")
+    parts.append(f"""<div class="overview-card"><div class="card-title">Trip Summary</div><div class="card-content">
+<p><strong>Dates:</strong><br>{escape(str(start_date))} to {escape(str(end_date))}</p>
+<p><strong>Duration:</strong><br>{len(days_data)} days</p>
+<p><strong>Travelers:</strong><br>{num_people} people</p></div></div>""")
+    parts.append(f"""<div class="overview-card cost-card"><div class="card-title">Total Investment</div>
+<div class="cost-amount">₹{total_cost:,}</div><div class="cost-label">₹{total_cost//num_people:,} per person</div></div>""")
+    parts.append("</section>")
+
+    # Daily Itinerary
+    parts.append('<h2 class="section-header">Your Journey</h2>')
+    activities_list = []
+    for day_data in days_data:
+        parts.append(f'<details class="day-accordion" open><summary>Day {day_data["day"]}: '
+                     f'{escape(str(day_data.get("theme", "Exploration")))}</summary><div class="activity-container">')
+        for activity in day_data.get("activities", []):
+            activities_list.append(activity.get("title", ""))
+            cost_per_person = extract_cost(activity.get("cost", "₹0"))
+            parts.append(f"""<div class="activity-card"><div class="activity-info">
+<h5>{escape(str(activity.get('title', '')))}</h5>
+<p class="activity-detail"><strong>Description:</strong> {escape(str(activity.get('description', 'N/A')))}</p>
+<p class="activity-detail"><strong>Location:</strong> {escape(str(activity.get('location', 'N/A')))}</p>
+<p class="activity-detail"><strong>Time:</strong> {escape(str(activity.get('start_time', 'N/A')))} - {escape(str(activity.get('end_time', 'N/A')))}</p>
+<div class="activity-tip"><strong>Insider Tip:</strong> {escape(str(activity.get('insider_tip', 'Enjoy the experience!')))}</div></div>
+<div class="cost-display"><div class="cost-primary">₹{cost_per_person:,}</div><div class="cost-secondary">per person</div>
+<div class="cost-secondary">₹{cost_per_person * num_people:,} total</div></div></div>""")
+        daily_total = extract_cost(day_data.get("daily_total", "₹0"))
+        parts.append(f'<div class="daily-summary">Day {day_data["day"]} Total: ₹{daily_total:,} '
+                     f'(₹{daily_total//num_people:,} per person)</div></div></details>')
+
+    # Local Tips
+    if itinerary_json.get("local_tips"):
+        parts.append(f'<h2 class="section-header">Local Insights</h2><div class="tips-container">'
+                     f'<h3 class="tips-title">Essential Tips for {city_text}</h3>')
+        parts.extend(f'<div class="tip-item">{escape(str(tip))}</div>' for tip in itinerary_json["local_tips"])
+        parts.append("</div>")
+
+    # Packing List
+    packing_list = generate_packing_list(city, len(days_data), activities_list)
+    parts.append('<h2 class="section-header">Packing Essentials</h2><div class="packing-grid">')
+    for category, items in packing_list.items():
+        parts.append(f'<div class="packing-card"><div class="packing-title">{escape(category)}</div>')
+        parts.extend(f'<div class="packing-item">{escape(item)}</div>' for item in items)
+        parts.append("</div>")
+    parts.append("</div>")
+
+    parts.append(f'<p class="export-footer">Generated by {escape(APP_TITLE)} | Safe travels and enjoy your adventure!</p>')
+    parts.append("</main></body></html>")
+    return "".join(parts)
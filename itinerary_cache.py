@@ -0,0 +1,232 @@
+"""Exact and near-match itinerary reuse for TripGenie.AI
+
+Itineraries are grouped by a trip profile: canonical city plus every
+preference that shapes the plan. The traveler count is left out because
+costs are per person. Within a profile a request is served by an
+itinerary of the same length, or by slicing the first N days off a longer
+one. Either way no LLM call is made.
+
+Entries past the TTL are kept until ITINERARY_STALE_TTL so that a slow
+generation can fall back to them, or to another itinerary for the same
+city, instead of leaving the user waiting.
+
+City-level sections (destination_info and local_tips) are cached per city
+with a much longer TTL, so generations for a known city only ask the model
+for the day plans.
+"""
+
+import copy
+import threading
+import time
+from cache import LRUCache
+from config import (
+    CITY_INFO_CACHE_SIZE, CITY_INFO_TTL, ITINERARY_CACHE_SIZE, ITINERARY_CACHE_TTL, ITINERARY_REUSE_ENABLED,
+    ITINERARY_STALE_TTL
+)
+from destinations import city_key
+from telemetry import increment, register_cache
+
+def profile_key(trip_params):
+    """Cache key for everything except trip length and traveler count"""
+    return (
+        city_key(trip_params['city'], trip_params.get('country_code')),
+        trip_params.get('budget'),
+        trip_params.get('travel_pace'),
+        trip_params.get('group_type'),
+        trip_params.get('accessibility'),
+        tuple(sorted(trip_params.get('food_preferences') or [])),
+        tuple(sorted(trip_params.get('interests') or [])),
+    )
+
+def slice_itinerary(itinerary_json, days):
+    """Return a copy holding the first `days` days, renumbered from 1"""
+    sliced = copy.deepcopy(itinerary_json)
+    sliced['days'] = sliced.get('days', [])[:days]
+    for number, day in enumerate(sliced['days'], 1):
+        day['day'] = number
+    return sliced
+
+def _materialize(entry, days):
+    if entry["days"] == days:
+        return copy.deepcopy(entry["itinerary"])
+    return slice_itinerary(entry["itinerary"], days)
+
+class ItineraryCache:
+    """Profiles in an LRU, each holding itineraries by trip length"""
+
+    def __init__(self, maxsize=ITINERARY_CACHE_SIZE, ttl=ITINERARY_CACHE_TTL, stale_ttl=ITINERARY_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self._profiles = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.counts = {"exact": 0, "slice": 0, "miss": 0}
+        self.tokens_saved = 0
+        self.cost_saved_usd = 0.0
+
+    def _entries_within(self, profile, now, max_age):
+        return {days: entry for days, entry in profile.items() if now - entry["created"] < max_age}
+
+    def _find(self, trip_params, now=None, max_age=None):
+        """Return (entry, kind) that would serve these parameters, without counting it"""
+        days = trip_params['days']
+        profile = self._profiles.get(profile_key(trip_params))
+        if not profile:
+            return None, "miss"
+        with self._lock:
+            entries = self._entries_within(profile, now or time.time(), max_age or self.ttl)
+        if days in entries:
+            return entries[days], "exact"
+        longer = [length for length in entries if length > days]
+        if longer:
+            return entries[min(longer)], "slice"
+        return None, "miss"
+
+    def covers(self, trip_params, fresh_for=0):
+        """True when a lookup would hit now and still hit `fresh_for` seconds from now"""
+        entry, _ = self._find(trip_params, now=time.time() + fresh_for)
+        return entry is not None
+
+    def expiring(self, within):
+        """Trip parameters of cached itineraries that expire in the next `within` seconds"""
+        expired_before = time.time() - self.ttl
+        deadline = expired_before + within
+        profiles = self._profiles.values()
+        with self._lock:
+            return [copy.deepcopy(entry["trip_params"]) for profile in profiles
+                    for entry in profile.values() if expired_before <= entry["created"] < deadline]
+
+    def lookup(self, trip_params):
+        """Return (itinerary, kind, age in seconds) for a reusable itinerary, or (None, 'miss', None)"""
+        days = trip_params['days']
+        entry, kind = self._find(trip_params)
+        if entry is not None:
+            # A sliced reuse saves roughly a generation of the shorter length
+            share = days / entry["days"]
+            self._record(kind, int(entry["tokens"] * share), entry["cost_usd"] * share)
+            return _materialize(entry, days), kind, time.time() - entry["created"]
+        self._record("miss", 0, 0.0)
+        return None, "miss", None
+
+    def lookup_stale(self, trip_params):
+        """Fallback when generation is too slow: an expired entry for this profile, else a "near"
+        itinerary for the same city, budget and accessibility needs that is long enough; pace, group
+        and interests may differ. Returns (itinerary, kind, age)."""
+        days = trip_params['days']
+        now = time.time()
+        entry, _ = self._find(trip_params, now=now, max_age=self.stale_ttl)
+        if entry is not None:
+            return _materialize(entry, days), "stale", now - entry["created"]
+        wanted = profile_key(trip_params)
+        # City, budget and accessibility must match: a cheaper plan or one without step-free access is no fallback
+        with self._lock:
+            candidates = [entry for key, profile in self._profiles.items()
+                          if (key[0], key[1], key[4]) == (wanted[0], wanted[1], wanted[4])
+                          for entry in self._entries_within(profile, now, self.stale_ttl).values()
+                          if entry["days"] >= days]
+        if not candidates:
+            return None, "miss", None
+        entry = max(candidates, key=lambda candidate: candidate["created"])
+        return _materialize(entry, days), "near", now - entry["created"]
+
+    def store(self, trip_params, itinerary_json, usage=None, created=None):
+        """Remember a freshly generated itinerary under its profile; `created` keeps the age of a copied one"""
+        key = profile_key(trip_params)
+        entry = {
+            "itinerary": copy.deepcopy(itinerary_json),
+            "trip_params": copy.deepcopy(trip_params),
+            "days": len(itinerary_json.get('days', [])) or trip_params['days'],
+            "created": time.time() if created is None else created,
+            "tokens": (usage or {}).get("total_tokens", 0),
+            "cost_usd": (usage or {}).get("cost_usd", 0.0),
+        }
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = {}
+                self._profiles.set(key, profile)
+            profile[entry["days"]] = entry
+            for days in [days for days, old in profile.items() if entry["created"] - old["created"] >= self.stale_ttl]:
+                del profile[days]
+
+    def _record(self, kind, tokens, cost_usd):
+        with self._lock:
+            self.counts[kind] += 1
+            self.tokens_saved += tokens
+            self.cost_saved_usd += cost_usd
+        increment("tripgenie_itinerary_reuse_total", 1, "Itinerary lookups by outcome", outcome=kind)
+        if tokens:
+            increment("tripgenie_itinerary_reuse_tokens_saved_total", tokens, "LLM tokens avoided by reuse")
+
+    def stats(self):
+        """Reuse rate and estimated generation savings"""
+        with self._lock:
+            lookups = sum(self.counts.values())
+            reused = self.counts["exact"] + self.counts["slice"]
+            return {
+                **self.counts,
+                "lookups": lookups,
+                "reuse_rate": reused / lookups if lookups else 0.0,
+                "generations_saved": reused,
+                "tokens_saved": self.tokens_saved,
+                "cost_saved_usd": self.cost_saved_usd,
+                "profiles": len(self._profiles),
+            }
+
+    def clear(self):
+        self._profiles.clear()
+        with self._lock:
+            self.counts = {"exact": 0, "slice": 0, "miss": 0}
+            self.tokens_saved = 0
+            self.cost_saved_usd = 0.0
+
+# Shared by every AITravelService in this process
+itinerary_cache = ItineraryCache()
+register_cache("itinerary_profiles", itinerary_cache._profiles)
+
+def lookup(trip_params):
+    if not ITINERARY_REUSE_ENABLED:
+        return None, "disabled", None
+    return itinerary_cache.lookup(trip_params)
+
+def lookup_stale(trip_params):
+    if not ITINERARY_REUSE_ENABLED:
+        return None, "disabled", None
+    return itinerary_cache.lookup_stale(trip_params)
+
+def store(trip_params, itinerary_json, usage=None):
+    if ITINERARY_REUSE_ENABLED:
+        itinerary_cache.store(trip_params, itinerary_json, usage)
+
+# destination_info and local_tips by city key (name and country for known cities), as (created, sections)
+_city_info = LRUCache(maxsize=CITY_INFO_CACHE_SIZE)
+register_cache("city_info", _city_info)
+
+def lookup_city_info(city, country_code=None):
+    """Cached {'destination_info', 'local_tips'} for a city, or None"""
+    entry = _city_info.get(city_key(city, country_code))
+    hit = entry is not None and time.time() - entry[0] < CITY_INFO_TTL
+    increment("tripgenie_city_info_cache_total", 1, "City info lookups by outcome", outcome="hit" if hit else "miss")
+    return copy.deepcopy(entry[1]) if hit else None
+
+def city_sections(itinerary_json):
+    """The city-level sections of a full itinerary, or None when they are missing"""
+    if isinstance(itinerary_json.get('destination_info'), dict) and itinerary_json.get('local_tips'):
+        return {
+            'destination_info': copy.deepcopy(itinerary_json['destination_info']),
+            'local_tips': list(itinerary_json['local_tips']),
+        }
+    return None
+
+def store_city_info(city, itinerary_json, country_code=None):
+    """Cache the city-level sections of a full itinerary response"""
+    sections = city_sections(itinerary_json)
+    if sections is not None:
+        _city_info.set(city_key(city, country_code), (time.time(), sections))
+
+def merge_city_info(itinerary_json, city_info):
+    """Put cached city sections back into the usual itinerary shape"""
+    merged = {'destination_info': city_info['destination_info']}
+    merged.update((key, value) for key, value in itinerary_json.items()
+                  if key not in ('destination_info', 'local_tips'))
+    merged['local_tips'] = city_info['local_tips']
+    return merged
@@ -0,0 +1,146 @@
+"""Versioned itinerary export and import for TripGenie.AI"""
+
+import gzip
+import json
+from datetime import date
+from cache import LRUCache, content_hash
+from telemetry import register_cache
+from config import APP_TITLE, DATA_EXPORT_CACHE_SIZE
+from itinerary_schema import validate_itinerary
+from utils import calculate_total_cost, validate_trip_params
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+EXPORT_FORMAT_ID = "tripgenie.itinerary"
+EXPORT_SCHEMA_VERSION = 1
+
+# Export format -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "json": (".json", "application/json"),
+    "json.gz": (".json.gz", "application/gzip"),
+}
+if msgpack is not None:
+    EXPORT_FORMATS["msgpack"] = (".msgpack", "application/x-msgpack")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# Trip details an imported file must carry when it has any, and ones checked only when present
+_REQUIRED_TRIP_FIELDS = ("city", "days", "num_people")
+_OPTIONAL_TRIP_FIELDS = {"budget", "travel_pace", "group_type", "accessibility", "food_preferences", "interests"}
+
+# Encoded payloads keyed by (content hash, format)
+_export_cache = LRUCache(maxsize=DATA_EXPORT_CACHE_SIZE)
+register_cache("data_export", _export_cache)
+
+def _dumps(obj):
+    """Compact JSON encoding, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def _loads(payload):
+    """Decode JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+def build_export_document(itinerary_json, trip_details):
+    """Wrap an itinerary and its trip details in the versioned export envelope"""
+    trip = {
+        key: value.isoformat() if isinstance(value, date) else value
+        for key, value in trip_details.items()
+    }
+    return {
+        "format": EXPORT_FORMAT_ID,
+        "schema_version": EXPORT_SCHEMA_VERSION,
+        "generator": APP_TITLE,
+        "trip": trip,
+        "itinerary": itinerary_json,
+    }
+
+def encode_document(document, fmt="json"):
+    """Encode an export document in one of EXPORT_FORMATS"""
+    if fmt == "json":
+        return _dumps(document)
+    if fmt == "json.gz":
+        return gzip.compress(_dumps(document), compresslevel=6, mtime=0)
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise ValueError("msgpack export requires the 'msgpack' package")
+        return msgpack.packb(document, use_bin_type=True)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+def decode_document(payload):
+    """Decode bytes in any supported encoding back into a document"""
+    if payload[:2] == _GZIP_MAGIC:
+        payload = gzip.decompress(payload)
+    stripped = payload.lstrip()
+    if stripped[:1] in (b"{", b"["):
+        return _loads(stripped)
+    if msgpack is None:
+        raise ValueError("File is not JSON and msgpack support is not installed")
+    return msgpack.unpackb(payload, raw=False)
+
+def export_itinerary(itinerary_json, trip_details, fmt="json"):
+    """Return the encoded export payload, cached by content and format"""
+    key = (content_hash([itinerary_json, trip_details]), fmt)
+    payload = _export_cache.get(key)
+    if payload is None:
+        payload = encode_document(build_export_document(itinerary_json, trip_details), fmt)
+        _export_cache.set(key, payload)
+    return payload
+
+def import_itinerary(payload):
+    """Load an exported file, returning (itinerary_json, trip_details, total_cost)"""
+    try:
+        document = decode_document(payload)
+    except Exception as e:
+        raise ValueError(f"Could not read itinerary file: {e}")
+
+    if not isinstance(document, dict):
+        raise ValueError("Itinerary file must contain a JSON object")
+
+    if document.get("format") == EXPORT_FORMAT_ID:
+        version = document.get("schema_version")
+        if not isinstance(version, int) or version > EXPORT_SCHEMA_VERSION:
+            raise ValueError(f"Unsupported itinerary schema version: {version}")
+        itinerary_json = document.get("itinerary")
+        trip = document.get("trip") or {}
+    else:
+        # Files saved before the export envelope existed hold the bare itinerary
+        itinerary_json = document
+        trip = {}
+
+    if not isinstance(itinerary_json, dict):
+        raise ValueError("Itinerary file has no itinerary object")
+    if not isinstance(trip, dict):
+        raise ValueError("Itinerary file has a 'trip' that is not an object")
+
+    errors = validate_itinerary(itinerary_json, include_city_info="destination_info" in itinerary_json)
+    if errors:
+        raise ValueError(f"Itinerary does not match the schema: {'; '.join(errors[:3])}")
+
+    trip = dict(trip)
+    if trip:
+        # The trip details replace the sidebar inputs when the itinerary is shown
+        errors = validate_trip_params(trip, fields=_REQUIRED_TRIP_FIELDS + tuple(trip.keys() & _OPTIONAL_TRIP_FIELDS))
+        for key in ("start_date", "end_date"):
+            if key not in trip:
+                continue
+            try:
+                trip[key] = date.fromisoformat(trip[key])
+            except (TypeError, ValueError):
+                errors.append(f"{key}: must be an ISO date (YYYY-MM-DD)")
+        if errors:
+            raise ValueError(f"Invalid trip details: {'; '.join(errors)}")
+
+    total_cost = calculate_total_cost(itinerary_json)
+    return itinerary_json, trip, total_cost
@@ -0,0 +1,127 @@
+"""Compact itinerary summaries and JSON Patch edits for conversational refinement
+
+Refinement turns send the model a short outline of the itinerary, with a
+JSON Pointer for every editable item, instead of the full JSON. The model
+answers with RFC 6902 operations, which are applied to the copy held in
+session state. Only the days an edit touches have their totals updated.
+"""
+
+import copy
+import re
+from utils import extract_cost
+
+OPERATIONS = ("add", "remove", "replace")
+DAY_FIELDS = ("theme", "meal_cost", "transport_cost")
+ACTIVITY_FIELDS = ("title", "description", "location", "start_time", "end_time", "cost", "category", "insider_tip")
+
+# Paths an edit may touch; days themselves cannot be added or removed
+_ACTIVITY_PATH = re.compile(r"^/days/(\d+)/activities/(\d+|-)$")
+_ACTIVITY_FIELD_PATH = re.compile(rf"^/days/(\d+)/activities/(\d+)/({'|'.join(ACTIVITY_FIELDS)})$")
+_DAY_FIELD_PATH = re.compile(rf"^/days/(\d+)/({'|'.join(DAY_FIELDS)})$")
+_TIP_PATH = re.compile(r"^/local_tips/(\d+|-)$")
+
+def compact_summary(itinerary_json):
+    """One line per day and activity: pointer, times, title, category and cost"""
+    lines = []
+    for day_index, day in enumerate(itinerary_json.get('days', [])):
+        lines.append(
+            f"/days/{day_index} Day {day.get('day', day_index + 1)} \"{day.get('theme', '')}\" "
+            f"meals {day.get('meal_cost', '₹0')} transport {day.get('transport_cost', '₹0')} "
+            f"total {day.get('daily_total', '₹0')}"
+        )
+        for index, activity in enumerate(day.get('activities', [])):
+            lines.append(
+                f"  /days/{day_index}/activities/{index} {activity.get('start_time', '')}-"
+                f"{activity.get('end_time', '')} \"{activity.get('title', '')}\" "
+                f"[{activity.get('category', '')}] {activity.get('cost', '₹0')}"
+            )
+    for index, tip in enumerate(itinerary_json.get('local_tips', [])):
+        lines.append(f"/local_tips/{index} {tip[:80]}")
+    return "\n".join(lines)
+
+def _target(path):
+    """Parse a pointer into (container path parts, key, touched day index or None), rejecting other paths"""
+    for pattern in (_ACTIVITY_PATH, _ACTIVITY_FIELD_PATH, _DAY_FIELD_PATH):
+        match = pattern.match(path)
+        if match:
+            parts = path.strip("/").split("/")
+            return parts[:-1], parts[-1], int(match.group(1))
+    if _TIP_PATH.match(path):
+        return ["local_tips"], path.rsplit("/", 1)[1], None
+    raise ValueError(f"Edits to {path!r} are not allowed")
+
+def _resolve(document, parts):
+    node = document
+    for part in parts:
+        node = node[int(part)] if isinstance(node, list) else node[part]
+    return node
+
+def _check_value(path, value):
+    if _ACTIVITY_PATH.match(path):
+        missing = [field for field in ACTIVITY_FIELDS if field not in (value or {})]
+        if not isinstance(value, dict) or missing:
+            raise ValueError(f"{path}: an activity needs {', '.join(missing or ACTIVITY_FIELDS)}")
+    elif value is None or isinstance(value, (dict, list)):
+        raise ValueError(f"{path}: expected a text or number value")
+
+def apply_patch(itinerary_json, operations):
+    """Apply patch operations to a copy; returns (patched itinerary, indexes of touched days)"""
+    patched = copy.deepcopy(itinerary_json)
+    touched = set()
+    for operation in operations:
+        op, path = operation.get('op'), operation.get('path', "")
+        if op not in OPERATIONS:
+            raise ValueError(f"Unsupported patch operation {op!r}")
+        parts, key, day_index = _target(path)
+        try:
+            container = _resolve(patched, parts)
+            if isinstance(container, list):
+                if key == "-":
+                    if op != "add":
+                        raise ValueError(f"{path}: '-' can only be used to add")
+                    index = len(container)
+                else:
+                    index = int(key)
+                if op == "add":
+                    if index > len(container):
+                        raise IndexError(index)
+                    _check_value(path, operation.get('value'))
+                    container.insert(index, operation['value'])
+                elif op == "remove":
+                    del container[index]
+                else:
+                    _check_value(path, operation.get('value'))
+                    container[index] = operation['value']
+            else:
+                if op != "replace" or key not in container:
+                    raise ValueError(f"{path}: only replace is allowed on existing fields")
+                _check_value(path, operation.get('value'))
+                container[key] = operation['value']
+        except (IndexError, KeyError, TypeError) as e:
+            raise ValueError(f"{path}: no such item ({e})")
+        if day_index is not None:
+            touched.add(day_index)
+    for day_index in touched:
+        if not patched['days'][day_index].get('activities'):
+            raise ValueError(f"/days/{day_index}: a day needs at least one activity")
+    return patched, touched
+
+def day_cost(day):
+    """Activity costs plus meals and transport for one day"""
+    activities = sum(extract_cost(activity.get('cost')) for activity in day.get('activities', []))
+    return activities + extract_cost(day.get('meal_cost')) + extract_cost(day.get('transport_cost'))
+
+def apply_refinement(itinerary_json, total_cost, operations):
+    """Apply an edit and shift only the touched days' totals; returns (itinerary, total, touched days)
+
+    A day's total moves by the change in its itemized costs, so anything else
+    the model had counted in daily_total is kept.
+    """
+    patched, touched = apply_patch(itinerary_json, operations)
+    for day_index in touched:
+        before, after = itinerary_json['days'][day_index], patched['days'][day_index]
+        old_total = extract_cost(before.get('daily_total'))
+        new_total = max(0, old_total + day_cost(after) - day_cost(before))
+        after['daily_total'] = f"₹{new_total:,}"
+        total_cost += new_total - old_total
+    return patched, total_cost, sorted(touched)
@@ -0,0 +1,134 @@
+"""JSON Schema for generated itineraries and a compiled validator
+
+The same schema is sent to the model as a structured-output constraint and
+used to check every response before anything renders it. Strict structured
+output needs every property listed as required and no extra properties, so
+optional detail is expressed as nullable instead.
+"""
+
+import functools
+
+_MONEY = {"type": ["string", "number"]}
+_TEXT = {"type": "string"}
+
+ACTIVITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "minLength": 1},
+        "description": _TEXT,
+        "location": _TEXT,
+        "start_time": _TEXT,
+        "end_time": _TEXT,
+        "cost": _MONEY,
+        "category": _TEXT,
+        "insider_tip": _TEXT,
+    },
+    "required": ["title", "description", "location", "start_time", "end_time", "cost", "category",
+                 "insider_tip"],
+    "additionalProperties": False,
+}
+
+DAY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "day": {"type": "integer", "minimum": 1},
+        "theme": _TEXT,
+        "activities": {"type": "array", "items": ACTIVITY_SCHEMA, "minItems": 1},
+        "meal_cost": _MONEY,
+        "transport_cost": _MONEY,
+        "daily_total": _MONEY,
+    },
+    "required": ["day", "theme", "activities", "meal_cost", "transport_cost", "daily_total"],
+    "additionalProperties": False,
+}
+
+DESTINATION_INFO_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "city": _TEXT,
+        "best_time_to_visit": _TEXT,
+        "local_currency": _TEXT,
+        "language": _TEXT,
+    },
+    "required": ["city", "best_time_to_visit", "local_currency", "language"],
+    "additionalProperties": False,
+}
+
+def itinerary_schema(include_city_info=True):
+    """Schema for a full response, or for day plans only when city sections are cached"""
+    properties = {"days": {"type": "array", "items": DAY_SCHEMA, "minItems": 1}}
+    if include_city_info:
+        properties = {
+            "destination_info": DESTINATION_INFO_SCHEMA,
+            **properties,
+            "local_tips": {"type": "array", "items": _TEXT},
+        }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+def response_format(include_city_info=True):
+    """OpenAI-style response_format payload for structured output"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "itinerary", "strict": True, "schema": itinerary_schema(include_city_info)},
+    }
+
+PATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "operations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "op": {"type": "string", "enum": ["add", "remove", "replace"]},
+                    "path": {"type": "string"},
+                    # Whole activities for add/replace on an activity, text for fields, null for remove
+                    "value": {"anyOf": [ACTIVITY_SCHEMA, {"type": ["string", "number", "null"]}]},
+                },
+                "required": ["op", "path", "value"],
+                "additionalProperties": False,
+            },
+        },
+        "message": _TEXT,
+    },
+    "required": ["operations", "message"],
+    "additionalProperties": False,
+}
+
+def patch_response_format():
+    """response_format payload for refinement edits"""
+    return {"type": "json_schema", "json_schema": {"name": "itinerary_patch", "strict": True, "schema": PATCH_SCHEMA}}
+
+@functools.lru_cache(maxsize=None)
+def _patch_validator():
+    from jsonschema import Draft202012Validator
+    Draft202012Validator.check_schema(PATCH_SCHEMA)
+    return Draft202012Validator(PATCH_SCHEMA)
+
+@functools.lru_cache(maxsize=None)
+def _validator(include_city_info):
+    # Compiled once per schema variant; jsonschema is only imported on first use
+    from jsonschema import Draft202012Validator
+    schema = itinerary_schema(include_city_info)
+    Draft202012Validator.check_schema(schema)
+    return Draft202012Validator(schema)
+
+def _path(error):
+    path = ""
+    for part in error.absolute_path:
+        path += f"[{part}]" if isinstance(part, int) else (f".{part}" if path else part)
+    return path or "(root)"
+
+def validate_itinerary(itinerary_json, include_city_info=True):
+    """Return schema violations as 'path: message' strings, empty when the itinerary is valid"""
+    return [f"{_path(error)}: {error.message}"
+            for error in _validator(include_city_info).iter_errors(itinerary_json)]
+
+def validate_patch(patch_json):
+    """Return schema violations of a refinement response, empty when it is valid"""
+    return [f"{_path(error)}: {error.message}" for error in _patch_validator().iter_errors(patch_json)]
@@ -1,21 +1,24 @@
 """Main application file for TripGenie.AI"""
 
+import html
 import streamlit as st
 import time
-import json
-from datetime import datetime
 
-# Import modular components
-from config import *
+# Import modular components (the AI client and exporters load on first use)
+from config import PAGE_TITLE, APP_ICON, PROGRESS_STEP_DELAY, UNKNOWN_CITY_POLICY
 from styles import load_elite_css
-from session_manager import initialize_session_state, store_itinerary
+from session_manager import get_session_id, initialize_session_state, store_itinerary
 from components import (
     render_header, render_sidebar, render_welcome_screen,
     render_trip_overview, render_daily_itinerary, render_local_tips,
-    render_packing_list, render_export_options
+    render_packing_list, render_export_options, render_refresh_status, render_comparison,
+    render_refinement_chat
 )
-from ai_service import AITravelService
-from utils import extract_cost
+from utils import build_trip_params, calculate_total_cost, validate_trip_params
+from telemetry import increment, log_event, new_trace, span, start_metrics_server
+from diagnostics import start_tracing
+from generation_log import log_request
+from prewarm import start_prewarm_scheduler
 
 def main():
     """Main application function"""
@@ -27,6 +30,12 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    # Tag everything in this rerun with one trace ID
+    new_trace()
+    start_metrics_server()
+    start_prewarm_scheduler()
+    start_tracing()
+    
     # Load styles and initialize session
     load_elite_css()
     initialize_session_state()
@@ -38,25 +47,60 @@ def main():
     user_inputs = render_sidebar()
     
     # Handle itinerary generation
-    if user_inputs['generate_btn'] and not st.session_state.itinerary_generated:
+    if user_inputs['generate_btn'] and not st.session_state.itinerary_generated and not st.session_state.comparison:
         if not user_inputs['city']:
-            st.markdown("""
-                <div style="display: flex; justify-content: center;">
-                    <div style="background-color:#7f1d1d; padding:1rem; border-radius:8px; color:white; font-weight:600; text-align:center; width: fit-content; max-width: 90%;">
-                        ⚠️ Please enter a destination city.
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
+            render_input_error("⚠️ Please enter a destination city.")
+            st.stop()
+        
+        # The same checks the API applies, e.g. a trip must last at least one day
+        errors = validate_trip_params(build_trip_params(user_inputs))
+        if errors:
+            render_input_error(f"⚠️ Please check your trip details — {html.escape('; '.join(errors))}.")
             st.stop()
         
-        generate_itinerary(user_inputs)
+        # Unknown destinations are stopped here, before any tokens are spent on them
+        if user_inputs['city_known']:
+            destination_check = "known"
+        elif UNKNOWN_CITY_POLICY == "allow":
+            destination_check = "allowed"
+        elif user_inputs['confirm_unknown_city']:
+            destination_check = "confirmed"
+        else:
+            destination_check = "blocked"
+        increment("tripgenie_destination_checks_total", 1, "Destinations checked against the city index by outcome",
+                  outcome=destination_check)
+        if destination_check == "blocked":
+            hint = "pick a suggestion or confirm it in the sidebar" if UNKNOWN_CITY_POLICY == "confirm" \
+                else "pick one of the suggestions in the sidebar"
+            render_input_error(f"⚠️ \"{html.escape(user_inputs['city'])}\" isn't a destination we know — {hint}.")
+            st.stop()
+        
+        if user_inputs['compare_field']:
+            generate_comparison(user_inputs)
+        else:
+            generate_itinerary(user_inputs)
     
     # Display results or welcome screen
     if st.session_state.itinerary_generated and st.session_state.itinerary_data:
         display_itinerary_results(user_inputs)
+    elif st.session_state.comparison:
+        for warning in st.session_state.get('budget_warnings', []):
+            st.warning(warning)
+        with span("render.comparison"):
+            render_comparison(st.session_state.comparison, user_inputs['city'])
     else:
         render_welcome_screen()
 
+def render_input_error(message):
+    """Show a centered error banner above the main area"""
+    st.markdown(f"""
+        <div style="display: flex; justify-content: center;">
+            <div style="background-color:#7f1d1d; padding:1rem; border-radius:8px; color:white; font-weight:600; text-align:center; width: fit-content; max-width: 90%;">
+                {message}
+            </div>
+        </div>
+    """, unsafe_allow_html=True)
+
 def generate_itinerary(user_inputs):
     """Generate itinerary using AI service"""
     # Progress tracking
@@ -65,61 +109,54 @@ def generate_itinerary(user_inputs):
     
     with st.spinner("Crafting your luxury travel experience..."):
         try:
-            # Simulate progress
-            for i in range(100):
-                progress_bar.progress(i + 1)
-                if i < 25:
-                    status_text.markdown("""
-                        <div style="color:#1e293b; font-weight:600; font-size:0.95rem;">
-                            🔍 Analyzing destination...
-                        </div>
-                    """, unsafe_allow_html=True)
-                elif i < 50:
-                    status_text.markdown("""
-                        <div style="color:#1e293b; font-weight:600; font-size:0.95rem;">
-                            🎯 Customizing preferences...
-                        </div>
-                    """, unsafe_allow_html=True)
-                elif i < 75:
-                    status_text.markdown("""
-                        <div style="color:#1e293b; font-weight:600; font-size:0.95rem;">
-                            🗺️ Planning routes...
-                        </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    status_text.markdown("""
-                        <div style="color:#1e293b; font-weight:600; font-size:0.95rem;">
-                            ✨ Finalizing itinerary...
-                        </div>
-                    """, unsafe_allow_html=True)
-                time.sleep(0.02)
+            # Simulate progress (TRIPGENIE_PROGRESS_DELAY=0 skips it, e.g. when benchmarking)
+            if PROGRESS_STEP_DELAY > 0:
+                for i in range(100):
+                    progress_bar.progress(i + 1)
+                    if i < 25:
+                        status_text.markdown("""
+                            <div style="color:#1e293b; font-weight:600; font-size:0.95rem;">
+                                🔍 Analyzing destination...
+                            </div>
+                        """, unsafe_allow_html=True)
+                    elif i < 50:
+                        status_text.markdown("""
+                            <div style="color:#1e293b; font-weight:600; font-size:0.95rem;">
+                                🎯 Customizing preferences...
+                            </div>
+                        """, unsafe_allow_html=True)
+                    elif i < 75:
+                        status_text.markdown("""
+                            <div style="color:#1e293b; font-weight:600; font-size:0.95rem;">
+                                🗺️ Planning routes...
+                            </div>
+                        """, unsafe_allow_html=True)
+                    else:
+                        status_text.markdown("""
+                            <div style="color:#1e293b; font-weight:600; font-size:0.95rem;">
+                                ✨ Finalizing itinerary...
+                            </div>
+                        """, unsafe_allow_html=True)
+                    time.sleep(PROGRESS_STEP_DELAY)
             
             # Prepare trip parameters
-            interests = []
-            for key, value in user_inputs['preferences'].items():
-                if value:
-                    interests.append(ACTIVITY_CATEGORIES[list(user_inputs['preferences'].keys()).index(key)])
-            
-            trip_params = {
-                'city': user_inputs['city'],
-                'days': user_inputs['days'],
-                'num_people': user_inputs['num_people'],
-                'group_type': user_inputs['group_type'],
-                'budget': user_inputs['budget'],
-                'travel_pace': user_inputs['travel_pace'],
-                'accessibility': user_inputs['accessibility'],
-                'food_preferences': user_inputs['food_preferences'],
-                'interests': interests
-            }
+            trip_params = build_trip_params(user_inputs)
+            log_request(trip_params, source="app")
             
             # Generate itinerary using AI service
-            ai_service = AITravelService()
-            itinerary_json = ai_service.generate_itinerary(trip_params)
+            with span("generate", city=trip_params['city'], days=trip_params['days']):
+                from ai_service import AITravelService
+                ai_service = AITravelService(session_id=get_session_id())
+                itinerary_json = ai_service.generate_itinerary(trip_params)
+            st.session_state.budget_warnings = ai_service.budget_warnings
+            # Set when a cached itinerary was served while a fresh one generates
+            st.session_state.pending_refresh = ai_service.pending_refresh
+            st.session_state.reuse_kind = ai_service.reuse
             
             # Calculate total cost
-            total_cost = 0
-            for day in itinerary_json.get("days", []):
-                total_cost += extract_cost(day.get("daily_total", "₹0"))
+            with span("cost.total"):
+                total_cost = calculate_total_cost(itinerary_json)
+            increment("tripgenie_generations_total", 1, "Itinerary generations by outcome", outcome="ok")
             
             # Store in session state
             store_itinerary(itinerary_json, total_cost)
@@ -133,13 +170,80 @@ def generate_itinerary(user_inputs):
         except Exception as e:
             progress_bar.empty()
             status_text.empty()
+            increment("tripgenie_generations_total", 1, "Itinerary generations by outcome", outcome="error")
+            log_event("generate.failed", error=str(e))
             st.error(f"Error generating itinerary: {e}")
 
+def generate_comparison(user_inputs):
+    """Generate the chosen budget or pace variants of one trip concurrently"""
+    field, values = user_inputs['compare_field'], user_inputs['compare_values']
+    if not 2 <= len(values) <= 3:
+        st.warning("Choose two or three options to compare.")
+        return
+    
+    with st.spinner(f"Crafting {len(values)} versions of your journey at once..."):
+        try:
+            trip_params = build_trip_params(user_inputs)
+            for value in values:
+                log_request({**trip_params, field: value}, source="app")
+            
+            with span("compare", city=trip_params['city'], days=trip_params['days'], variants=len(values)):
+                from ai_service import AITravelService
+                ai_service = AITravelService(session_id=get_session_id())
+                variants = ai_service.compare_itineraries(trip_params, field, values)
+            st.session_state.budget_warnings = ai_service.budget_warnings
+            
+            for variant in variants:
+                variant['total_cost'] = calculate_total_cost(variant['itinerary']) if variant['itinerary'] else 0
+            if all(variant['error'] for variant in variants):
+                raise RuntimeError(variants[0]['error'])
+            increment("tripgenie_generations_total", 1, "Itinerary generations by outcome", outcome="ok")
+            
+            st.session_state.comparison = {'field': field, 'variants': variants}
+            st.rerun()
+            
+        except Exception as e:
+            increment("tripgenie_generations_total", 1, "Itinerary generations by outcome", outcome="error")
+            log_event("generate.failed", error=str(e))
+            st.error(f"Error generating itinerary: {e}")
+
+def refine_itinerary(user_inputs, request):
+    """Apply a chat request to the current itinerary as a small patch"""
+    history = list(st.session_state.refine_history)
+    with st.spinner("Updating your itinerary..."):
+        try:
+            with span("refine"):
+                from ai_service import AITravelService
+                ai_service = AITravelService(session_id=get_session_id())
+                result = ai_service.refine_itinerary(
+                    st.session_state.itinerary_data, st.session_state.total_cost, request,
+                    build_trip_params(user_inputs), history
+                )
+            st.session_state.budget_warnings = ai_service.budget_warnings
+        except Exception as e:
+            log_event("refine.failed", error=str(e))
+            st.error(f"Could not refine the itinerary: {e}")
+            return
+    
+    store_itinerary(result['itinerary'], result['total_cost'], st.session_state.trip_details)
+    st.session_state.refine_history = history + [{
+        'request': request,
+        'message': result['message'],
+        'touched_days': result['touched_days'],
+        'tokens': result['tokens'],
+        'latency_s': result['latency_s'],
+    }]
+    st.rerun()
+
 def display_itinerary_results(user_inputs):
     """Display the generated itinerary results"""
     itinerary_json = st.session_state.itinerary_data
     total_cost = st.session_state.total_cost
     
+    # Imported itineraries carry their own trip details
+    if st.session_state.get('trip_details'):
+        user_inputs = {**user_inputs, **st.session_state.trip_details}
+    
     # Success message
     st.markdown("""
     <div class="success-banner">
@@ -147,27 +251,43 @@ def display_itinerary_results(user_inputs):
     </div>
     """, unsafe_allow_html=True)
     
+    for warning in st.session_state.get('budget_warnings', []):
+        st.warning(warning)
+    
+    render_refresh_status()
+    
     # Trip Overview
-    render_trip_overview(itinerary_json, user_inputs['days'], user_inputs['num_people'], total_cost)
+    with span("render.overview"):
+        render_trip_overview(itinerary_json, user_inputs['days'], user_inputs['num_people'], total_cost)
     
     # Daily Itinerary
-    render_daily_itinerary(itinerary_json, user_inputs['num_people'])
+    with span("render.daily_itinerary"):
+        render_daily_itinerary(itinerary_json, user_inputs['num_people'])
+    
+    # Conversational refinement
+    with span("render.refinement"):
+        request = render_refinement_chat()
+    if request:
+        refine_itinerary(user_inputs, request)
     
     # Local Tips
-    render_local_tips(itinerary_json, user_inputs['city'])
+    with span("render.local_tips"):
+        render_local_tips(itinerary_json, user_inputs['city'])
     
     # Packing List
-    render_packing_list(user_inputs['city'], user_inputs['days'], itinerary_json)
+    with span("render.packing_list"):
+        render_packing_list(user_inputs['city'], user_inputs['days'], itinerary_json)
     
     # Export Options
-    render_export_options(
-        itinerary_json, 
-        user_inputs['num_people'], 
-        user_inputs['city'], 
-        user_inputs['start_date'], 
-        user_inputs['end_date'], 
-        total_cost
-    )
+    with span("render.export_options"):
+        render_export_options(
+            itinerary_json, 
+            user_inputs['num_people'], 
+            user_inputs['city'], 
+            user_inputs['start_date'], 
+            user_inputs['end_date'], 
+            total_cost
+        )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,146 @@
+"""Admin diagnostics page for TripGenie.AI: memory per session, caches, pools and latency"""
+
+import hmac
+import os
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+import ai_service  # registers the generation pool gauges
+import diagnostics
+import generation_log
+import rate_limiter
+from config import ADMIN_TOKEN, APP_ICON, ITINERARY_REUSE_ENABLED, PAGE_TITLE
+from itinerary_cache import itinerary_cache
+from session_manager import get_session_id
+from telemetry import is_enabled
+
+st.set_page_config(page_title=f"{PAGE_TITLE} · Admin", page_icon=APP_ICON, layout="wide")
+
+# 🔒 Access
+if not ADMIN_TOKEN:
+    st.info("🔒 The admin page is disabled. Set TRIPGENIE_ADMIN_TOKEN to enable it.")
+    st.stop()
+if not st.session_state.get('admin_authorized'):
+    token = st.text_input("Admin token", type="password")
+    if not token:
+        st.stop()
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        st.error("Invalid admin token.")
+        st.stop()
+    st.session_state.admin_authorized = True
+    st.rerun()
+
+st.title("🛠️ Diagnostics")
+st.caption(f"Process {os.getpid()} · {datetime.now():%Y-%m-%d %H:%M:%S}")
+if st.button("🔄 Refresh"):
+    st.rerun()
+
+# 🧠 Session memory
+st.subheader("🧠 Session memory")
+sessions = diagnostics.live_sessions()
+if sessions:
+    current = get_session_id()
+    st.dataframe(pd.DataFrame([{
+        "session": row["session_id"][:8] + (" (you)" if row["session_id"] == current else ""),
+        "state KiB": row["total_bytes"] / 1024,
+        "reruns": row["reruns"],
+        "idle s": datetime.now().timestamp() - row["last_seen"],
+        "largest keys": ", ".join(f"{key} ({size / 1024:.1f} KiB)" for key, size in list(row["keys"].items())[:3]),
+    } for row in sessions]), use_container_width=True, hide_index=True)
+    st.caption(f"{len(sessions)} live sessions, {sum(row['total_bytes'] for row in sessions) / 1024:.1f} KiB "
+               "of session state in total (sizes are deep estimates; shared objects counted per session)")
+else:
+    st.write("No live sessions tracked yet.")
+
+# 🗃️ Caches and worker pools
+cache_col, pool_col = st.columns([3, 1])
+with cache_col:
+    st.subheader("🗃️ Caches")
+    st.dataframe(pd.DataFrame(diagnostics.cache_sizes()), use_container_width=True, hide_index=True)
+    if not ITINERARY_REUSE_ENABLED:
+        st.caption("Itinerary reuse is off (TRIPGENIE_ITINERARY_REUSE=0).")
+    else:
+        reuse = itinerary_cache.stats()
+        rate_col, saved_col, tokens_col, cost_col = st.columns(4)
+        rate_col.metric("Itinerary reuse rate", f"{reuse['reuse_rate']:.0%}")
+        saved_col.metric("Generations saved", reuse["generations_saved"])
+        tokens_col.metric("Tokens saved", f"{reuse['tokens_saved']:,}")
+        cost_col.metric("Cost saved", f"${reuse['cost_saved_usd']:.4f}")
+        st.caption(f"{reuse['lookups']} lookups: {reuse['exact']} exact, {reuse['slice']} cut from a longer trip, "
+                   f"{reuse['miss']} generated")
+with pool_col:
+    st.subheader("⚙️ Worker pools")
+    for name, value in diagnostics.worker_pools().items():
+        st.metric(name.replace("tripgenie_", "").replace("_", " "), value)
+
+# 🚦 Shared provider budget
+st.subheader("🚦 Shared provider budget")
+limiter = rate_limiter.get_limiter()
+if limiter is None:
+    st.write("Shared rate limiting is off (TRIPGENIE_RATE_LIMIT_BACKEND=off).")
+else:
+    budget = limiter.report()
+    rate_col, burst_col, flight_col = st.columns(3)
+    rate_col.metric("Requests per minute", f"{budget['rpm']:g}" if budget['rpm'] > 0 else "unlimited")
+    burst_col.metric("Tokens available", f"{budget['tokens_available']:.1f}" if budget['tokens_available'] is not None
+                     else "–")
+    flight_col.metric("Calls in flight", f"{budget['in_flight']} / {budget['max_concurrent'] or '∞'}")
+    if budget["processes"]:
+        st.dataframe(pd.DataFrame([{
+            "pid": f"{row['pid']}{' (this)' if row['current'] else ''}{'' if row['alive'] else ' (exited)'}",
+            "requests": row["requests"],
+            "share": row["share"],
+            "in flight": row["in_flight"],
+            "wait s": row["wait_s"],
+            "held s": row["held_s"],
+            "timeouts": row["timeouts"],
+        } for row in budget["processes"]]), use_container_width=True, hide_index=True)
+
+# 🗂️ Generation log
+st.subheader("🗂️ Generation log")
+writer = generation_log.get_writer()
+if writer is None:
+    st.write("The generation log is off (TRIPGENIE_GENERATION_LOG is empty).")
+else:
+    log_stats = writer.stats()
+    written_col, dropped_col, queued_col = st.columns(3)
+    written_col.metric("Records written", log_stats["written"])
+    dropped_col.metric("Records dropped", log_stats["dropped"])
+    queued_col.metric("Queued", log_stats["queued"])
+    st.caption(f"Current segment: {log_stats['segment'] or 'none yet'}")
+
+# ⏱️ Latency
+st.subheader("⏱️ Stage latency")
+latencies = diagnostics.stage_latencies()
+if latencies:
+    st.dataframe(pd.DataFrame(latencies), use_container_width=True, hide_index=True)
+elif not is_enabled():
+    st.write("Stage histograms are recorded when TRIPGENIE_METRICS=1.")
+else:
+    st.write("No stages recorded yet.")
+
+# 📸 Allocations
+st.subheader("📸 Allocations (tracemalloc)")
+memory = diagnostics.traced_memory()
+if memory is None:
+    st.write("tracemalloc is off. Starting it slows allocation-heavy code while it runs.")
+    if st.button("Start tracing"):
+        diagnostics.start_tracing(force=True)
+        st.rerun()
+else:
+    current_bytes, peak_bytes = memory
+    traced_col, peak_col, stop_col = st.columns(3)
+    traced_col.metric("Traced now", f"{current_bytes / 1024 / 1024:.1f} MiB")
+    peak_col.metric("Peak", f"{peak_bytes / 1024 / 1024:.1f} MiB")
+    if stop_col.button("Stop tracing"):
+        diagnostics.stop_tracing()
+        st.rerun()
+    st.dataframe(pd.DataFrame(diagnostics.top_allocations(limit=25)), use_container_width=True, hide_index=True)
+    if st.button("📸 Take snapshot"):
+        path, report = diagnostics.dump_snapshot()
+        st.success(f"Snapshot written to {path}")
+        st.download_button("Download top allocation sites", report, file_name=os.path.basename(path) + ".txt",
+                           mime="text/plain")
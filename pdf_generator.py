@@ -2,18 +2,226 @@
 
 from io import BytesIO
 import textwrap
+from telemetry import span
 from utils import extract_cost, generate_packing_list
 
+_pdf_styles = None
+
+def _get_pdf_styles():
+    """Build the shared colors and paragraph styles once per process"""
+    global _pdf_styles
+    if _pdf_styles is not None:
+        return _pdf_styles
+    
+    from reportlab.lib.colors import HexColor, black, white
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+    
+    # Define colors
+    primary_color = HexColor('#1e293b')
+    secondary_color = HexColor('#3b82f6')
+    accent_color = HexColor('#8b5cf6')
+    light_gray = HexColor('#f8fafc')
+    dark_gray = HexColor('#64748b')
+    
+    # Get styles and create custom ones
+    styles = getSampleStyleSheet()
+    
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        textColor=primary_color,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+    
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=20,
+        textColor=secondary_color,
+        alignment=TA_CENTER,
+        fontName='Helvetica'
+    )
+    
+    section_header_style = ParagraphStyle(
+        'SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        spaceBefore=20,
+        textColor=primary_color,
+        fontName='Helvetica-Bold'
+    )
+    
+    day_header_style = ParagraphStyle(
+        'DayHeader',
+        parent=styles['Heading3'],
+        fontSize=12,
+        spaceAfter=8,
+        spaceBefore=15,
+        textColor=white,
+        backColor=primary_color,
+        fontName='Helvetica-Bold',
+        leftIndent=10,
+        rightIndent=10,
+        borderPadding=8
+    )
+    
+    activity_title_style = ParagraphStyle(
+        'ActivityTitle',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=4,
+        textColor=primary_color,
+        fontName='Helvetica-Bold'
+    )
+    
+    body_style = ParagraphStyle(
+        'CustomBody',
+        parent=styles['Normal'],
+        fontSize=9,
+        spaceAfter=6,
+        textColor=black,
+        fontName='Helvetica',
+        leftIndent=15
+    )
+    
+    tip_style = ParagraphStyle(
+        'TipStyle',
+        parent=styles['Normal'],
+        fontSize=9,
+        spaceAfter=8,
+        textColor=HexColor('#059669'),
+        fontName='Helvetica-Oblique',
+        leftIndent=15,
+        backColor=HexColor('#f0fdf4'),
+        borderColor=HexColor('#10b981'),
+        borderWidth=1,
+        borderPadding=6
+    )
+    
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=dark_gray,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Oblique'
+    )
+    
+    _pdf_styles = {
+        'primary_color': primary_color,
+        'secondary_color': secondary_color,
+        'accent_color': accent_color,
+        'light_gray': light_gray,
+        'dark_gray': dark_gray,
+        'title': title_style,
+        'subtitle': subtitle_style,
+        'section_header': section_header_style,
+        'day_header': day_header_style,
+        'activity_title': activity_title_style,
+        'body': body_style,
+        'tip': tip_style,
+        'footer': footer_style
+    }
+    return _pdf_styles
+
+def _build_day_flowables(day_data, num_people, pdf_styles):
+    """Lay out the activities and cost summary for a single day"""
+    from reportlab.lib.colors import white
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.units import inch
+    
+    day_header_style = pdf_styles['day_header']
+    activity_title_style = pdf_styles['activity_title']
+    body_style = pdf_styles['body']
+    tip_style = pdf_styles['tip']
+    secondary_color = pdf_styles['secondary_color']
+    light_gray = pdf_styles['light_gray']
+    dark_gray = pdf_styles['dark_gray']
+    
+    flowables = []
+    
+    # Day Header
+    day_theme = day_data.get('theme', 'Exploration')
+    flowables.append(Paragraph(f"DAY {day_data['day']}: {day_theme.upper()}", day_header_style))
+    flowables.append(Spacer(1, 10))
+    
+    # Activities
+    for i, activity in enumerate(day_data.get("activities", []), 1):
+        # Activity title with time
+        time_info = f"{activity.get('start_time', '')} - {activity.get('end_time', '')}"
+        activity_header = f"{i}. {activity['title']} ({time_info})"
+        flowables.append(Paragraph(activity_header, activity_title_style))
+        
+        # Description
+        description = activity.get('description', 'N/A')
+        if len(description) > 100:
+            description = textwrap.fill(description, width=80)
+        flowables.append(Paragraph(f"<b>Description:</b> {description}", body_style))
+        
+        # Location
+        location = activity.get('location', 'N/A')
+        flowables.append(Paragraph(f"<b>Location:</b> {location}", body_style))
+        
+        # Cost
+        cost = activity.get('cost', 'N/A')
+        total_activity_cost = extract_cost(cost) * num_people if cost != 'N/A' else 'N/A'
+        if total_activity_cost != 'N/A':
+            flowables.append(Paragraph(f"<b>Cost:</b> {cost} per person (₹{total_activity_cost:,} total)", body_style))
+        else:
+            flowables.append(Paragraph(f"<b>Cost:</b> {cost}", body_style))
+        
+        # Insider tip
+        tip = activity.get('insider_tip', '')
+        if tip:
+            flowables.append(Paragraph(f"💡 <b>Insider Tip:</b> {tip}", tip_style))
+        
+        flowables.append(Spacer(1, 8))
+    
+    # Daily cost summary
+    daily_total = extract_cost(day_data.get('daily_total', '₹0'))
+    daily_per_person = daily_total // num_people if daily_total > 0 else 0
+    
+    daily_summary_data = [
+        ['Daily Summary', ''],
+        ['Total Cost', f"₹{daily_total:,}"],
+        ['Cost per Person', f"₹{daily_per_person:,}"],
+        ['Meals', day_data.get('meal_cost', 'N/A')],
+        ['Transport', day_data.get('transport_cost', 'N/A')]
+    ]
+    
+    daily_table = Table(daily_summary_data, colWidths=[1.5*inch, 2*inch])
+    daily_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (1, 0), secondary_color),
+        ('TEXTCOLOR', (0, 0), (1, 0), white),
+        ('FONTNAME', (0, 0), (1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (1, 0), 10),
+        ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 1), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (1, -1), 9),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, dark_gray),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [white, light_gray])
+    ]))
+    
+    flowables.append(daily_table)
+    flowables.append(Spacer(1, 20))
+    return flowables
+
 def create_professional_pdf(itinerary_json, num_people, city, start_date, end_date, total_cost):
     """Create a professional, beautifully formatted PDF itinerary"""
     try:
-        from reportlab.pdfgen import canvas
         from reportlab.lib.pagesizes import A4
-        from reportlab.lib.colors import HexColor, black, white
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.colors import white
         from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
         from reportlab.lib.units import inch
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
         
         buffer = BytesIO()
         
@@ -27,93 +235,16 @@ def create_professional_pdf(itinerary_json, num_people, city, start_date, end_da
             bottomMargin=0.75*inch
         )
         
-        # Define colors
-        primary_color = HexColor('#1e293b')
-        secondary_color = HexColor('#3b82f6')
-        accent_color = HexColor('#8b5cf6')
-        light_gray = HexColor('#f8fafc')
-        dark_gray = HexColor('#64748b')
-        
-        # Get styles and create custom ones
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            textColor=primary_color,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'CustomSubtitle',
-            parent=styles['Heading2'],
-            fontSize=16,
-            spaceAfter=20,
-            textColor=secondary_color,
-            alignment=TA_CENTER,
-            fontName='Helvetica'
-        )
-        
-        section_header_style = ParagraphStyle(
-            'SectionHeader',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=20,
-            textColor=primary_color,
-            fontName='Helvetica-Bold'
-        )
-        
-        day_header_style = ParagraphStyle(
-            'DayHeader',
-            parent=styles['Heading3'],
-            fontSize=12,
-            spaceAfter=8,
-            spaceBefore=15,
-            textColor=white,
-            backColor=primary_color,
-            fontName='Helvetica-Bold',
-            leftIndent=10,
-            rightIndent=10,
-            borderPadding=8
-        )
-        
-        activity_title_style = ParagraphStyle(
-            'ActivityTitle',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=4,
-            textColor=primary_color,
-            fontName='Helvetica-Bold'
-        )
-        
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=6,
-            textColor=black,
-            fontName='Helvetica',
-            leftIndent=15
-        )
-        
-        tip_style = ParagraphStyle(
-            'TipStyle',
-            parent=styles['Normal'],
-            fontSize=9,
-            spaceAfter=8,
-            textColor=HexColor('#059669'),
-            fontName='Helvetica-Oblique',
-            leftIndent=15,
-            backColor=HexColor('#f0fdf4'),
-            borderColor=HexColor('#10b981'),
-            borderWidth=1,
-            borderPadding=6
-        )
+        pdf_styles = _get_pdf_styles()
+        primary_color = pdf_styles['primary_color']
+        light_gray = pdf_styles['light_gray']
+        dark_gray = pdf_styles['dark_gray']
+        title_style = pdf_styles['title']
+        subtitle_style = pdf_styles['subtitle']
+        section_header_style = pdf_styles['section_header']
+        activity_title_style = pdf_styles['activity_title']
+        body_style = pdf_styles['body']
+        footer_style = pdf_styles['footer']
         
         # Build story (content)
         story = []
@@ -184,72 +315,7 @@ def create_professional_pdf(itinerary_json, num_people, city, start_date, end_da
         story.append(Spacer(1, 15))
         
         for day_data in itinerary_json.get("days", []):
-            # Day Header
-            day_theme = day_data.get('theme', 'Exploration')
-            story.append(Paragraph(f"DAY {day_data['day']}: {day_theme.upper()}", day_header_style))
-            story.append(Spacer(1, 10))
-            
-            # Activities
-            for i, activity in enumerate(day_data.get("activities", []), 1):
-                # Activity title with time
-                time_info = f"{activity.get('start_time', '')} - {activity.get('end_time', '')}"
-                activity_header = f"{i}. {activity['title']} ({time_info})"
-                story.append(Paragraph(activity_header, activity_title_style))
-                
-                # Description
-                description = activity.get('description', 'N/A')
-                if len(description) > 100:
-                    description = textwrap.fill(description, width=80)
-                story.append(Paragraph(f"<b>Description:</b> {description}", body_style))
-                
-                # Location
-                location = activity.get('location', 'N/A')
-                story.append(Paragraph(f"<b>Location:</b> {location}", body_style))
-                
-                # Cost
-                cost = activity.get('cost', 'N/A')
-                total_activity_cost = extract_cost(cost) * num_people if cost != 'N/A' else 'N/A'
-                if total_activity_cost != 'N/A':
-                    story.append(Paragraph(f"<b>Cost:</b> {cost} per person (₹{total_activity_cost:,} total)", body_style))
-                else:
-                    story.append(Paragraph(f"<b>Cost:</b> {cost}", body_style))
-                
-                # Insider tip
-                tip = activity.get('insider_tip', '')
-                if tip:
-                    story.append(Paragraph(f"💡 <b>Insider Tip:</b> {tip}", tip_style))
-                
-                story.append(Spacer(1, 8))
-            
-            # Daily cost summary
-            daily_total = extract_cost(day_data.get('daily_total', '₹0'))
-            daily_per_person = daily_total // num_people if daily_total > 0 else 0
-            
-            daily_summary_data = [
-                ['Daily Summary', ''],
-                ['Total Cost', f"₹{daily_total:,}"],
-                ['Cost per Person', f"₹{daily_per_person:,}"],
-                ['Meals', day_data.get('meal_cost', 'N/A')],
-                ['Transport', day_data.get('transport_cost', 'N/A')]
-            ]
-            
-            daily_table = Table(daily_summary_data, colWidths=[1.5*inch, 2*inch])
-            daily_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (1, 0), secondary_color),
-                ('TEXTCOLOR', (0, 0), (1, 0), white),
-                ('FONTNAME', (0, 0), (1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (1, 0), 10),
-                ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (1, 1), (1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (1, -1), 9),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('GRID', (0, 0), (-1, -1), 0.5, dark_gray),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [white, light_gray])
-            ]))
-            
-            story.append(daily_table)
-            story.append(Spacer(1, 20))
+            story.extend(_build_day_flowables(day_data, num_people, pdf_styles))
         
         # Local Tips
         if "local_tips" in itinerary_json and itinerary_json["local_tips"]:
@@ -281,18 +347,11 @@ def create_professional_pdf(itinerary_json, num_people, city, start_date, end_da
         
         # Footer info
         story.append(Spacer(1, 30))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=dark_gray,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Oblique'
-        )
         story.append(Paragraph("Generated by Elite Travel Planner | Safe travels and enjoy your adventure!", footer_style))
         
         # Build PDF
-        doc.build(story)
+        with span("pdf.layout", flowables=len(story)):
+            doc.build(story)
         buffer.seek(0)
         return buffer
         
@@ -324,9 +383,9 @@ def create_simple_fallback_pdf(itinerary_json, num_people, city, start_date, end
         # Title
         pdf.setFillColor(HexColor('#ffffff'))
         pdf.setFont("Helvetica-Bold", 24)
-        pdf.drawCentredText(width/2, height-35, f"Elite Travel Itinerary")
+        pdf.drawCentredString(width/2, height-35, f"Elite Travel Itinerary")
         pdf.setFont("Helvetica", 16)
-        pdf.drawCentredText(width/2, height-55, f"{city}")
+        pdf.drawCentredString(width/2, height-55, f"{city}")
         
         # Reset color
         pdf.setFillColor(HexColor('#000000'))
@@ -400,7 +459,7 @@ def create_simple_fallback_pdf(itinerary_json, num_people, city, start_date, end
         
         # Footer
         pdf.setFont("Helvetica-Oblique", 8)
-        pdf.drawCentredText(width/2, 30, "Generated by Elite Travel Planner")
+        pdf.drawCentredString(width/2, 30, "Generated by Elite Travel Planner")
         
         pdf.save()
         buffer.seek(0)
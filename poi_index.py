@@ -0,0 +1,251 @@
+"""Local index of activities and places from generated itineraries
+
+    python poi_index.py search --city Paris --category food --price budget "street market"
+    python poi_index.py stats
+
+Every activity is stored once per city (name and country for known cities),
+deduplicated by normalized title and location, in SQLite with an FTS5 table
+over its text. Repeat sightings bump a
+counter so popular places rank first when there is no text query.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import POI_INDEX_ENABLED, POI_INDEX_PATH, PRICE_BANDS
+from destinations import canonical_city, city_key, fold_name
+from telemetry import increment, log_event, span
+from utils import extract_cost
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pois (
+    id INTEGER PRIMARY KEY,
+    city_key TEXT NOT NULL,
+    city TEXT NOT NULL,
+    title TEXT NOT NULL,
+    norm_title TEXT NOT NULL,
+    location TEXT NOT NULL DEFAULT '',
+    norm_location TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    cost_inr INTEGER NOT NULL DEFAULT 0,
+    insider_tip TEXT NOT NULL DEFAULT '',
+    times_seen INTEGER NOT NULL DEFAULT 1,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    UNIQUE (city_key, norm_title, norm_location)
+);
+CREATE INDEX IF NOT EXISTS pois_city_category ON pois (city_key, category);
+CREATE INDEX IF NOT EXISTS pois_city_cost ON pois (city_key, cost_inr);
+"""
+
+# External-content FTS table kept in sync with pois by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS pois_fts USING fts5(
+    title, description, location, category, insider_tip, content='pois', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS pois_ai AFTER INSERT ON pois BEGIN
+    INSERT INTO pois_fts (rowid, title, description, location, category, insider_tip)
+    VALUES (new.id, new.title, new.description, new.location, new.category, new.insider_tip);
+END;
+CREATE TRIGGER IF NOT EXISTS pois_au AFTER UPDATE ON pois BEGIN
+    INSERT INTO pois_fts (pois_fts, rowid, title, description, location, category, insider_tip)
+    VALUES ('delete', old.id, old.title, old.description, old.location, old.category, old.insider_tip);
+    INSERT INTO pois_fts (rowid, title, description, location, category, insider_tip)
+    VALUES (new.id, new.title, new.description, new.location, new.category, new.insider_tip);
+END;
+CREATE TRIGGER IF NOT EXISTS pois_ad AFTER DELETE ON pois BEGIN
+    INSERT INTO pois_fts (pois_fts, rowid, title, description, location, category, insider_tip)
+    VALUES ('delete', old.id, old.title, old.description, old.location, old.category, old.insider_tip);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO pois (city_key, city, title, norm_title, location, norm_location, description, category,
+                  cost_inr, insider_tip, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (city_key, norm_title, norm_location) DO UPDATE SET
+    times_seen = times_seen + 1,
+    last_seen = excluded.last_seen,
+    description = excluded.description,
+    category = excluded.category,
+    cost_inr = excluded.cost_inr,
+    insider_tip = CASE WHEN excluded.insider_tip != '' THEN excluded.insider_tip ELSE insider_tip END
+"""
+
+# Bumped when city_key changes so existing rows are re-keyed on open
+_KEY_VERSION = 1
+
+_COLUMNS = ("id", "city", "title", "location", "description", "category", "cost_inr", "insider_tip", "times_seen")
+
+class POIIndex:
+    """SQLite-backed activity store with full-text search"""
+
+    def __init__(self, path=POI_INDEX_PATH):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.has_fts = False
+
+    def _connect(self):
+        # A connection inherited through fork must not be shared with the parent
+        if self._conn is None or self._pid != os.getpid():
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            try:
+                conn.executescript(_FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5; text queries fall back to LIKE
+                self.has_fts = False
+            _rekey(conn)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def ingest(self, itinerary_json, city, country_code=None):
+        """Add every activity in an itinerary; returns the number of activities seen"""
+        now = time.time()
+        key = city_key(city, country_code)
+        name = canonical_city(city, country_code)
+        rows = []
+        for day in itinerary_json.get('days', []):
+            for activity in day.get('activities', []):
+                title = (activity.get('title') or "").strip()
+                if not title:
+                    continue
+                location = (activity.get('location') or "").strip()
+                rows.append((
+                    key, name, title, fold_name(title), location, fold_name(location),
+                    activity.get('description') or "", (activity.get('category') or "").strip().lower(),
+                    extract_cost(activity.get('cost')), activity.get('insider_tip') or "", now, now
+                ))
+        if rows:
+            with span("poi.ingest", activities=len(rows)), self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.executemany(_UPSERT, rows)
+            increment("tripgenie_poi_ingested_total", len(rows), "Activities written to the POI index")
+        return len(rows)
+
+    def search(self, city=None, category=None, price_band=None, text=None, limit=20, country_code=None):
+        """Activities matching every given filter, best matches first"""
+        clauses = []
+        args = []
+        if city:
+            clauses.append("p.city_key = ?")
+            args.append(city_key(city, country_code))
+        if category:
+            clauses.append("p.category LIKE ?")
+            args.append(f"%{category.strip().lower()}%")
+        if price_band:
+            if price_band not in PRICE_BANDS:
+                raise ValueError(f"Unknown price band {price_band!r}; expected one of {', '.join(PRICE_BANDS)}")
+            low, high = PRICE_BANDS[price_band]
+            clauses.append("p.cost_inr >= ?")
+            args.append(low)
+            if high is not None:
+                clauses.append("p.cost_inr <= ?")
+                args.append(high)
+
+        with self._lock:
+            conn = self._connect()
+            query = _match_query(text) if text else None
+            if query and self.has_fts:
+                sql = ("SELECT p.* FROM pois_fts JOIN pois p ON p.id = pois_fts.rowid WHERE pois_fts MATCH ?"
+                       + "".join(f" AND {clause}" for clause in clauses)
+                       + " ORDER BY bm25(pois_fts), p.times_seen DESC LIMIT ?")
+                args = [query, *args]
+            else:
+                if query:
+                    clauses.append("(p.title LIKE ? OR p.description LIKE ? OR p.location LIKE ?)")
+                    args.extend([f"%{text.strip()}%"] * 3)
+                where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+                sql = f"SELECT p.* FROM pois p{where} ORDER BY p.times_seen DESC, p.last_seen DESC LIMIT ?"
+            with span("poi.search"):
+                rows = conn.execute(sql, [*args, limit]).fetchall()
+        return [{column: row[column] for column in _COLUMNS} for row in rows]
+
+    def stats(self):
+        """Activity counts overall and per city"""
+        with self._lock:
+            conn = self._connect()
+            total = conn.execute("SELECT COUNT(*) FROM pois").fetchone()[0]
+            cities = conn.execute(
+                "SELECT city, COUNT(*) AS n FROM pois GROUP BY city_key ORDER BY n DESC"
+            ).fetchall()
+        return {"activities": total, "cities": {row["city"]: row["n"] for row in cities}, "fts": self.has_fts}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+
+def _rekey(conn):
+    """Recompute city keys written by an older city_key from each row's stored city name"""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= _KEY_VERSION:
+        return
+    with conn:
+        for row in conn.execute("SELECT DISTINCT city_key, city FROM pois").fetchall():
+            key = city_key(row["city"])
+            if key != row["city_key"]:
+                # A place already stored under the new key keeps that row
+                conn.execute("UPDATE OR IGNORE pois SET city_key = ? WHERE city_key = ? AND city = ?",
+                             (key, row["city_key"], row["city"]))
+                conn.execute("DELETE FROM pois WHERE city_key = ? AND city = ?", (row["city_key"], row["city"]))
+        conn.execute(f"PRAGMA user_version = {_KEY_VERSION}")
+
+def _match_query(text):
+    """Quote each word for FTS5 so user input cannot inject query syntax; last word matches as a prefix"""
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    quoted = [f'"{word}"' for word in words]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+# Shared by every session in this process
+poi_index = POIIndex()
+
+def index_itinerary(itinerary_json, city, country_code=None):
+    """Ingest a generated itinerary; indexing problems never fail a generation"""
+    if not POI_INDEX_ENABLED:
+        return 0
+    try:
+        return poi_index.ingest(itinerary_json, city, country_code)
+    except sqlite3.Error as e:
+        log_event("poi.ingest_failed", city=city, error=str(e))
+        return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the local POI index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="find activities")
+    search.add_argument("text", nargs="?", help="full-text query")
+    search.add_argument("--city")
+    search.add_argument("--country", help="ISO country code for a city name shared by several countries")
+    search.add_argument("--category")
+    search.add_argument("--price", choices=list(PRICE_BANDS))
+    search.add_argument("--limit", type=int, default=20)
+    commands.add_parser("stats", help="show index size")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        result = poi_index.stats()
+    else:
+        result = poi_index.search(args.city, args.category, args.price, args.text, args.limit, args.country)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,270 @@
+"""Off-peak pre-warming of the itinerary cache for popular trips
+
+    python prewarm.py --dry-run       # show the plan and current peak-hour coverage
+    python prewarm.py --now           # run once, ignoring the off-peak window
+
+The itinerary cache lives in-process, so inside the Streamlit app or the API
+server the job runs on a daemon thread started by start_prewarm_scheduler()
+when TRIPGENIE_PREWARM=1. It reads requests from the generation log, regenerates the most
+requested (city, days, budget, pace) combinations and anything about to
+expire, and stays within a request rate and a token budget.
+
+Every worker starts the thread, but by default only the holder of a
+host-wide SQLite lease runs the job, so the provider cost does not grow with
+the number of workers. The holder publishes what it generates to a shared
+SQLite table, and every worker's thread copies new entries into its own
+cache each PREWARM_SYNC_INTERVAL, so all workers are warmed by one run. With
+PREWARM_SINGLE_RUNNER off every worker warms its own cache at N times the cost.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from config import (
+    ITINERARY_STALE_TTL, PREWARM_ENABLED, PREWARM_EXPIRY_WINDOW, PREWARM_INTERVAL, PREWARM_LEASE_PATH,
+    PREWARM_LEASE_TTL, PREWARM_LOOKBACK_DAYS, PREWARM_OFF_PEAK_HOURS, PREWARM_PEAK_HOUR_COUNT,
+    PREWARM_REQUESTS_PER_MINUTE, PREWARM_SINGLE_RUNNER, PREWARM_STORE_PATH, PREWARM_SYNC_INTERVAL,
+    PREWARM_TOKEN_BUDGET, PREWARM_TOP_N
+)
+from destinations import city_key
+from generation_log import read_requests
+from itinerary_cache import itinerary_cache, profile_key
+from rate_limiter import SQLiteBackend
+from telemetry import increment, log_event
+
+PREWARM_SESSION_ID = "prewarm"
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+class WarmStore:
+    """Pre-warmed itineraries in SQLite, shared by every worker process on the host"""
+
+    def __init__(self, path=PREWARM_STORE_PATH, max_age=ITINERARY_STALE_TTL):
+        self.path = path
+        self.max_age = max_age
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # A connection inherited through fork must not be shared with the parent
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS warmed (id INTEGER PRIMARY KEY, created REAL NOT NULL, "
+                         "pid INTEGER NOT NULL, trip_params TEXT NOT NULL, itinerary TEXT NOT NULL, usage TEXT)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def publish(self, trip_params, itinerary_json, usage=None):
+        """Add one warmed itinerary and drop those too old to be served"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT INTO warmed (created, pid, trip_params, itinerary, usage) VALUES (?, ?, ?, ?, ?)",
+                             (now, os.getpid(), json.dumps(trip_params), json.dumps(itinerary_json),
+                              json.dumps(usage) if usage else None))
+                conn.execute("DELETE FROM warmed WHERE created < ?", (now - self.max_age,))
+
+    def since(self, row_id=0):
+        """Itineraries published by other processes after row_id, as (id, created, trip_params, itinerary, usage)"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, created, trip_params, itinerary, usage FROM warmed WHERE id > ? AND pid != ? ORDER BY id",
+                (row_id, os.getpid())
+            ).fetchall()
+        return [(row_id, created, json.loads(trip_params), json.loads(itinerary),
+                 json.loads(usage) if usage else None) for row_id, created, trip_params, itinerary, usage in rows]
+
+def sync_warmed(store, after=0):
+    """Copy itineraries another worker warmed into this process's cache; returns the last row seen"""
+    rows = store.since(after)
+    for row_id, created, trip_params, itinerary_json, usage in rows:
+        itinerary_cache.store(trip_params, itinerary_json, usage, created)
+        after = row_id
+    if rows:
+        increment("tripgenie_prewarm_synced_total", len(rows), "Warmed itineraries copied from other workers")
+    return after
+
+def _combo(trip_params):
+    return (city_key(trip_params['city'], trip_params.get('country_code')), trip_params['days'],
+            trip_params.get('budget'), trip_params.get('travel_pace'))
+
+def _trip_params(record):
+    return {key: value for key, value in record.items() if key not in ("ts", "source")}
+
+def popular_trips(records, top_n=PREWARM_TOP_N):
+    """The most requested combinations as [(count, trip_params)], using the latest request for each"""
+    counts = Counter()
+    latest = {}
+    for record in records:
+        combo = _combo(record)
+        counts[combo] += 1
+        latest[combo] = _trip_params(record)
+    return [(count, latest[combo]) for combo, count in counts.most_common(top_n)]
+
+def peak_hours(records, count=PREWARM_PEAK_HOUR_COUNT):
+    """Local hours of the day with the most requests"""
+    by_hour = Counter(datetime.fromtimestamp(record["ts"]).hour for record in records)
+    return sorted(hour for hour, _ in by_hour.most_common(count))
+
+def peak_coverage(records, hours):
+    """Share of peak-hour requests the cache would serve right now"""
+    peak = [record for record in records if datetime.fromtimestamp(record["ts"]).hour in hours]
+    if not peak:
+        return 0.0
+    return sum(itinerary_cache.covers(_trip_params(record)) for record in peak) / len(peak)
+
+def in_off_peak(now=None, window=PREWARM_OFF_PEAK_HOURS):
+    """True when the local hour falls in the [start, end) off-peak window, which may wrap midnight"""
+    hour = (now or datetime.now()).hour
+    start, end = window
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+def build_plan(records, top_n=PREWARM_TOP_N, expiry_window=PREWARM_EXPIRY_WINDOW):
+    """Trips to generate: popular ones not cached past the window, then other soon-to-expire entries"""
+    plan = []
+    seen = set()
+    candidates = [params for _, params in popular_trips(records, top_n)] + itinerary_cache.expiring(expiry_window)
+    for params in candidates:
+        key = (profile_key(params), params['days'])
+        if key in seen or itinerary_cache.covers(params, fresh_for=expiry_window):
+            continue
+        seen.add(key)
+        plan.append(params)
+    return plan
+
+def run_prewarm(top_n=PREWARM_TOP_N, lookback_days=PREWARM_LOOKBACK_DAYS,
+                requests_per_minute=PREWARM_REQUESTS_PER_MINUTE, token_budget=PREWARM_TOKEN_BUDGET,
+                expiry_window=PREWARM_EXPIRY_WINDOW, dry_run=False, store=None):
+    """Generate the pre-warm plan under a rate and token budget and return a report
+
+    Each itinerary is also published to `store` (a WarmStore) for the other workers.
+    """
+    records = list(read_requests(since=time.time() - lookback_days * 86400))
+    hours = peak_hours(records)
+    plan = build_plan(records, top_n, expiry_window)
+    report = {
+        "requests_considered": len(records),
+        "peak_hours": hours,
+        "planned": len(plan),
+        "generated": 0,
+        "failed": 0,
+        "tokens": 0,
+        "stopped": None,
+        "coverage_before": peak_coverage(records, hours),
+    }
+    if dry_run:
+        report["plan"] = [{"city": p['city'], "days": p['days'], "budget": p.get('budget'),
+                           "travel_pace": p.get('travel_pace')} for p in plan]
+        report["coverage_after"] = report["coverage_before"]
+        return report
+
+    from ai_service import AITravelService
+    from usage import BudgetExceededError, ledger
+    # token_budget caps each run; a session budget would add up over every run since startup
+    ledger.exempt_session(PREWARM_SESSION_ID)
+    service = AITravelService(session_id=PREWARM_SESSION_ID)
+    interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+    for index, params in enumerate(plan):
+        if token_budget is not None and report["tokens"] >= token_budget:
+            report["stopped"] = "token_budget"
+            break
+        if index and interval:
+            time.sleep(interval)
+        try:
+            itinerary_json = service.generate_itinerary(params, reuse=False)
+        except BudgetExceededError:
+            report["stopped"] = "usage_budget"
+            break
+        except (ValueError, RuntimeError) as e:
+            report["failed"] += 1
+            increment("tripgenie_prewarm_generations_total", 1, "Pre-warm generations by outcome", outcome="error")
+            log_event("prewarm.failed", city=params['city'], days=params['days'], error=str(e))
+            continue
+        report["generated"] += 1
+        report["tokens"] += (service.last_usage or {}).get("total_tokens", 0)
+        if store is not None:
+            try:
+                store.publish(params, itinerary_json, service.last_usage)
+            except sqlite3.Error as e:
+                log_event("prewarm.publish_failed", city=params['city'], error=str(e))
+        increment("tripgenie_prewarm_generations_total", 1, "Pre-warm generations by outcome", outcome="ok")
+
+    report["coverage_after"] = peak_coverage(records, hours)
+    log_event("prewarm.run", **report)
+    return report
+
+def hold_lease(backend, ttl=PREWARM_LEASE_TTL, now=None):
+    """Claim or renew the host-wide pre-warm lease; True while this process holds it"""
+    now = time.time() if now is None else now
+    with backend.transaction() as state:
+        if state.get("pid") not in (None, os.getpid()) and state.get("expires", 0) > now:
+            return False
+        state.update(pid=os.getpid(), expires=now + ttl)
+        return True
+
+def _scheduler_loop():
+    last_run = 0.0
+    synced = 0
+    lease = store = None
+    if PREWARM_SINGLE_RUNNER:
+        lease = SQLiteBackend(PREWARM_LEASE_PATH, name="prewarm")
+        store = WarmStore()
+    while True:
+        try:
+            # Renewed every tick, so a stopped holder's lease lapses after PREWARM_LEASE_TTL
+            runner = lease is None or hold_lease(lease)
+            if store is not None:
+                synced = sync_warmed(store, synced)
+        except sqlite3.Error as e:
+            runner = False
+            log_event("prewarm.lease_failed", error=str(e))
+        if runner and in_off_peak() and time.time() - last_run >= PREWARM_INTERVAL:
+            last_run = time.time()
+            try:
+                run_prewarm(store=store)
+            except Exception as e:
+                log_event("prewarm.failed", error=str(e))
+        time.sleep(PREWARM_SYNC_INTERVAL)
+
+def start_prewarm_scheduler():
+    """Run pre-warming in off-peak windows from a daemon thread; safe to call on every rerun"""
+    global _scheduler
+    if not PREWARM_ENABLED or _scheduler is not None:
+        return _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = threading.Thread(target=_scheduler_loop, name="tripgenie-prewarm", daemon=True)
+            _scheduler.start()
+    return _scheduler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-warm the TripGenie.AI itinerary cache")
+    parser.add_argument("--top", type=int, default=PREWARM_TOP_N, help="popular combinations to keep warm")
+    parser.add_argument("--lookback-days", type=float, default=PREWARM_LOOKBACK_DAYS)
+    parser.add_argument("--rpm", type=float, default=PREWARM_REQUESTS_PER_MINUTE, help="generation requests per minute")
+    parser.add_argument("--token-budget", type=int, default=PREWARM_TOKEN_BUDGET)
+    parser.add_argument("--now", action="store_true", help="run even outside the off-peak window")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without generating")
+    args = parser.parse_args(argv)
+
+    if not (args.now or args.dry_run or in_off_peak()):
+        print(f"Outside the off-peak window {PREWARM_OFF_PEAK_HOURS}; use --now to run anyway")
+        return 0
+    # A separate process has no cache anyone reads, so publish for the running workers to pick up
+    report = run_prewarm(args.top, args.lookback_days, args.rpm, args.token_budget, dry_run=args.dry_run,
+                         store=WarmStore())
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,309 @@
+"""Host-wide rate limit and concurrency cap for provider calls
+
+    python rate_limiter.py status
+
+Every worker process on a host draws from one token bucket (requests per
+minute with a burst) and one pool of concurrent-call slots. The shared state
+is a small JSON document read and written atomically by a pluggable backend:
+SQLite in WAL mode (the default), a JSON file guarded by flock, or process
+memory. Each process also records what it used, so the split of the budget
+between workers can be inspected.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from config import (
+    RATE_LIMIT_BACKEND, RATE_LIMIT_BURST, RATE_LIMIT_LEASE_TTL, RATE_LIMIT_MAX_CONCURRENT, RATE_LIMIT_PATH,
+    RATE_LIMIT_RPM, RATE_LIMIT_TIMEOUT
+)
+from telemetry import increment, observe, register_gauge, span
+
+_POLL_INTERVAL = 0.05  # Seconds between checks while every concurrency slot is taken
+_PROCESS_RETENTION = 24 * 60 * 60  # Usage of exited processes stays in the report this long
+
+class RateLimitTimeout(RuntimeError):
+    """No provider slot became free in time"""
+
+class MemoryBackend:
+    """State private to this process; limits threads only"""
+
+    def __init__(self, path=None):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self._lock:
+            state = json.loads(json.dumps(self._state))
+            yield state
+            self._state = state
+
+class SQLiteBackend:
+    """State in one SQLite row; BEGIN IMMEDIATE serializes processes, WAL keeps readers unblocked"""
+
+    def __init__(self, path, name="provider"):
+        self.path = path + ".sqlite3"
+        self.name = name
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # A connection inherited through fork must not be shared with the parent
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS limiter_state (name TEXT PRIMARY KEY, state TEXT NOT NULL)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT state FROM limiter_state WHERE name = ?", (self.name,)).fetchone()
+                state = json.loads(row[0]) if row else {}
+                yield state
+                conn.execute(
+                    "INSERT INTO limiter_state (name, state) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET state = excluded.state",
+                    (self.name, json.dumps(state)),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+class FileBackend:
+    """State in a JSON file locked with flock (POSIX only)"""
+
+    def __init__(self, path):
+        self.path = path + ".json"
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        import fcntl
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), "r+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    try:
+                        state = json.loads(f.read() or "{}")
+                    except ValueError:
+                        # A write cut short by a crash; start over with a full bucket
+                        state = {}
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+_BACKENDS = {"sqlite": SQLiteBackend, "file": FileBackend, "memory": MemoryBackend}
+
+def register_backend(name, factory):
+    """Make a custom backend selectable by name; factory(path) returns an object with transaction()"""
+    _BACKENDS[name] = factory
+
+def _pid_alive(pid):
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+class SharedRateLimiter:
+    """Token bucket plus concurrency semaphore over shared state"""
+
+    def __init__(self, backend, rpm=RATE_LIMIT_RPM, burst=RATE_LIMIT_BURST, max_concurrent=RATE_LIMIT_MAX_CONCURRENT,
+                 lease_ttl=RATE_LIMIT_LEASE_TTL, timeout=RATE_LIMIT_TIMEOUT):
+        self.backend = backend
+        self.rpm = rpm
+        self.burst = max(1, burst)
+        self.max_concurrent = max_concurrent
+        self.lease_ttl = lease_ttl
+        self.timeout = timeout
+        self.held = 0  # Slots held by this process
+        self._held_lock = threading.Lock()
+
+    def _refresh(self, state, now):
+        """Refill the bucket and reclaim slots from expired leases and exited processes"""
+        if "tokens" not in state:
+            state.update(tokens=float(self.burst), updated=now, leases={}, processes={})
+        if self.rpm > 0:
+            refill = (now - state["updated"]) * self.rpm / 60
+            state["tokens"] = min(float(self.burst), state["tokens"] + max(0.0, refill))
+        state["updated"] = now
+        alive = {}
+        for lease_id, lease in list(state["leases"].items()):
+            pid = lease["pid"]
+            if pid not in alive:
+                alive[pid] = pid == os.getpid() or _pid_alive(pid)
+            if lease["expires"] < now or not alive[pid]:
+                del state["leases"][lease_id]
+                increment("tripgenie_rate_limit_reclaimed_total", 1, "Provider slots reclaimed from stale leases")
+        for pid, usage in list(state["processes"].items()):
+            if now - usage["last_seen"] > _PROCESS_RETENTION:
+                del state["processes"][pid]
+
+    def _process(self, state, now):
+        usage = state["processes"].setdefault(str(os.getpid()), {
+            "requests": 0, "wait_s": 0.0, "held_s": 0.0, "timeouts": 0, "started": now,
+        })
+        usage["last_seen"] = now
+        return usage
+
+    def _try_acquire(self, state, now):
+        """Take a slot and a token if both are free; returns (lease_id, seconds to wait before retrying)"""
+        self._refresh(state, now)
+        if self.max_concurrent > 0 and len(state["leases"]) >= self.max_concurrent:
+            return None, _POLL_INTERVAL
+        if self.rpm > 0:
+            if state["tokens"] < 1:
+                return None, (1 - state["tokens"]) * 60 / self.rpm
+            state["tokens"] -= 1
+        lease_id = uuid.uuid4().hex
+        state["leases"][lease_id] = {"pid": os.getpid(), "acquired": now, "expires": now + self.lease_ttl}
+        return lease_id, 0.0
+
+    def acquire(self, timeout=None):
+        """Block until a slot is free; returns (lease_id, seconds waited) or raises RateLimitTimeout"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        while True:
+            now = time.time()
+            waited = time.monotonic() - start
+            with self.backend.transaction() as state:
+                lease_id, retry_after = self._try_acquire(state, now)
+                if lease_id is not None:
+                    usage = self._process(state, now)
+                    usage["requests"] += 1
+                    usage["wait_s"] += waited
+            if lease_id is not None:
+                with self._held_lock:
+                    self.held += 1
+                increment("tripgenie_rate_limit_acquired_total", 1, "Provider slots granted by the shared limiter")
+                observe("tripgenie_rate_limit_wait_seconds", waited, "Time spent waiting for a provider slot")
+                return lease_id, waited
+            remaining = timeout - waited
+            if remaining <= 0:
+                with self.backend.transaction() as state:
+                    self._refresh(state, now)
+                    self._process(state, now)["timeouts"] += 1
+                increment("tripgenie_rate_limit_timeouts_total", 1, "Calls that gave up waiting for a provider slot")
+                raise RateLimitTimeout(f"No provider slot became free within {timeout:g}s (shared rate limit)")
+            # Jitter keeps waiting threads and processes from retrying in lockstep
+            time.sleep(min(max(retry_after, 0.01) * random.uniform(1.0, 1.5), remaining))
+
+    def release(self, lease_id, held_s=0.0):
+        now = time.time()
+        with self.backend.transaction() as state:
+            self._refresh(state, now)
+            state["leases"].pop(lease_id, None)
+            self._process(state, now)["held_s"] += held_s
+        with self._held_lock:
+            self.held -= 1
+
+    @contextlib.contextmanager
+    def slot(self, timeout=None):
+        """Hold one provider slot for the duration of the block"""
+        with span("rate_limit.acquire"):
+            lease_id, waited = self.acquire(timeout)
+        start = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(lease_id, time.perf_counter() - start)
+
+    def report(self):
+        """Shared budget state and each process's share of it"""
+        now = time.time()
+        with self.backend.transaction() as state:
+            self._refresh(state, now)
+            tokens = state["tokens"]
+            leases = list(state["leases"].values())
+            processes = json.loads(json.dumps(state["processes"]))
+        in_flight = Counter(lease["pid"] for lease in leases)
+        total = sum(usage["requests"] for usage in processes.values())
+        rows = []
+        for pid, usage in processes.items():
+            pid = int(pid)
+            rows.append({
+                "pid": pid,
+                "current": pid == os.getpid(),
+                "alive": pid == os.getpid() or _pid_alive(pid),
+                "in_flight": in_flight[pid],
+                "share": usage["requests"] / total if total else 0.0,
+                **usage,
+            })
+        return {
+            "backend": type(self.backend).__name__,
+            "rpm": self.rpm,
+            "burst": self.burst,
+            "max_concurrent": self.max_concurrent,
+            "tokens_available": tokens if self.rpm > 0 else None,
+            "in_flight": len(leases),
+            "processes": sorted(rows, key=lambda row: -row["requests"]),
+        }
+
+def make_limiter(backend=RATE_LIMIT_BACKEND, path=RATE_LIMIT_PATH, **options):
+    """Build a limiter for a named backend, or None when the backend is "off\""""
+    if backend == "off":
+        return None
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown rate limit backend {backend!r}; expected off or one of {', '.join(_BACKENDS)}")
+    return SharedRateLimiter(_BACKENDS[backend](path), **options)
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter():
+    """The process-wide limiter, built on first use so custom backends can be registered at startup"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = make_limiter() or False
+    return _limiter or None
+
+def provider_slot(timeout=None):
+    """Context manager holding a shared provider slot; a no-op when limiting is off"""
+    limiter = get_limiter()
+    return limiter.slot(timeout) if limiter else contextlib.nullcontext(0.0)
+
+register_gauge("tripgenie_rate_limit_slots_held", lambda: _limiter.held if _limiter else 0,
+               "Shared provider slots held by this process")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the shared provider rate limit")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="show the shared budget and per-process usage")
+    parser.parse_args(argv)
+
+    limiter = get_limiter()
+    if limiter is None:
+        print("Shared rate limiting is off (TRIPGENIE_RATE_LIMIT_BACKEND=off)")
+        return 0
+    print(json.dumps(limiter.report(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
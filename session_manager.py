@@ -1,9 +1,17 @@
 """Session state management for TripGenie.AI"""
 
 import streamlit as st
+from diagnostics import track_session
+
+def get_session_id():
+    """Return the Streamlit session ID for the current script run, if any"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
 
 def initialize_session_state():
     """Initialize session state variables"""
+    track_session()
     if 'itinerary_generated' not in st.session_state:
         st.session_state.itinerary_generated = False
     if 'itinerary_data' not in st.session_state:
@@ -12,6 +20,16 @@ def initialize_session_state():
         st.session_state.total_cost = 0
     if 'expanded_days' not in st.session_state:
         st.session_state.expanded_days = set()
+    if 'trip_details' not in st.session_state:
+        st.session_state.trip_details = None
+    if 'pending_refresh' not in st.session_state:
+        st.session_state.pending_refresh = None
+    if 'reuse_kind' not in st.session_state:
+        st.session_state.reuse_kind = None
+    if 'comparison' not in st.session_state:
+        st.session_state.comparison = None
+    if 'refine_history' not in st.session_state:
+        st.session_state.refine_history = []
 
 def reset_session():
     """Reset session state for new journey"""
@@ -19,9 +37,17 @@ def reset_session():
     st.session_state.itinerary_data = None
     st.session_state.total_cost = 0
     st.session_state.expanded_days = set()
+    st.session_state.trip_details = None
+    st.session_state.pending_refresh = None
+    st.session_state.reuse_kind = None
+    st.session_state.comparison = None
+    st.session_state.refine_history = []
 
-def store_itinerary(itinerary_data, total_cost):
+def store_itinerary(itinerary_data, total_cost, trip_details=None):
     """Store itinerary data in session state"""
     st.session_state.itinerary_data = itinerary_data
     st.session_state.total_cost = total_cost
+    st.session_state.trip_details = trip_details
     st.session_state.itinerary_generated = True
+    # Refinement turns belong to the itinerary they edited
+    st.session_state.refine_history = []
@@ -2,10 +2,7 @@
 
 import streamlit as st
 
-def load_elite_css():
-    """Load the elite professional CSS styling"""
-    st.markdown("""
-    <style>
+ELITE_CSS = """
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&family=Playfair+Display:wght@400;500;600;700&display=swap');
     
     /* Global Reset & Base */
@@ -534,5 +531,12 @@ def load_elite_css():
             min-width: auto;
         }
     }
+    """
+
+def load_elite_css():
+    """Load the elite professional CSS styling"""
+    st.markdown(f"""
+    <style>
+    {ELITE_CSS}
     </style>
     """, unsafe_allow_html=True)
@@ -0,0 +1,291 @@
+"""Lightweight tracing and metrics for TripGenie.AI
+
+Spans time each pipeline stage, feed a Prometheus-style histogram and emit a
+structured log line tagged with the current rerun's trace ID. When telemetry
+is disabled, span() hands back a shared no-op context manager.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger("tripgenie.trace")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_HISTOGRAM = "tripgenie_stage_duration_seconds"
+
+# st.rerun() and st.stop() unwind through spans by raising these
+_CONTROL_FLOW_EXCEPTIONS = ("RerunException", "StopException")
+
+_enabled = METRICS_ENABLED
+_NULL_SPAN = nullcontext()
+_trace_id = contextvars.ContextVar("tripgenie_trace_id", default=None)
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_gauges = {}
+_help = {}
+_server = None
+
+def _configure_logging():
+    """Write trace events as bare JSON lines to stderr"""
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+def enable(flag=True):
+    """Turn telemetry on or off for this process"""
+    global _enabled
+    _enabled = flag
+    if flag:
+        _configure_logging()
+
+def is_enabled():
+    return _enabled
+
+def new_trace():
+    """Start a new trace for the current script run and return its ID"""
+    trace_id = uuid.uuid4().hex[:16]
+    _trace_id.set(trace_id)
+    return trace_id
+
+def current_trace_id():
+    return _trace_id.get()
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def increment(name, amount=1, help_text="", **labels):
+    """Add to a counter"""
+    if not _enabled:
+        return
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+        if help_text:
+            _help.setdefault(name, help_text)
+
+def observe(name, value, help_text="", buckets=DEFAULT_BUCKETS, **labels):
+    """Record a value in a histogram"""
+    if not _enabled:
+        return
+    key = _label_key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(hist["buckets"]):
+            if value <= bound:
+                hist["counts"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+        if help_text:
+            _help.setdefault(name, help_text)
+
+def register_gauge(name, func, help_text=""):
+    """Expose the return value of func() as a gauge, or a dict of label tuples to values"""
+    with _lock:
+        _gauges[name] = func
+        if help_text:
+            _help.setdefault(name, help_text)
+
+_caches = {}
+
+def _cache_stat(field):
+    return lambda: {(("cache", name),): cache.stats()[field] for name, cache in list(_caches.items())}
+
+def register_cache(name, cache):
+    """Publish an LRUCache's size and hit/miss counters as gauges"""
+    _caches[name] = cache
+
+def registered_caches():
+    return dict(_caches)
+
+register_gauge("tripgenie_cache_entries", _cache_stat("size"), "Entries held per in-process cache")
+register_gauge("tripgenie_cache_hits", _cache_stat("hits"), "Cache hits since process start")
+register_gauge("tripgenie_cache_misses", _cache_stat("misses"), "Cache misses since process start")
+
+def log_event(event, **fields):
+    """Emit a structured log line tagged with the current trace ID"""
+    if not _enabled:
+        return
+    record = {"ts": round(time.time(), 3), "trace_id": _trace_id.get(), "event": event}
+    record.update(fields)
+    logger.info(json.dumps(record, default=str))
+
+class _Span:
+    """Times a stage and reports it on exit"""
+
+    __slots__ = ("name", "attrs", "start")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if exc_type is None:
+            status = "ok"
+        elif exc_type.__name__ in _CONTROL_FLOW_EXCEPTIONS:
+            status = "rerun"
+        else:
+            status = "error"
+        observe(STAGE_HISTOGRAM, duration, "Time spent in each pipeline stage", stage=self.name)
+        if status == "error":
+            increment("tripgenie_stage_errors_total", 1, "Stages that raised", stage=self.name)
+        log_event("span", span=self.name, duration_ms=round(duration * 1000, 3), status=status, **self.attrs)
+        return False
+
+def span(name, **attrs):
+    """Context manager timing one stage; free when telemetry is disabled"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, attrs)
+
+def timed(name):
+    """Decorator wrapping a function in a span"""
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        counters = {name: dict(series) for name, series in _counters.items()}
+        histograms = {name: {k: dict(v, counts=list(v["counts"])) for k, v in series.items()}
+                      for name, series in _histograms.items()}
+        gauges = dict(_gauges)
+        help_texts = dict(_help)
+
+    for name, series in sorted(counters.items()):
+        if name in help_texts:
+            lines.append(f"# HELP {name} {help_texts[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for key, value in series.items():
+            lines.append(f"{name}{_format_labels(key)} {value}")
+
+    for name, series in sorted(histograms.items()):
+        if name in help_texts:
+            lines.append(f"# HELP {name} {help_texts[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, hist in series.items():
+            for bound, count in zip(hist["buckets"], hist["counts"]):
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {hist['count']}")
+            lines.append(f"{name}_sum{_format_labels(key)} {hist['sum']}")
+            lines.append(f"{name}_count{_format_labels(key)} {hist['count']}")
+
+    for name, func in sorted(gauges.items()):
+        try:
+            value = func()
+        except Exception:
+            continue
+        if name in help_texts:
+            lines.append(f"# HELP {name} {help_texts[name]}")
+        lines.append(f"# TYPE {name} gauge")
+        if isinstance(value, dict):
+            for key, item in value.items():
+                lines.append(f"{name}{_format_labels(key)} {item}")
+        else:
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+def read_gauges():
+    """Current value of every registered gauge, skipping any that fail"""
+    with _lock:
+        gauges = dict(_gauges)
+    values = {}
+    for name, func in gauges.items():
+        try:
+            values[name] = func()
+        except Exception:
+            continue
+    return values
+
+def snapshot():
+    """Return a copy of the raw counters and histograms"""
+    with _lock:
+        return {
+            "counters": {name: dict(series) for name, series in _counters.items()},
+            "histograms": {name: {k: dict(v, counts=list(v["counts"])) for k, v in series.items()}
+                           for name, series in _histograms.items()}
+        }
+
+def reset():
+    """Clear all recorded metrics"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics from a background thread; safe to call on every rerun"""
+    global _server
+    if not _enabled or _server is not None:
+        return _server or None
+    with _lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            # Another worker on this host already owns the port
+            logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+            _server = False
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="tripgenie-metrics", daemon=True).start()
+    return _server
+
+if _enabled:
+    _configure_logging()
@@ -0,0 +1,10 @@
+"""Shared pytest setup: import the flat top-level modules and keep runs self-contained"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# No generation log writes and no shared rate-limit state from test runs
+os.environ.setdefault("TRIPGENIE_GENERATION_LOG", "")
+os.environ.setdefault("TRIPGENIE_RATE_LIMIT_BACKEND", "off")
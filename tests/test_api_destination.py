@@ -0,0 +1,20 @@
+"""Tests for the destination check in api_server.parse_trip_request"""
+
+import api_server
+from api_server import parse_trip_request
+
+def test_unknown_city_with_suggestions(monkeypatch):
+    monkeypatch.setattr(api_server, "UNKNOWN_CITY_POLICY", "confirm")
+    errors = parse_trip_request({"city": "Lisbn", "days": 2})[3]
+    assert len(errors) == 1
+    assert errors[0].startswith("city: 'Lisbn' is not in the city index; did you mean Lisbon")
+    assert errors[0].endswith('? Set "allow_unknown_city": true to plan it anyway.')
+
+def test_unknown_city_without_suggestions(monkeypatch):
+    monkeypatch.setattr(api_server, "UNKNOWN_CITY_POLICY", "confirm")
+    errors = parse_trip_request({"city": "Qxzvw", "days": 2})[3]
+    assert errors == ["city: 'Qxzvw' is not in the city index. Set \"allow_unknown_city\": true to plan it anyway."]
+
+def test_confirmed_unknown_city_is_accepted(monkeypatch):
+    monkeypatch.setattr(api_server, "UNKNOWN_CITY_POLICY", "confirm")
+    assert parse_trip_request({"city": "Qxzvw", "days": 2, "allow_unknown_city": True})[3] == []
@@ -0,0 +1,31 @@
+"""Tests for api_server.ItineraryStore"""
+
+from datetime import date
+
+from api_server import ItineraryStore
+
+def _record(itinerary_id, city="Lisbon"):
+    return {"id": itinerary_id, "trip": {"city": city, "days": 2, "num_people": 1},
+            "start_date": date(2026, 5, 1), "end_date": date(2026, 5, 3), "total_cost": 1000,
+            "itinerary": {"days": []}, "usage": {}, "warnings": [], "stale": False}
+
+def test_records_are_shared_between_store_instances(tmp_path):
+    path = str(tmp_path / "itineraries.sqlite3")
+    ItineraryStore(path).set("a", _record("a"))
+    record = ItineraryStore(path).get("a")
+    assert record == _record("a")
+
+def test_refresh_replaces_a_record(tmp_path):
+    store = ItineraryStore(str(tmp_path / "itineraries.sqlite3"))
+    store.set("a", _record("a"))
+    store.set("a", _record("a", city="Porto"))
+    assert store.get("a")["trip"]["city"] == "Porto"
+    assert store.stats()["size"] == 1
+
+def test_oldest_records_are_dropped(tmp_path):
+    store = ItineraryStore(str(tmp_path / "itineraries.sqlite3"), maxsize=2)
+    for itinerary_id in "abc":
+        store.set(itinerary_id, _record(itinerary_id))
+    assert store.get("a") is None
+    assert store.get("c") is not None
+    assert store.stats() == {"size": 2, "maxsize": 2, "hits": 1, "misses": 1}
@@ -0,0 +1,39 @@
+"""Tests for destination names and cache keys"""
+
+import pytest
+
+from destinations import canonical_city, city_key
+from itinerary_cache import ItineraryCache
+
+TRIP = {'days': 3, 'num_people': 2, 'group_type': "Couple", 'budget': "Mid-range", 'travel_pace': "Medium",
+        'accessibility': "None", 'food_preferences': [], 'interests': []}
+
+@pytest.mark.parametrize("first, second", [
+    ("Lagos, Portugal", "Lagos, Nigeria"),
+    ("Granada, Spain", "Granada, Nicaragua"),
+    ("Paris, Texas", "Paris"),
+])
+def test_same_named_cities_get_different_keys(first, second):
+    assert city_key(first) != city_key(second)
+
+@pytest.mark.parametrize("name, same_as", [("paris", "Paris, France"), ("NYC", "New York"), ("Bombay", "Mumbai"),
+                                            ("Lagos", "Lagos, NG")])
+def test_spellings_of_one_city_share_a_key(name, same_as):
+    assert city_key(name) == city_key(same_as)
+
+def test_unknown_qualifiers_are_kept():
+    assert canonical_city("paris, Texas") == "Paris, Texas"
+    assert canonical_city("Springfield, IL") == "Springfield, IL"
+
+def test_no_reuse_across_countries():
+    cache = ItineraryCache()
+    cache.store({**TRIP, 'city': "Lagos, Portugal"}, {"days": [{"day": d} for d in (1, 2, 3)]})
+    assert cache.lookup({**TRIP, 'city': "Lagos, Nigeria"})[1] == "miss"
+    assert cache.lookup({**TRIP, 'city': "Lagos, Portugal"})[1] == "exact"
+
+def test_city_info_is_kept_per_country():
+    from itinerary_cache import lookup_city_info, store_city_info
+    store_city_info("Lagos, Portugal", {"destination_info": {"currency": "Euro"}, "local_tips": ["Surf early"]})
+    assert lookup_city_info("Lagos, Nigeria") is None
+    assert lookup_city_info("Lagos", country_code="PT")["destination_info"]["currency"] == "Euro"
+    assert lookup_city_info("Lagos, Portugal")["destination_info"]["currency"] == "Euro"
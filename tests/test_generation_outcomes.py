@@ -0,0 +1,30 @@
+"""Tests for the outcome logged for rejected model responses"""
+
+import pytest
+
+import ai_service
+from ai_service import AITravelService
+from benchmarks.mock_llm_server import start_mock_server
+
+TRIP = {'city': "Lisbon", 'days': 2, 'num_people': 1, 'group_type': "Solo", 'budget': "Mid-range",
+        'travel_pace': "Medium", 'accessibility': "None", 'food_preferences': [], 'interests': []}
+
+@pytest.fixture
+def logged(monkeypatch):
+    records = []
+    monkeypatch.setattr(ai_service, "log_generation", lambda trip_params, **fields: records.append(fields))
+    return records
+
+@pytest.mark.parametrize("response, outcome", [("{not json", "parse_error"), ('{"days": []}', "schema_error")])
+@pytest.mark.parametrize("race_models", [None, ["model-a", "model-b"]])
+def test_rejected_responses_are_classified(tmp_path, logged, response, outcome, race_models):
+    response_file = tmp_path / "response.json"
+    response_file.write_text(response, encoding="utf-8")
+    server = start_mock_server(ttft_ms=0, tokens_per_sec=100000, itinerary_file=str(response_file))
+    try:
+        service = AITravelService(base_url=server.url, api_key="test", model="model-a", race_models=race_models)
+        with pytest.raises((ValueError, RuntimeError)):
+            service.generate_itinerary(TRIP, reuse=False)
+    finally:
+        server.shutdown()
+    assert logged[-1]["outcome"] == outcome
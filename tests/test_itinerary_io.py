@@ -0,0 +1,76 @@
+"""Import of exported itinerary files, including malformed ones"""
+
+import json
+from datetime import date
+
+import pytest
+
+from benchmarks.synthetic import synthetic_itinerary
+from itinerary_io import build_export_document, encode_document, export_itinerary, import_itinerary
+
+TRIP = {"city": "Lisbon", "start_date": date(2025, 1, 1), "end_date": date(2025, 1, 4), "days": 3, "num_people": 2}
+
+def _envelope(**overrides):
+    document = build_export_document(synthetic_itinerary(3), TRIP)
+    document.update(overrides)
+    return json.dumps(document).encode("utf-8")
+
+@pytest.mark.parametrize("fmt", ["json", "json.gz"])
+def test_round_trip(fmt):
+    itinerary = synthetic_itinerary(3)
+    imported, trip, total_cost = import_itinerary(export_itinerary(itinerary, TRIP, fmt))
+    assert imported == itinerary
+    assert trip == TRIP
+    assert total_cost > 0
+
+def test_bare_legacy_itinerary():
+    itinerary = synthetic_itinerary(2)
+    imported, trip, _ = import_itinerary(json.dumps(itinerary, indent=2).encode("utf-8"))
+    assert imported == itinerary
+    assert trip == {}
+
+@pytest.mark.parametrize("payload", [
+    b"not json at all",
+    b"[1, 2, 3]",
+    _envelope(itinerary=[1]),
+    _envelope(itinerary="days"),
+    _envelope(itinerary=None),
+    _envelope(trip=["Lisbon", 3]),
+    _envelope(schema_version=99),
+], ids=["garbage", "list-document", "list-itinerary", "string-itinerary", "missing-itinerary", "list-trip",
+        "future-version"])
+def test_rejects_malformed_envelope(payload):
+    with pytest.raises(ValueError):
+        import_itinerary(payload)
+
+def _without(field, day=0):
+    itinerary = synthetic_itinerary(2)
+    del itinerary["days"][day][field]
+    return itinerary
+
+@pytest.mark.parametrize("itinerary", [
+    {"days": "3"},
+    {"days": []},
+    {"days": [1, 2]},
+    _without("day"),
+    _without("activities"),
+    {**synthetic_itinerary(1), "days": [{**synthetic_itinerary(1)["days"][0], "activities": [{"cost": "₹100"}]}]},
+], ids=["days-not-list", "no-days", "days-not-objects", "missing-day", "missing-activities", "activity-no-title"])
+def test_rejects_itinerary_that_would_not_render(itinerary):
+    with pytest.raises(ValueError, match="schema"):
+        import_itinerary(encode_document(build_export_document(itinerary, TRIP)))
+
+@pytest.mark.parametrize("trip", [
+    {**TRIP, "num_people": 0},
+    {**TRIP, "num_people": "2"},
+    {**TRIP, "days": 0},
+    {**TRIP, "city": ""},
+    {"start_date": "2025-01-01"},
+    {**TRIP, "start_date": "1 January"},
+    {**TRIP, "end_date": 20250104},
+    {**TRIP, "budget": "Unlimited"},
+], ids=["zero-people", "string-people", "zero-days", "empty-city", "no-required-fields", "bad-start-date",
+        "numeric-end-date", "unknown-budget"])
+def test_rejects_invalid_trip_details(trip):
+    with pytest.raises(ValueError, match="trip details"):
+        import_itinerary(encode_document(build_export_document(synthetic_itinerary(3), trip)))
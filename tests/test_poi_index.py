@@ -0,0 +1,56 @@
+"""POI index keys places on the qualified city and survives fork"""
+
+import os
+import sqlite3
+
+import pytest
+
+from poi_index import POIIndex
+
+def _itinerary(title):
+    return {"days": [{"day": 1, "activities": [{"title": title, "location": "Centro", "category": "Sightseeing",
+                                                 "cost": "₹500"}]}]}
+
+@pytest.fixture
+def index(tmp_path):
+    poi_index = POIIndex(str(tmp_path / "pois.sqlite3"))
+    yield poi_index
+    poi_index.close()
+
+def test_same_named_cities_keep_separate_places(index):
+    index.ingest(_itinerary("Alhambra"), "Granada", "ES")
+    index.ingest(_itinerary("Catedral de Granada"), "Granada, Nicaragua", "NI")
+
+    assert [poi["title"] for poi in index.search("Granada", country_code="ES")] == ["Alhambra"]
+    assert [poi["title"] for poi in index.search("Granada, Nicaragua")] == ["Catedral de Granada"]
+    assert len(index.stats()["cities"]) == 2
+
+def test_unversioned_rows_are_rekeyed(tmp_path):
+    path = str(tmp_path / "pois.sqlite3")
+    POIIndex(path).ingest(_itinerary("Alhambra"), "Granada", "ES")
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE pois SET city_key = 'granada'")
+        conn.execute("PRAGMA user_version = 0")
+
+    reopened = POIIndex(path)
+    assert [poi["title"] for poi in reopened.search("Granada", country_code="ES")] == ["Alhambra"]
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_opens_its_own_connection(index):
+    index.ingest(_itinerary("Alhambra"), "Granada", "ES")
+    parent_conn = index._conn
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            titles = [poi["title"] for poi in index.search("Granada", country_code="ES")]
+            ok = index._conn is not parent_conn and titles == ["Alhambra"]
+            os.write(write, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    result = os.read(read, 1)
+    os.close(read)
+    os.close(write)
+    assert result == b"1"
+    assert index._conn is parent_conn
@@ -0,0 +1,73 @@
+"""Tests for the pre-warm job: host-wide lease and budgets"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import ai_service
+import prewarm
+import usage
+from benchmarks.mock_llm_server import start_mock_server
+from itinerary_cache import itinerary_cache
+from prewarm import WarmStore, hold_lease, sync_warmed
+from rate_limiter import SQLiteBackend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_one_process_holds_the_lease(tmp_path):
+    lease = SQLiteBackend(str(tmp_path / "prewarm"), name="prewarm")
+    assert hold_lease(lease, ttl=60, now=1000)
+    assert hold_lease(lease, ttl=60, now=1030)
+    with lease.transaction() as state:
+        state["pid"] = -1  # another worker
+    assert not hold_lease(lease, ttl=60, now=1060)
+
+def test_an_expired_lease_is_taken_over(tmp_path):
+    lease = SQLiteBackend(str(tmp_path / "prewarm"), name="prewarm")
+    with lease.transaction() as state:
+        state.update(pid=-1, expires=1000)
+    assert not hold_lease(lease, ttl=60, now=999)
+    assert hold_lease(lease, ttl=60, now=1001)
+
+def test_repeated_runs_are_not_stopped_by_the_session_budget(monkeypatch):
+    ledger = usage.UsageLedger()
+    # More than the 120k session limit, as after a few earlier runs
+    ledger.record("mock", 100000, 25000, 1.0, session_id=prewarm.PREWARM_SESSION_ID)
+    monkeypatch.setattr(usage, "ledger", ledger)
+    monkeypatch.setattr(ai_service, "ledger", ledger)
+    monkeypatch.setattr(ai_service, "log_generation", lambda trip_params, **fields: None)
+    monkeypatch.setattr(ai_service, "index_itinerary", lambda itinerary_json, city, country_code=None: 0)
+    trip = {"city": "Lisbon", "country_code": "PT", "days": 2, "num_people": 2, "group_type": "Couple",
+            "budget": "Mid-range", "travel_pace": "Medium", "accessibility": "None", "food_preferences": [],
+            "interests": []}
+    records = [{"ts": time.time(), "source": "app", **trip, "city": city} for city in ("Lisbon", "Porto")]
+    monkeypatch.setattr(prewarm, "read_requests", lambda since=None: iter(records))
+    server = start_mock_server(ttft_ms=0, tokens_per_sec=100000)
+    monkeypatch.setattr(ai_service, "API_BASE_URL", server.url)
+    monkeypatch.setattr(ai_service, "API_KEY", "test")
+    try:
+        for _ in range(3):
+            itinerary_cache.clear()
+            report = prewarm.run_prewarm(requests_per_minute=0)
+            assert (report["generated"], report["stopped"]) == (2, None)
+    finally:
+        server.shutdown()
+    assert ledger.totals("session", prewarm.PREWARM_SESSION_ID)["total_tokens"] > 125000
+
+def test_other_workers_copy_warmed_itineraries(tmp_path):
+    path = str(tmp_path / "warmed.sqlite3")
+    trip = {"city": "Lisbon", "country_code": "PT", "days": 2, "budget": "Mid-range", "travel_pace": "Medium"}
+    itinerary = {"days": [{"day": 1}, {"day": 2}]}
+    # Published by the lease holder, another process
+    subprocess.run([sys.executable, "-c", "import json, sys; from prewarm import WarmStore; "
+                    "WarmStore(sys.argv[1]).publish(*map(json.loads, sys.argv[2:]))",
+                    path, json.dumps(trip), json.dumps(itinerary)], check=True, cwd=ROOT)
+    store = WarmStore(path)
+    store.publish({**trip, "city": "Porto"}, itinerary)  # this process's own rows are not copied back
+    itinerary_cache.clear()
+    last = sync_warmed(store)
+    assert itinerary_cache.lookup(trip)[1] == "exact"
+    assert itinerary_cache.lookup({**trip, "city": "Porto"})[1] == "miss"
+    assert sync_warmed(store, last) == last
@@ -0,0 +1,28 @@
+"""Run the UI rerun budgets from benchmarks/rerun_budget.py under pytest
+
+TRIPGENIE_RERUN_SLACK multiplies every time budget (default 2, for shared CI
+machines); `python -m benchmarks.rerun_budget` checks them at 1x.
+"""
+
+import os
+
+import pytest
+
+from benchmarks import rerun_budget
+
+SLACK = float(os.environ.get("TRIPGENIE_RERUN_SLACK", "2"))
+
+@pytest.fixture(scope="module", autouse=True)
+def stub_service():
+    import ai_service
+    import config
+    saved = ai_service.AITravelService, config.PROGRESS_STEP_DELAY
+    rerun_budget._install_stub()
+    yield
+    ai_service.AITravelService, config.PROGRESS_STEP_DELAY = saved
+
+@pytest.mark.parametrize("days", rerun_budget.SIZES)
+def test_interactions_within_budget(days):
+    budgets = rerun_budget._load_budgets(rerun_budget.BUDGETS_PATH)[str(days)]
+    measured = rerun_budget.measure(days, repeats=3)
+    assert rerun_budget.check(measured, budgets, SLACK) == []
@@ -0,0 +1,45 @@
+"""Same-named cities in different countries never share cached generations"""
+
+import pytest
+
+import ai_service
+import itinerary_cache
+from ai_service import AITravelService
+from api_server import parse_trip_request
+from benchmarks.mock_llm_server import start_mock_server
+
+@pytest.fixture
+def service(monkeypatch):
+    logged = []
+    monkeypatch.setattr(ai_service, "log_generation", lambda trip_params, **fields: logged.append(fields))
+    monkeypatch.setattr(ai_service, "index_itinerary", lambda itinerary_json, city, country_code=None: 0)
+    itinerary_cache.itinerary_cache.clear()
+    itinerary_cache._city_info.clear()
+    server = start_mock_server(ttft_ms=0, tokens_per_sec=100000)
+    try:
+        yield AITravelService(base_url=server.url, api_key="test", model="mock"), logged
+    finally:
+        server.shutdown()
+
+def _trip(city):
+    trip_params, _, _, errors = parse_trip_request({"city": city, "days": 2})
+    assert errors == []
+    return trip_params
+
+def test_trip_params_carry_the_resolved_country():
+    assert _trip("Granada")["country_code"] == "ES"
+    assert _trip("Granada, Nicaragua")["country_code"] == "NI"
+    assert _trip("Granada, Nicaragua")["city"] == "Granada, Nicaragua"
+
+def test_no_shared_cache_hits(service):
+    service, logged = service
+    service.generate_itinerary(_trip("Granada, Spain"))
+    assert service.reuse == "miss" and logged[-1]["include_city_info"] is True
+
+    service.generate_itinerary(_trip("Granada, Nicaragua"))
+    assert service.reuse == "miss"
+    # Spain's destination_info and local_tips were not reused, so they were asked for again
+    assert logged[-1]["include_city_info"] is True
+
+    service.generate_itinerary(_trip("Granada"))
+    assert service.reuse == "exact"
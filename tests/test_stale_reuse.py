@@ -0,0 +1,22 @@
+"""Deadline fallback only reuses another trip's itinerary when budget and accessibility match"""
+
+from itinerary_cache import ItineraryCache
+
+def _itinerary(days):
+    return {"days": [{"day": day, "activities": []} for day in range(1, days + 1)]}
+
+def _trip(**overrides):
+    trip_params = {"city": "Lisbon", "country_code": "PT", "days": 2, "budget": "Mid-range", "travel_pace": "Relaxed",
+                   "group_type": "Solo", "accessibility": "None", "food_preferences": [], "interests": []}
+    trip_params.update(overrides)
+    return trip_params
+
+def test_near_reuse_keeps_budget_and_accessibility():
+    cache = ItineraryCache(ttl=60, stale_ttl=3600)
+    cache.store(_trip(days=3, travel_pace="Packed"), _itinerary(3))
+
+    itinerary, kind, _ = cache.lookup_stale(_trip())
+    assert kind == "near" and len(itinerary["days"]) == 2
+
+    assert cache.lookup_stale(_trip(budget="Luxury"))[1] == "miss"
+    assert cache.lookup_stale(_trip(accessibility="Wheelchair Access"))[1] == "miss"
@@ -0,0 +1,19 @@
+"""Tests for usage.UsageLedger retention"""
+
+from usage import UsageLedger
+
+def test_session_totals_are_bounded():
+    ledger = UsageLedger(session_limit=2)
+    for session_id in ("a", "b", "c"):
+        ledger.record("model", 10, 5, 0.1, session_id, "Paris")
+    assert set(ledger.summary()["session"]) == {"b", "c"}
+    assert ledger.totals("session", "a")["calls"] == 0
+    assert ledger.totals("destination", "paris")["calls"] == 3
+
+def test_only_the_current_day_is_kept():
+    ledger = UsageLedger()
+    ledger._totals["day"].set("2000-01-01", {"calls": 7})
+    ledger.record("model", 10, 5, 0.1, "a", "Paris")
+    days = ledger.summary()["day"]
+    assert "2000-01-01" not in days
+    assert len(days) == 1 and next(iter(days.values()))["total_tokens"] == 15
@@ -0,0 +1,159 @@
+"""Token usage and cost accounting for TripGenie.AI"""
+
+import math
+import threading
+import time
+from collections import deque
+from datetime import date
+from cache import LRUCache
+from config import MODEL_PRICING, USAGE_BUDGETS, USAGE_DESTINATION_LIMIT, USAGE_HISTORY_SIZE, USAGE_SESSION_LIMIT
+from telemetry import increment, log_event
+
+CHARS_PER_TOKEN = 4
+SCOPES = ("session", "day", "destination")
+
+class BudgetExceededError(RuntimeError):
+    """Raised when a usage budget refuses further LLM calls"""
+
+def cached_tokens_of(usage):
+    """Prompt tokens served from the provider's prefix cache, when the usage block reports them"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
+def estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens=0):
+    """Estimated USD cost of a call from MODEL_PRICING (per million tokens)"""
+    pricing = MODEL_PRICING.get(model) or MODEL_PRICING.get("default", {})
+    prompt_price = pricing.get("prompt", 0.0)
+    cached_price = pricing.get("cached_prompt", prompt_price)
+    return ((prompt_tokens - cached_tokens) * prompt_price + cached_tokens * cached_price +
+            completion_tokens * pricing.get("completion", 0.0)) / 1_000_000
+
+def _empty_totals():
+    return {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+            "cost_usd": 0.0, "latency_s": 0.0}
+
+class UsageLedger:
+    """Thread-safe per-session, per-day and per-destination usage totals
+
+    Only the current day is kept, and session and destination totals are
+    bounded LRU caches, so a long-running server does not grow with every
+    visitor it has ever seen. An evicted session has been idle the longest
+    and starts from zero if it comes back.
+    """
+
+    def __init__(self, budgets=None, history_size=USAGE_HISTORY_SIZE, session_limit=USAGE_SESSION_LIMIT,
+                 destination_limit=USAGE_DESTINATION_LIMIT):
+        self.budgets = budgets if budgets is not None else USAGE_BUDGETS
+        self.recent = deque(maxlen=history_size)
+        # Recording the first call of a new day evicts the previous day
+        self._totals = {"session": LRUCache(session_limit), "day": LRUCache(1),
+                        "destination": LRUCache(destination_limit)}
+        self._exempt_sessions = set()
+        self._lock = threading.Lock()
+
+    def _scope_keys(self, session_id, destination, day=None):
+        keys = {"day": day or date.today().isoformat()}
+        if session_id:
+            keys["session"] = session_id
+        if destination:
+            keys["destination"] = destination.strip().lower()
+        return keys
+
+    def record(self, model, prompt_tokens, completion_tokens, latency_s, session_id=None,
+               destination=None, cached_tokens=0, **metadata):
+        """Add one call to every scope it belongs to and return the record"""
+        record = {
+            "ts": time.time(),
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "latency_s": latency_s,
+            "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens),
+            "session_id": session_id,
+            "destination": destination,
+        }
+        record.update(metadata)
+        with self._lock:
+            for scope, key in self._scope_keys(session_id, destination).items():
+                totals = self._totals[scope].get(key)
+                if totals is None:
+                    totals = _empty_totals()
+                    self._totals[scope].set(key, totals)
+                totals["calls"] += 1
+                for field in ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens", "cost_usd",
+                              "latency_s"):
+                    totals[field] += record[field]
+            self.recent.append(record)
+
+        increment("tripgenie_llm_tokens_total", prompt_tokens, "LLM tokens by kind", kind="prompt", model=model)
+        increment("tripgenie_llm_tokens_total", completion_tokens, "LLM tokens by kind", kind="completion", model=model)
+        if cached_tokens:
+            increment("tripgenie_llm_tokens_total", cached_tokens, "LLM tokens by kind", kind="cached", model=model)
+        increment("tripgenie_llm_cost_usd_total", record["cost_usd"], "Estimated LLM spend in USD", model=model)
+        log_event("llm.usage", **{k: v for k, v in record.items() if k != "ts"})
+        return record
+
+    def record_completion(self, completion, model, latency_s, prompt_text="", session_id=None, destination=None,
+                          **metadata):
+        """Record a chat completion, estimating tokens when the provider omits usage"""
+        usage = getattr(completion, "usage", None)
+        if usage is not None and usage.prompt_tokens is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens or 0
+            cached_tokens = cached_tokens_of(usage)
+            estimated = False
+        else:
+            content = (completion.choices[0].message.content or "") if completion.choices else ""
+            prompt_tokens = math.ceil(len(prompt_text) / CHARS_PER_TOKEN)
+            completion_tokens = math.ceil(len(content) / CHARS_PER_TOKEN)
+            cached_tokens = 0
+            estimated = True
+        return self.record(
+            model, prompt_tokens, completion_tokens, latency_s, session_id, destination, cached_tokens,
+            response_model=getattr(completion, "model", None),
+            request_id=getattr(completion, "id", None),
+            estimated=estimated,
+            **metadata
+        )
+
+    def totals(self, scope, key):
+        """Aggregated usage for one key in a scope"""
+        if scope == "destination" and key:
+            key = key.strip().lower()
+        with self._lock:
+            return dict(self._totals[scope].get(key) or _empty_totals())
+
+    def exempt_session(self, session_id):
+        """Stop applying the session budget to a background job that keeps its own; other scopes still apply"""
+        with self._lock:
+            self._exempt_sessions.add(session_id)
+
+    def check_budget(self, session_id=None, destination=None):
+        """Return budget warnings, or raise BudgetExceededError when a limit is reached"""
+        warnings = []
+        for scope, key in self._scope_keys(session_id, destination).items():
+            if scope == "session" and key in self._exempt_sessions:
+                continue
+            budget = self.budgets.get(scope) or {}
+            used = self.totals(scope, key)["total_tokens"]
+            limit = budget.get("limit")
+            warn = budget.get("warn")
+            if limit is not None and used >= limit:
+                increment("tripgenie_budget_refusals_total", 1, "Calls refused by usage budgets", scope=scope)
+                raise BudgetExceededError(
+                    f"The {scope} token budget is used up ({used:,} of {limit:,} tokens). Please try again later."
+                )
+            if warn is not None and used >= warn:
+                warnings.append(f"{scope.capitalize()} token usage is at {used:,} of {limit or warn:,} tokens.")
+        return warnings
+
+    def summary(self):
+        """Copy of all aggregated totals by scope"""
+        with self._lock:
+            return {scope: {key: dict(totals) for key, totals in entries.items()}
+                    for scope, entries in self._totals.items()}
+
+# Shared by every AITravelService in this process
+ledger = UsageLedger()
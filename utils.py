@@ -2,6 +2,62 @@
 
 import re
 from datetime import datetime, timedelta
+from config import (
+    MAX_TRIP_DAYS, MAX_PEOPLE, BUDGET_OPTIONS, PACE_OPTIONS, GROUP_OPTIONS,
+    ACCESSIBILITY_OPTIONS, FOOD_PREFERENCES, ACTIVITY_CATEGORIES
+)
+
+def build_trip_params(user_inputs):
+    """Assemble AI trip parameters from the sidebar inputs"""
+    preference_keys = list(user_inputs['preferences'].keys())
+    interests = [
+        ACTIVITY_CATEGORIES[preference_keys.index(key)]
+        for key, value in user_inputs['preferences'].items() if value
+    ]
+    return {
+        'city': user_inputs['city'],
+        # Settles which city is meant when the gazetteer has several with this name
+        'country_code': user_inputs.get('country_code'),
+        'days': user_inputs['days'],
+        'num_people': user_inputs['num_people'],
+        'group_type': user_inputs['group_type'],
+        'budget': user_inputs['budget'],
+        'travel_pace': user_inputs['travel_pace'],
+        'accessibility': user_inputs['accessibility'],
+        'food_preferences': user_inputs['food_preferences'],
+        'interests': interests
+    }
+
+def validate_trip_params(params, fields=None):
+    """Check trip parameters against the sidebar constraints, returning a list of errors
+
+    When fields is given, only those parameters are checked.
+    """
+    errors = []
+    checked = lambda field: fields is None or field in fields
+    city = params.get('city')
+    if checked('city') and (not isinstance(city, str) or not city.strip()):
+        errors.append("city: a destination city is required")
+    
+    days = params.get('days')
+    if checked('days') and (not isinstance(days, int) or isinstance(days, bool) or not 1 <= days <= MAX_TRIP_DAYS):
+        errors.append(f"days: must be an integer from 1 to {MAX_TRIP_DAYS}")
+    
+    num_people = params.get('num_people')
+    if checked('num_people') and (not isinstance(num_people, int) or isinstance(num_people, bool)
+                                  or not 1 <= num_people <= MAX_PEOPLE):
+        errors.append(f"num_people: must be an integer from 1 to {MAX_PEOPLE}")
+    
+    for field, options in (('budget', BUDGET_OPTIONS), ('travel_pace', PACE_OPTIONS),
+                           ('group_type', GROUP_OPTIONS), ('accessibility', ACCESSIBILITY_OPTIONS)):
+        if checked(field) and params.get(field) not in options:
+            errors.append(f"{field}: must be one of {', '.join(options)}")
+    
+    for field, options in (('food_preferences', FOOD_PREFERENCES), ('interests', ACTIVITY_CATEGORIES)):
+        values = params.get(field)
+        if checked(field) and (not isinstance(values, list) or any(value not in options for value in values)):
+            errors.append(f"{field}: must be a list drawn from {', '.join(options)}")
+    return errors
 
 def extract_cost(cost_text):
     """Extract numeric cost from formatted price string"""
@@ -16,6 +72,20 @@ def extract_cost(cost_text):
         return int(value)
     return 0
 
+def calculate_total_cost(itinerary_json):
+    """Sum the daily totals of an itinerary"""
+    total_cost = 0
+    for day in itinerary_json.get("days", []):
+        total_cost += extract_cost(day.get("daily_total", "₹0"))
+    return total_cost
+
+def day_totals(itinerary_json):
+    """Daily totals of an itinerary keyed by day number"""
+    return {
+        day.get("day", index + 1): extract_cost(day.get("daily_total", "₹0"))
+        for index, day in enumerate(itinerary_json.get("days", []))
+    }
+
 def analyze_budget_breakdown(itinerary_json, num_people):
     """Analyze budget breakdown by categories"""
     categories = {"Activities": 0, "Meals": 0, "Transport": 0}